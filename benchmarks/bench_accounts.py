@@ -0,0 +1,41 @@
+"""Compares building the merged ticket table of several Zendesk accounts one account after the other against
+downloading every account at the same time, each through its own client and rate limit budget
+
+Usage: python -m benchmarks.bench_accounts [account_count] [ticket_count] [latency]
+"""
+import contextlib
+import io
+import sys
+import time
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.table import merge_account_frames
+from ticket_viewer.viewer import load_accounts_table, load_ticket_table
+
+def main(account_count=4, ticket_count=5000, latency=0.05):
+    # accounts of different sizes, the first one the largest
+    fakes = [FakeZendesk(ticket_count=ticket_count // (number + 1), latency=latency).start() for number in range(account_count)]
+    accounts = [(ZendeskClient(f'bench{number}', 'bench@abc.com/token', 'benchAPIkey', base_url=fake.base_url,
+                                requests_per_minute=10 ** 7), None)
+                for number, fake in enumerate(fakes)]
+    print(f'{account_count} accounts of {", ".join(str(len(fake.tickets)) for fake in fakes)} tickets, {latency * 1000:.0f}ms latency')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds = []
+        tables = []
+        for client, cache in accounts:
+            start = time.perf_counter()
+            tables.append(load_ticket_table(client, cache, concurrency=4))
+            seconds.append(time.perf_counter() - start)
+        merge_account_frames([client.subdomain for client, _ in accounts], tables)
+        start = time.perf_counter()
+        tickets_df = load_accounts_table(accounts, concurrency=4)
+        parallel = time.perf_counter() - start
+    print(f'  one after the other: {sum(seconds):.2f}s (slowest account {max(seconds):.2f}s)')
+    print(f'  at the same time:    {parallel:.2f}s, {len(tickets_df)} tickets merged')
+    for (client, _), fake in zip(accounts, fakes):
+        client.close()
+        fake.stop()
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
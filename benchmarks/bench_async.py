@@ -0,0 +1,67 @@
+"""Measures what the asyncio event loop buys the viewer against a local fake server with per-request latency:
+how long a select waits when a full download is running, and how quickly a cancelled download stops
+
+Usage: python -m benchmarks.bench_async [ticket_count] [latency]
+"""
+import asyncio
+import contextlib
+import io
+import sys
+import time
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.aio import AsyncZendeskClient
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.viewer import aget_tickets, get_tickets
+
+SELECTS = 5
+
+def blocking(client):
+    # the old input loop: a select typed during 'all' is only read once the download has finished
+    start = time.perf_counter()
+    get_tickets(client, 'all', concurrency=4)
+    for ticket_id in range(1, SELECTS + 1):
+        get_tickets(client, ticket_id)
+    return time.perf_counter() - start
+
+async def overlapped(aclient):
+    start = time.perf_counter()
+    download = asyncio.ensure_future(aget_tickets(aclient, 'all', concurrency=4))
+    for ticket_id in range(1, SELECTS + 1):
+        await aget_tickets(aclient, ticket_id)
+    selected = time.perf_counter() - start
+    await download
+    return selected, time.perf_counter() - start
+
+async def cancel_download(aclient, fake, after_pages=10):
+    requests = fake.request_count
+    pages = await aget_tickets(aclient, 'all', concurrency=4, stream=True)
+    async for _ in pages:
+        after_pages -= 1
+        if not after_pages:
+            break
+    await pages.aclose()
+    count = -1
+    while count != fake.request_count: # wait for the requests in flight to land
+        count = fake.request_count
+        await asyncio.sleep(0.5)
+    return count - requests
+
+def main(ticket_count=10000, latency=0.05):
+    fake = FakeZendesk(ticket_count=ticket_count, latency=latency).start()
+    client = ZendeskClient('bench', 'bench@abc.com/token', 'benchAPIkey', base_url=fake.base_url, requests_per_minute=10 ** 7)
+    aclient = AsyncZendeskClient(client)
+    pages = -(-ticket_count // 100)
+    print(f'{ticket_count} tickets ({pages} pages), {latency * 1000:.0f}ms latency, {SELECTS} selects typed during all')
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds = blocking(client)
+        selected, total = asyncio.run(overlapped(aclient))
+    print(f'  blocking loop: selects answered after {seconds:.2f}s')
+    print(f'  event loop:    selects answered after {selected:.2f}s, download done after {total:.2f}s')
+    with contextlib.redirect_stdout(io.StringIO()):
+        requests = asyncio.run(cancel_download(aclient, fake))
+    print(f'  cancelled after 10 pages: {requests} of {pages} pages requested')
+    client.close()
+    fake.stop()
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,32 @@
+"""Compares sequential and concurrent get_tickets('all') against a local fake Zendesk server
+
+Usage: python -m benchmarks.bench_concurrent_fetch [ticket_count] [latency_seconds]
+"""
+import contextlib
+import io
+import sys
+import time
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.viewer import get_tickets
+
+def time_get_tickets(client, concurrency):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        tickets = get_tickets(client, 'all', concurrency=concurrency)
+    return time.perf_counter() - start, len(tickets)
+
+def main(ticket_count=5000, latency=0.05):
+    with FakeZendesk(ticket_count=ticket_count, latency=latency) as fake:
+        # rate limit lifted so the benchmark measures round-trips, not the 400/minute budget
+        client = ZendeskClient('fake', 'bench@abc.com', 'benchAPIkey', base_url=fake.base_url, pool_maxsize=16, requests_per_minute=600000)
+        baseline, _ = time_get_tickets(client, 1)
+        print(f'{ticket_count} tickets, {latency * 1000:.0f}ms latency per page')
+        print(f'concurrency  1: {baseline:.2f}s')
+        for concurrency in (2, 4, 8, 16):
+            elapsed, _ = time_get_tickets(client, concurrency)
+            print(f'concurrency {concurrency:>2}: {elapsed:.2f}s ({baseline / elapsed:.1f}x)')
+        client.close()
+
+if __name__ == '__main__':
+    main(*[cast(arg) for cast, arg in zip((int, float), sys.argv[1:])])
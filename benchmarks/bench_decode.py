@@ -0,0 +1,38 @@
+"""Compares resp.json() + pd.DataFrame against decode_ticket_page + pd.DataFrame.from_records for ticket pages
+
+Usage: python -m benchmarks.bench_decode [pages] [tickets_per_page]
+"""
+import json
+import sys
+import timeit
+from unittest import mock
+import pandas as pd
+from tests.fake_zendesk import make_ticket
+from ticket_viewer import pipeline
+from ticket_viewer.pipeline import TICKET_FIELDS, decode_ticket_page
+
+def current_route(contents):
+    # the original path: full decode of every field, then a DataFrame of every column, cut down to the table fields
+    tickets = [ticket for content in contents for ticket in json.loads(content)['tickets']]
+    return pd.DataFrame(tickets)[list(TICKET_FIELDS)]
+
+def decoder_route(contents):
+    records = [record for content in contents for record in decode_ticket_page(content)['tickets']]
+    return pd.DataFrame.from_records(records, columns=TICKET_FIELDS)
+
+def main(pages=50, per_page=100):
+    contents = [json.dumps({'tickets': [make_ticket(page * per_page + i) for i in range(1, per_page + 1)], 'count': pages * per_page}).encode()
+                for page in range(pages)]
+    print(f'{pages} pages of {per_page} tickets ({sum(map(len, contents)) / 1e6:.1f} MB of JSON)')
+    baseline = min(timeit.repeat(lambda: current_route(contents), number=1, repeat=5))
+    print(f'resp.json() + pd.DataFrame:   {baseline * 1000:.0f}ms')
+    for backend in ('msgspec', 'orjson', 'json'):
+        if backend not in pipeline.JSON_BACKENDS:
+            print(f'{backend}: not installed')
+            continue
+        with mock.patch('ticket_viewer.pipeline.JSON_BACKEND', backend):
+            elapsed = min(timeit.repeat(lambda: decoder_route(contents), number=1, repeat=5))
+        print(f'decode_ticket_page ({backend}): {elapsed * 1000:.0f}ms ({baseline / elapsed:.1f}x)')
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,57 @@
+"""Measures export throughput and peak memory per format against a local fake Zendesk server, compared with
+downloading the full ticket list before writing it
+
+Usage: python -m benchmarks.bench_export [ticket_count] [latency]
+
+Parquet is skipped if pyarrow is not installed. Throughput is bounded by the client's default limit of 400
+requests per minute, as it would be against the real API.
+"""
+import contextlib
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.export import PARQUET_AVAILABLE
+from ticket_viewer.viewer import TICKET_FIELDS, export_tool, get_tickets
+
+def traced(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def write_full_list(fake, path):
+    client = ZendeskClient('bench', 'bench@abc.com/token', 'benchAPIkey', base_url=fake.base_url)
+    tickets = get_tickets(client, 'all')
+    with open(path, 'w', newline='') as out_file:
+        writer = csv.writer(out_file)
+        writer.writerow(TICKET_FIELDS)
+        writer.writerows([ticket.get(field) for field in TICKET_FIELDS] for ticket in tickets)
+    client.close()
+
+def main(ticket_count=10000, latency=0.0):
+    os.environ.update(ZCC_SUBDOMAIN='bench', ZCC_EMAIL_ADDRESS='bench@abc.com', ZCC_API_KEY='benchAPIkey')
+    formats = ('csv', 'ndjson', 'parquet') if PARQUET_AVAILABLE else ('csv', 'ndjson')
+    with FakeZendesk(ticket_count=ticket_count, latency=latency) as fake, tempfile.TemporaryDirectory() as out_dir:
+        os.environ['ZCC_BASE_URL'] = fake.base_url
+        print(f'{ticket_count} tickets, {latency * 1000:.0f}ms latency')
+        for export_format in formats:
+            path = os.path.join(out_dir, f'tickets.{export_format}')
+            elapsed, _ = traced(lambda: export_tool(path, export_format))
+            _, peak = traced(lambda: export_tool(path, export_format, restart=True))
+            print(f'  export {export_format:<8} {ticket_count / elapsed:7.0f} tickets/sec, {peak / 1e6:6.1f} MB peak, '
+                  f'{os.path.getsize(path) / 1e6:.1f} MB file')
+        elapsed, peak = traced(lambda: write_full_list(fake, os.path.join(out_dir, 'full.csv')))
+        print(f'  full list, csv  {ticket_count / elapsed:7.0f} tickets/sec, {peak / 1e6:6.1f} MB peak')
+
+if __name__ == '__main__':
+    main(*[cast(arg) for cast, arg in zip((int, float), sys.argv[1:])])
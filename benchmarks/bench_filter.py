@@ -0,0 +1,42 @@
+"""Compares filtering and sorting the ticket table with TicketIndex against scanning the ticket dicts in Python
+
+Usage: python -m benchmarks.bench_filter [ticket_count]
+"""
+import sys
+import time
+from ticket_viewer.index import TicketIndex
+from ticket_viewer.table import TicketFrameBuilder
+from benchmarks.bench_render import synthetic_tickets
+
+PRIORITY_RANK = {'low': 0, 'normal': 1, 'high': 2, 'urgent': 3}
+
+def timed(function, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+def main(ticket_count=1000000):
+    tickets = synthetic_tickets(ticket_count)
+    builder = TicketFrameBuilder()
+    builder.add_page(tickets)
+    tickets_df = builder.build()
+    assignee = 903456475603 + 3
+    print(f'{ticket_count} tickets, filter status=open priority=normal assignee={assignee}, then sort priority')
+
+    def scan():
+        matches = [ticket for ticket in tickets if ticket['status'] == 'open' and ticket['priority'] == 'normal' and ticket['assignee_id'] == assignee]
+        return len(matches), sorted(tickets, key=lambda ticket: PRIORITY_RANK.get(ticket['priority'], 4))[0]['id']
+    baseline, (scan_matches, _) = timed(scan, repeat=1)
+    print(f'  Python scan:  {baseline * 1000:8.1f}ms')
+
+    build_time, index = timed(lambda: TicketIndex(tickets_df), repeat=1)
+    first_sort, _ = timed(lambda: index.view(sort_column='priority'), repeat=1)
+    elapsed, matches = timed(lambda: len(index.view({'status': 'open', 'priority': 'normal', 'assignee_id': assignee})))
+    sort_time, _ = timed(lambda: index.view(sort_column='priority'))
+    assert matches == scan_matches
+    print(f'  TicketIndex:  {elapsed * 1000:8.1f}ms filter + {sort_time * 1000:.1f}ms sort ({baseline / (elapsed + sort_time):.0f}x), '
+          f'{matches} matches; built once in {build_time * 1000:.0f}ms, first sort {first_sort * 1000:.0f}ms')
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
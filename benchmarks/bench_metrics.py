@@ -0,0 +1,52 @@
+"""Measures the overhead of the hot-path instrumentation: a full download and table build with metrics on and
+off against a local fake server, plus the cost of a single timer and counter
+
+Usage: python -m benchmarks.bench_metrics [ticket_count] [repeat]
+"""
+import contextlib
+import io
+import sys
+import time
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.metrics import metrics
+from ticket_viewer.viewer import get_tickets, print_stats, process_all_tickets
+
+def fetch_and_build(client):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        tickets_df = process_all_tickets(get_tickets(client, 'all', concurrency=4, stream=True))
+        return time.perf_counter() - start, len(tickets_df)
+
+def hook_cost(count=200000):
+    start = time.perf_counter()
+    for _ in range(count):
+        with metrics.timer('bench.timer'):
+            pass
+        metrics.count('bench.counter')
+    return (time.perf_counter() - start) / count
+
+def main(ticket_count=100000, repeat=3):
+    fake = FakeZendesk(ticket_count=ticket_count).start()
+    client = ZendeskClient('bench', 'bench@abc.com/token', 'benchAPIkey', base_url=fake.base_url, requests_per_minute=10 ** 7)
+    fetch_and_build(client) # warm up connections and imports
+    print(f'{ticket_count} tickets, best of {repeat}')
+    for enabled in (False, True, False, True):
+        metrics.enabled = enabled
+        metrics.reset()
+        seconds, rows = min(fetch_and_build(client) for _ in range(repeat))
+        assert rows == ticket_count
+        print(f"  metrics {'on ' if enabled else 'off'}: {seconds:.3f}s")
+    print(f'  timer + counter: {hook_cost() * 1e6:.2f}us with metrics on', end='')
+    metrics.enabled = False
+    print(f', {hook_cost() * 1e6:.2f}us off')
+    metrics.enabled = True
+    metrics.reset()
+    fetch_and_build(client)
+    print('Metrics of one download:')
+    print_stats(metrics.snapshot())
+    client.close()
+    fake.stop()
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
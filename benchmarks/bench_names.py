@@ -0,0 +1,64 @@
+"""Compares resolving user and organization names one request per id against side-loading them with the ticket
+pages, and times rendering pages with names instead of ids
+
+Usage: python -m benchmarks.bench_names [ticket_count] [latency]
+"""
+import contextlib
+import io
+import sys
+import time
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.metrics import metrics
+from ticket_viewer.names import NameDirectory
+from ticket_viewer.render import PageRenderCache
+from ticket_viewer.viewer import get_tickets, process_all_tickets, request_page
+
+PAGES_RENDERED = 200
+
+def download(client, names=None):
+    metrics.reset()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        tickets_df = process_all_tickets(get_tickets(client, 'all', concurrency=4, stream=True, names=names))
+    return time.perf_counter() - start, metrics.snapshot()['counters']['fetch.bytes'], tickets_df
+
+def render(tickets_df, names=None):
+    page_cache = PageRenderCache(tickets_df, names=names, maxsize=1)
+    start = time.perf_counter()
+    for page_num in range(PAGES_RENDERED):
+        page_cache.get(page_num * 7 % (len(tickets_df) // 25), 160)
+    page_cache.close()
+    return (time.perf_counter() - start) / PAGES_RENDERED
+
+def main(ticket_count=10000, latency=0.02):
+    fake = FakeZendesk(ticket_count=ticket_count, latency=latency).start()
+    client = ZendeskClient('bench', 'bench@abc.com/token', 'benchAPIkey', base_url=fake.base_url, requests_per_minute=10 ** 7)
+    print(f'{ticket_count} tickets, {latency * 1000:.0f}ms latency')
+
+    seconds, page_bytes, tickets_df = download(client)
+    requests = fake.request_count
+    user_ids = set(tickets_df['submitter_id'].dropna()) | set(tickets_df['assignee_id'].dropna())
+    organization_ids = set(tickets_df['organization_id'].dropna())
+    start = time.perf_counter()
+    for kind, ids in (('users', user_ids), ('organizations', organization_ids)):
+        for record_id in ids:
+            request_page(client, client.url(f'{kind}/show_many.json?ids={record_id}'))
+    per_id = time.perf_counter() - start
+    print(f'  ids, one request per id:  {seconds + per_id:6.2f}s, {fake.request_count} requests, {page_bytes / 1e6:.1f} MB of pages'
+          f' ({len(user_ids) + len(organization_ids)} users and organizations looked up after the download)')
+
+    names = NameDirectory()
+    before = fake.request_count
+    seconds, sideloaded_bytes, tickets_df = download(client, names)
+    print(f'  side-loaded names:        {seconds:6.2f}s, {fake.request_count - before} requests, {sideloaded_bytes / 1e6:.1f} MB of pages'
+          f' ({sideloaded_bytes / page_bytes - 1:+.0%}), {len(names)} names')
+    assert fake.request_count - before == requests
+
+    print(f'  render with ids:   {render(tickets_df) * 1000:.2f}ms per page')
+    print(f'  render with names: {render(tickets_df, names) * 1000:.2f}ms per page')
+    client.close()
+    fake.stop()
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,43 @@
+"""Compares the original DataFrame-then-astype process_all_tickets with the typed column builder
+
+Usage: python -m benchmarks.bench_process_tickets [ticket_count ...]
+"""
+import sys
+import time
+import tracemalloc
+import pandas as pd
+from ticket_viewer.viewer import process_all_tickets
+
+def synthetic_tickets(ticket_count):
+    return [{'id': i, 'subject': f'Sample ticket {i}', 'priority': ('low', 'normal', 'high', 'urgent', None)[i % 5],
+             'status': ('new', 'open', 'pending', 'solved', 'closed')[i % 5], 'submitter_id': 903456475603 + i % 50,
+             'assignee_id': 903456475603 + i % 7 if i % 11 else None, 'organization_id': 360000000000 + i % 3 if i % 13 else None}
+            for i in range(1, ticket_count + 1)]
+
+def original_process_all_tickets(api_results):
+    # process_all_tickets before the typed column builder, kept here as the benchmark baseline
+    tickets_df = pd.DataFrame(api_results)
+    tickets_df = tickets_df[['id', 'subject', 'priority', 'status', 'submitter_id', 'assignee_id', 'organization_id']].set_index('id')
+    tickets_df[['submitter_id', 'assignee_id', 'organization_id']] = tickets_df[['submitter_id', 'assignee_id', 'organization_id']].astype("Int64").astype('string')
+    tickets_df[['subject', 'priority', 'status']] = tickets_df[['subject', 'priority', 'status']].astype('string')
+    return tickets_df.fillna(value='None')
+
+def measure(process, tickets):
+    tracemalloc.start()
+    start = time.perf_counter()
+    tickets_df = process(tickets)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, tickets_df.memory_usage(deep=True).sum()
+
+def main(*ticket_counts):
+    for ticket_count in ticket_counts or (10000, 100000, 1000000):
+        tickets = synthetic_tickets(ticket_count)
+        print(f'{ticket_count} tickets')
+        for name, process in (('original', original_process_all_tickets), ('typed columns', process_all_tickets)):
+            elapsed, peak, table_bytes = measure(process, tickets)
+            print(f'  {name:<14} {elapsed:6.2f}s  peak {peak / 1e6:7.1f} MB  table {table_bytes / 1e6:7.1f} MB')
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,53 @@
+"""Compares rendering ticket pages with tabulate against a TableLayout fitted once per dataset
+
+Usage: python -m benchmarks.bench_render [ticket_count] [page_flips]
+
+Needs tabulate installed (pip install tabulate) for the baseline.
+"""
+import sys
+import time
+from tabulate import tabulate
+from ticket_viewer.table import TicketFrameBuilder
+from ticket_viewer.render import TableLayout
+
+def synthetic_tickets(ticket_count):
+    # subjects of varying length, so tabulate's per-page widths differ between pages
+    return [{'id': i, 'subject': f'Customer cannot log in after password reset, case {i} ' + 'details ' * (i % 9),
+             'priority': ('low', 'normal', 'high', 'urgent', None)[i % 5], 'status': ('new', 'open', 'pending', 'solved', 'closed')[i % 5],
+             'submitter_id': 903456475603 + i % 50, 'assignee_id': 903456475603 + i % 7 if i % 11 else None,
+             'organization_id': 360000000000 + i % 3 if i % 13 else None} for i in range(1, ticket_count + 1)]
+
+def format_page(paged_df):
+    # how pages were formatted for tabulate before TableLayout, missing values shown as 'None'
+    return paged_df.astype('string').fillna('None')
+
+def main(ticket_count=100000, page_flips=1000, page_size=25):
+    builder = TicketFrameBuilder()
+    builder.add_page(synthetic_tickets(ticket_count))
+    tickets_df = builder.build()
+    page_count = -(-ticket_count // page_size)
+    pages = [(flip * 37) % page_count for flip in range(page_flips)] # jumps all over the table
+    print(f'{ticket_count} tickets, {page_flips} page flips')
+
+    start = time.perf_counter()
+    widths = set()
+    for page_num in pages:
+        text = tabulate(format_page(tickets_df.iloc[page_num * page_size:(page_num + 1) * page_size]), headers='keys', tablefmt='pretty')
+        widths.add(len(text.split('\n', 1)[0]))
+    baseline = (time.perf_counter() - start) / page_flips
+    print(f'  tabulate:     {baseline * 1000:6.2f}ms per page, {len(widths)} different table widths')
+
+    start = time.perf_counter()
+    layout = TableLayout.fit(tickets_df, 160)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    widths = set()
+    for page_num in pages:
+        text = layout.render(tickets_df.iloc[page_num * page_size:(page_num + 1) * page_size])
+        widths.add(len(text.split('\n', 1)[0]))
+    elapsed = (time.perf_counter() - start) / page_flips
+    print(f'  TableLayout:  {elapsed * 1000:6.2f}ms per page ({baseline / elapsed:.1f}x), {len(widths)} table width, '
+          f'fitted once in {fit_time * 1000:.0f}ms')
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
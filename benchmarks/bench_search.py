@@ -0,0 +1,59 @@
+"""Measures building, storing and querying the full-text SearchIndex against scanning every ticket in Python
+
+Usage: python -m benchmarks.bench_search [ticket_count]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from ticket_viewer.search import SearchIndex, tokenize
+
+WORDS = ('printer password reset login email invoice refund order delivery account error timeout upgrade billing '
+         'license export report dashboard mobile app crash slow sync calendar meeting phone network vpn laptop '
+         'screen keyboard access permission admin user profile update install browser chrome firefox').split()
+QUERIES = ('refund', 'password reset', 'vpn timeout laptop', 'zzyzx 42')
+
+def synthetic_tickets(ticket_count, seed=0):
+    generator = random.Random(seed)
+    return [{'id': i, 'subject': ' '.join(generator.choices(WORDS, k=4)) + f' #{i}',
+             'description': ' '.join(generator.choices(WORDS, k=generator.randint(20, 120))), 'status': 'open'}
+            for i in range(1, ticket_count + 1)]
+
+def scan(tickets, query):
+    terms = set(tokenize(query))
+    return sum(1 for ticket in tickets if terms & set(tokenize(ticket['subject']) + tokenize(ticket['description'])))
+
+def main(ticket_count=100000, page_size=100):
+    tickets = synthetic_tickets(ticket_count)
+    print(f'{ticket_count} tickets')
+
+    start = time.perf_counter()
+    index = SearchIndex()
+    for page_start in range(0, ticket_count, page_size):
+        index.add_tickets(tickets[page_start:page_start + page_size])
+    build_time = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as index_dir:
+        path = os.path.join(index_dir, 'bench.search')
+        start = time.perf_counter()
+        index.save(path)
+        save_time = time.perf_counter() - start
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        index = SearchIndex.load(path)
+        load_time = time.perf_counter() - start
+    print(f'  built page by page in {build_time:.1f}s, saved in {save_time * 1000:.0f}ms ({size / 1e6:.1f} MB), '
+          f'loaded in {load_time * 1000:.0f}ms')
+
+    index.search(QUERIES[0]) # first query imports numpy
+    for query in QUERIES:
+        start = time.perf_counter()
+        results, total = index.search(query)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        assert scan(tickets, query) == total
+        baseline = time.perf_counter() - start
+        print(f"  '{query}': {total:6d} matches in {elapsed * 1000:6.2f}ms, Python scan {baseline * 1000:6.0f}ms ({baseline / elapsed:.0f}x)")
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
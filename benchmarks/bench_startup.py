@@ -0,0 +1,57 @@
+"""Measures viewer startup: what python -X importtime charges each heavy module, and time-to-prompt of
+python -m ticket_viewer.viewer against a local fake Zendesk server, compared with importing every module eagerly
+
+Usage: python -m benchmarks.bench_startup [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from tests.fake_zendesk import FakeZendesk
+
+HEAVY_MODULES = ('pandas', 'numpy', 'tabulate', 'msgspec', 'orjson', 'requests')
+# the viewer as it started before imports were deferred: table, render and JSON decoder modules loaded up front
+EAGER_START = ('import numpy, pandas, tabulate, ticket_viewer.table, ticket_viewer.render\n'
+               'from ticket_viewer.pipeline import JSON_BACKEND, page_decoder\n'
+               'page_decoder(JSON_BACKEND)\n'
+               'import runpy\n'
+               "runpy.run_module('ticket_viewer.viewer', run_name='__main__')")
+
+def import_times(statement):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and line.count('|') == 2:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1000
+    return times
+
+def time_to_prompt(fake, command):
+    env = dict(os.environ, ZCC_SUBDOMAIN='bench', ZCC_EMAIL_ADDRESS='bench@abc.com', ZCC_API_KEY='benchAPIkey',
+               ZCC_BASE_URL=fake.base_url, ZCC_CACHE='off', PYTHONUNBUFFERED='1')
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+    output = b''
+    while not output.endswith(b'-> '):
+        chunk = process.stdout.read1(1024)
+        if not chunk:
+            raise RuntimeError(f'viewer exited before the prompt: {output.decode()}')
+        output += chunk
+    elapsed = time.perf_counter() - start
+    process.communicate(b'quit\n')
+    return elapsed
+
+def main(runs=5):
+    times = import_times('import ticket_viewer.viewer')
+    print(f'import ticket_viewer.viewer: {times["ticket_viewer.viewer"]:.0f}ms')
+    for module in HEAVY_MODULES:
+        print(f'  {module:<9} ' + (f'{times[module]:6.0f}ms' if module in times else ' not imported'))
+    with FakeZendesk(ticket_count=100) as fake:
+        for name, command in (('eager imports', [sys.executable, '-c', EAGER_START]), ('deferred imports', [sys.executable, '-m', 'ticket_viewer.viewer'])):
+            elapsed = statistics.median(time_to_prompt(fake, command) for _ in range(runs))
+            print(f'time-to-prompt, {name + ":":<17} {elapsed * 1000:.0f}ms (median of {runs})')
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,70 @@
+"""Compares building the ticket table in memory against opening the same table from its columnar file, each in a
+fresh process: time to load it and the resident memory it adds, before and after rendering a page
+
+Usage: python -m benchmarks.bench_store [ticket_count]
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from tests.fake_zendesk import make_ticket
+from ticket_viewer.pipeline import TICKET_FIELDS
+from ticket_viewer.store import ARROW_AVAILABLE, open_table, write_table
+from ticket_viewer.table import TicketFrameBuilder
+
+def resident_mb():
+    # current resident set size on Linux, peak resident size elsewhere
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+def build_table(ticket_count):
+    builder = TicketFrameBuilder()
+    for page_start in range(0, ticket_count, 1000):
+        builder.add_page([{field: ticket[field] for field in TICKET_FIELDS}
+                          for ticket in map(make_ticket, range(page_start + 1, min(page_start + 1000, ticket_count) + 1))])
+    return builder.build()
+
+def measure(source):
+    # run in a fresh process, so nothing of the table is resident beforehand
+    from ticket_viewer.render import PageRenderCache
+    before = resident_mb()
+    start = time.perf_counter()
+    tickets_df = open_table(source) if not source.isdigit() else build_table(int(source))
+    loaded = time.perf_counter() - start
+    after_load = resident_mb()
+    page_cache = PageRenderCache(tickets_df, maxsize=1)
+    page_cache.get(len(tickets_df) // 50, 160)
+    page_cache.close()
+    print(json.dumps({'seconds': loaded, 'load_mb': after_load - before, 'page_mb': resident_mb() - before}))
+
+def run_measure(source):
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_store', '--measure', source], capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+def main(ticket_count=1000000):
+    tickets_df = build_table(ticket_count)
+    print(f'{ticket_count} tickets{"" if ARROW_AVAILABLE else " (pyarrow not installed, subjects are decoded on open)"}')
+    built = run_measure(str(ticket_count))
+    print(f"  built in memory: {built['seconds']:7.3f}s, {built['load_mb']:6.1f} MB resident, {built['page_mb']:6.1f} MB once the first page is rendered"
+          f" (table {tickets_df.memory_usage(deep=True).sum() / 1e6:.1f} MB)")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'tickets.table')
+        start = time.perf_counter()
+        write_table(path, tickets_df)
+        written = time.perf_counter() - start
+        mapped = run_measure(path)
+        print(f"  memory mapped:   {mapped['seconds']:7.3f}s, {mapped['load_mb']:6.1f} MB resident, {mapped['page_mb']:6.1f} MB once the first page is rendered"
+              f" ({os.path.getsize(path) / 1e6:.1f} MB file written in {written:.2f}s)")
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--measure']:
+        measure(sys.argv[2])
+    else:
+        main(*[int(arg) for arg in sys.argv[1:]])
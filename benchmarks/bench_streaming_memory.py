@@ -0,0 +1,30 @@
+"""Compares peak memory of building the ticket table from a full ticket list vs streamed pages
+
+Usage: python -m benchmarks.bench_streaming_memory [ticket_count]
+"""
+import sys
+import tracemalloc
+from tests.fake_zendesk import make_ticket
+from ticket_viewer.pipeline import project_tickets
+from ticket_viewer.viewer import process_all_tickets
+
+def raw_pages(ticket_count, per_page=100):
+    for start in range(1, ticket_count + 1, per_page):
+        yield [make_ticket(ticket_id) for ticket_id in range(start, min(start + per_page, ticket_count + 1))]
+
+def peak_memory(build):
+    tracemalloc.start()
+    tickets_df = build()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, len(tickets_df)
+
+def main(ticket_count=50000):
+    listed_peak, rows = peak_memory(lambda: process_all_tickets([ticket for page in raw_pages(ticket_count) for ticket in page]))
+    streamed_peak, _ = peak_memory(lambda: process_all_tickets(project_tickets(page) for page in raw_pages(ticket_count)))
+    print(f'{rows} tickets')
+    print(f'full list:      {listed_peak / 1e6:.1f} MB peak')
+    print(f'streamed pages: {streamed_peak / 1e6:.1f} MB peak ({listed_peak / streamed_peak:.1f}x less)')
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
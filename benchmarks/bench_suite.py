@@ -0,0 +1,169 @@
+"""End-to-end benchmark suite: downloads, table building and page rendering at several account sizes, against
+a local fake Zendesk server, with results saved as JSON so runs can be compared for regressions
+
+Usage: python -m benchmarks.bench_suite [--sizes 1000,10000,100000] [--latency 0.0] [--page-size 100]
+                                        [--throttle-rate 0.0] [--repeat 3] [--out FILE] [--compare FILE] [--threshold 1.25]
+
+The fake server runs in its own process, so serving pages does not compete with the viewer for the GIL. The
+client's request budget is raised out of the way, so fetch times measure the viewer and not the rate limiter.
+Each benchmark keeps the best of --repeat runs. With --compare, a benchmark more than --threshold times slower
+than in the baseline file is reported as a regression and the suite exits with status 1.
+"""
+import argparse
+import contextlib
+from datetime import datetime, timezone
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.pipeline import JSON_BACKEND
+from ticket_viewer.viewer import get_tickets, process_all_tickets
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+RENDERED_PAGES = 200 # pages rendered per run, spread over the whole table
+TERMINAL_WIDTH = 160
+
+@contextlib.contextmanager
+def fake_server(ticket_count, latency, page_size, throttle_rate):
+    command = [sys.executable, '-m', 'tests.fake_zendesk', '--tickets', str(ticket_count), '--latency', str(latency),
+               '--page-size', str(page_size), '--throttle-rate', str(throttle_rate)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        yield process.stdout.readline().split()[-1] # 'Serving N tickets at http://127.0.0.1:port'
+    finally:
+        process.terminate()
+        process.wait()
+
+def best_of(repeat, function):
+    """Runs function repeat times, returning the fastest time in seconds, every time and the last result"""
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+    return min(times), times, result
+
+def time_to_first_page(client):
+    buffer = process_all_tickets(get_tickets(client, 'all', concurrency=4, stream=True), background=True)
+    buffer.frame() # let the download finish before the next run
+    return buffer.time_to_first_page
+
+def render_pages(tickets_df, page_count):
+    from ticket_viewer.render import PageRenderCache
+
+    page_cache = PageRenderCache(tickets_df, maxsize=RENDERED_PAGES)
+    for page_num in random.Random(0).sample(range(page_count), min(RENDERED_PAGES, page_count)):
+        page_cache.get(page_num, TERMINAL_WIDTH)
+    page_cache.close()
+
+def run_size(ticket_count, args):
+    """Runs every benchmark on an account of ticket_count tickets
+
+    Returns
+    -------
+    list of dicts
+        One result per benchmark: name, tickets, seconds (best run), runs and a derived rate
+    """
+
+    results = []
+    with fake_server(ticket_count, args.latency, args.page_size, args.throttle_rate) as base_url:
+        client = ZendeskClient('bench', 'bench@abc.com/token', 'benchAPIkey', base_url=base_url, requests_per_minute=10 ** 7)
+        seconds, runs, tickets = best_of(args.repeat, lambda: get_tickets(client, 'all', concurrency=4))
+        assert len(tickets) == ticket_count
+        results.append({'name': 'get_tickets', 'tickets': ticket_count, 'seconds': seconds, 'runs': runs, 'tickets_per_second': ticket_count / seconds})
+        runs = [time_to_first_page(client) for _ in range(args.repeat)]
+        results.append({'name': 'time_to_first_page', 'tickets': ticket_count, 'seconds': min(runs), 'runs': runs})
+        client.close()
+
+    seconds, runs, tickets_df = best_of(args.repeat, lambda: process_all_tickets(tickets))
+    results.append({'name': 'process_all_tickets', 'tickets': ticket_count, 'seconds': seconds, 'runs': runs, 'tickets_per_second': ticket_count / seconds})
+    del tickets
+    page_count = -(-ticket_count // 25)
+    rendered = min(RENDERED_PAGES, page_count)
+    seconds, runs, _ = best_of(args.repeat, lambda: render_pages(tickets_df, page_count))
+    results.append({'name': 'render_pages', 'tickets': ticket_count, 'seconds': seconds, 'runs': runs, 'ms_per_page': seconds / rendered * 1000})
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, threshold):
+    """Prints each benchmark's time against the baseline run
+
+    Parameters
+    ----------
+    results : list of dicts
+        Results of this run
+    baseline : list of dicts
+        Results of an earlier run, from its saved 'results'
+    threshold : float
+        Slowdown ratio above which a benchmark counts as a regression
+
+    Returns
+    -------
+    list of dicts
+        Results that regressed
+    """
+
+    previous = {(result['name'], result['tickets']): result['seconds'] for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result['name'], result['tickets']))
+        if before is None:
+            continue
+        ratio = result['seconds'] / before
+        regressed = ratio > threshold
+        if regressed:
+            regressions.append(result)
+        print(f"  {result['name']:<20} {result['tickets']:>7}  {before:8.3f}s -> {result['seconds']:8.3f}s  {ratio:5.2f}x" + ('  REGRESSION' if regressed else ''))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_suite', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='1000,10000,100000', help='comma-separated account sizes')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the fake server delays each response by')
+    parser.add_argument('--page-size', type=int, default=100, help='most tickets the fake server serves per page')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests the fake server answers with 429')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark, the fastest is kept')
+    parser.add_argument('--out', help='results file, benchmarks/results/suite-<time>.json by default')
+    parser.add_argument('--compare', help='results file of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    args = parser.parse_args(argv)
+
+    started = datetime.now(timezone.utc)
+    results = []
+    for ticket_count in [int(size) for size in args.sizes.split(',')]:
+        size_results = run_size(ticket_count, args)
+        for result in size_results:
+            rate = (f"{result['tickets_per_second']:,.0f} tickets/sec" if 'tickets_per_second' in result else
+                    f"{result['ms_per_page']:.2f}ms per page" if 'ms_per_page' in result else '')
+            print(f"  {result['name']:<20} {ticket_count:>7} tickets  {result['seconds']:8.3f}s  {rate}")
+        results.extend(size_results)
+
+    report = {'started': started.isoformat(timespec='seconds'), 'commit': git_commit(), 'python': platform.python_version(),
+              'platform': platform.platform(), 'json_backend': JSON_BACKEND,
+              'parameters': {key: value for key, value in vars(args).items() if key not in ('out', 'compare')}, 'results': results}
+    out = args.out or os.path.join(RESULTS_DIR, f"suite-{started.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as out_file:
+        json.dump(report, out_file, indent=2)
+    print(f'Results saved to {out}')
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"Compared with {args.compare} (commit {baseline.get('commit')}):")
+        if compare(results, baseline['results'], args.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
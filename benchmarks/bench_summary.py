@@ -0,0 +1,59 @@
+"""Compares summarizing tickets one record at a time against the vectorized summarize, and times building the
+summary table from the local cache against reusing it while the cache is unchanged
+
+Usage: python -m benchmarks.bench_summary [ticket_count]
+"""
+from collections import Counter
+from datetime import datetime
+import sys
+import tempfile
+import time
+from tests.fake_zendesk import BASE_TIME, make_ticket
+from ticket_viewer.cache import TicketCache
+from ticket_viewer.summary import DAY, OPEN_STATUSES, SUMMARY_FIELDS, summarize
+from ticket_viewer.table import TicketFrameBuilder
+
+NOW = BASE_TIME + 30 * DAY
+
+def summarize_records(tickets):
+    # the per-ticket loop summarize replaces: counters and an age list filled one record at a time
+    counts = {column: Counter() for column in ('status', 'priority', 'assignee_id', 'organization_id')}
+    ages = []
+    for ticket in tickets:
+        for column, counter in counts.items():
+            counter[ticket[column]] += 1
+        if ticket['status'] in OPEN_STATUSES:
+            ages.append((NOW - datetime.strptime(ticket['created_at'], '%Y-%m-%dT%H:%M:%S%z').timestamp()) / DAY)
+    ages.sort()
+    return counts, ages[len(ages) // 2] if ages else None
+
+def main(ticket_count=200000):
+    tickets = [{field: ticket[field] for field in SUMMARY_FIELDS} for ticket in map(make_ticket, range(1, ticket_count + 1))]
+    print(f'{ticket_count} tickets')
+
+    start = time.perf_counter()
+    summarize_records(tickets)
+    print(f'  per record:  {time.perf_counter() - start:6.3f}s')
+
+    builder = TicketFrameBuilder(SUMMARY_FIELDS)
+    for page_start in range(0, ticket_count, 1000):
+        builder.add_page(tickets[page_start:page_start + 1000])
+    tickets_df = builder.build()
+    start = time.perf_counter()
+    summarize(tickets_df, now=NOW)
+    print(f'  vectorized:  {time.perf_counter() - start:6.3f}s (table of {tickets_df.memory_usage(deep=True).sum() / 1e6:.1f} MB)')
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = TicketCache(cache_dir, 'bench')
+        for page_start in range(0, ticket_count, 1000):
+            cache.merge([make_ticket(ticket_id) for ticket_id in range(page_start + 1, min(page_start + 1000, ticket_count) + 1)])
+        start = time.perf_counter()
+        cache.ticket_table(SUMMARY_FIELDS)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        cache.ticket_table(SUMMARY_FIELDS)
+        print(f'  cached table: built in {built:6.3f}s, reused in {(time.perf_counter() - start) * 1000:.2f}ms')
+        cache.close()
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
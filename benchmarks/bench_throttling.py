@@ -0,0 +1,33 @@
+"""Measures request throughput against a rate limited fake Zendesk server, with and without the client
+adapting its token bucket to the X-Rate-Limit headers
+
+Usage: python -m benchmarks.bench_throttling [requests] [server_requests_per_minute] [concurrency]
+"""
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import time
+from unittest import mock
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.client import RateLimiter, ZendeskClient
+
+def run(request_count, server_rpm, concurrency, adaptive):
+    with FakeZendesk(ticket_count=10, requests_per_minute=server_rpm) as fake:
+        # the client is configured far above the server's limit, as when the account's plan allows less than expected
+        client = ZendeskClient('fake', 'bench@abc.com', 'benchAPIkey', base_url=fake.base_url, requests_per_minute=server_rpm * 10,
+                               pool_maxsize=concurrency, max_retries=20)
+        start = time.perf_counter()
+        with mock.patch.object(RateLimiter, 'update', RateLimiter.update if adaptive else lambda self, headers: None):
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                statuses = list(executor.map(lambda i: client.get(client.url(f'tickets/{i % 10 + 1}.json')).status_code, range(request_count)))
+        elapsed = time.perf_counter() - start
+        client.close()
+        return elapsed, statuses.count(200), fake.throttled_count
+
+def main(request_count=300, server_rpm=3000, concurrency=8):
+    print(f'{request_count} requests, server limit {server_rpm}/minute, {concurrency} threads')
+    for name, adaptive in (('fixed bucket', False), ('adaptive bucket', True)):
+        elapsed, succeeded, throttled = run(request_count, server_rpm, concurrency, adaptive)
+        print(f'  {name:<16} {elapsed:5.2f}s  {succeeded / elapsed * 60:6.0f} requests/minute  {succeeded} ok  {throttled} x 429')
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
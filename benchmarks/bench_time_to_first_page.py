@@ -0,0 +1,25 @@
+"""Compares time-to-first-page of progressive rendering with waiting for the full download
+
+Usage: python -m benchmarks.bench_time_to_first_page [ticket_count] [latency_seconds]
+"""
+import sys
+import time
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.viewer import get_tickets, process_all_tickets
+
+def main(ticket_count=5000, latency=0.05):
+    with FakeZendesk(ticket_count=ticket_count, latency=latency) as fake:
+        client = ZendeskClient('fake', 'bench@abc.com', 'benchAPIkey', base_url=fake.base_url, requests_per_minute=600000)
+        start = time.perf_counter()
+        tickets_df = process_all_tickets(get_tickets(client, 'all', concurrency=4, stream=True))
+        full_download = time.perf_counter() - start
+        buffer = process_all_tickets(get_tickets(client, 'all', concurrency=4, stream=True), background=True)
+        buffer.frame()
+        client.close()
+    print(f'{len(tickets_df)} tickets, {latency * 1000:.0f}ms latency per page')
+    print(f'first page after full download: {full_download:.2f}s')
+    print(f'first page, progressive:        {buffer.time_to_first_page:.2f}s')
+
+if __name__ == '__main__':
+    main(*[cast(arg) for cast, arg in zip((int, float), sys.argv[1:])])
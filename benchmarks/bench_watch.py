@@ -0,0 +1,47 @@
+"""Compares spotting changed tickets by downloading every ticket again, as repeating 'all' does, against one poll
+of 'watch', which only exports the tickets changed since the last poll, at several account sizes. The fake server
+looks through every ticket for changes, unlike Zendesk, so its share of the poll time still grows with the account.
+
+Usage: python -m benchmarks.bench_watch [changed_count] [latency]
+"""
+import contextlib
+import io
+import sys
+import time
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.viewer import finish_ticket_watch, load_ticket_table, poll_ticket_changes, start_ticket_watch
+
+def main(changed_count=10, latency=0.02, sizes=(1000, 10000, 50000)):
+    print(f'{changed_count} tickets changed between polls, {latency * 1000:.0f}ms latency')
+    for ticket_count in sizes:
+        fake = FakeZendesk(ticket_count=ticket_count, latency=latency).start()
+        client = ZendeskClient('bench', 'bench@abc.com/token', 'benchAPIkey', base_url=fake.base_url, requests_per_minute=10 ** 7)
+        with contextlib.redirect_stdout(io.StringIO()):
+            watch = start_ticket_watch(client, None, concurrency=4)
+            for ticket_id in range(1, ticket_count + 1, ticket_count // changed_count):
+                fake.update_ticket(ticket_id, subject='changed', updated_at=time.time() + 1)
+
+            requests = fake.request_count
+            start = time.perf_counter()
+            load_ticket_table(client, None, concurrency=4)
+            download = time.perf_counter() - start
+            download_requests = fake.request_count - requests
+
+            requests = fake.request_count
+            start = time.perf_counter()
+            changes = poll_ticket_changes(client, None, watch)
+            poll = time.perf_counter() - start
+            poll_requests = fake.request_count - requests
+
+            start = time.perf_counter()
+            finish_ticket_watch(None, watch)
+            patch = time.perf_counter() - start
+        print(f'  {ticket_count:>6} tickets: all again {download:6.3f}s ({download_requests} requests), '
+              f'watch poll {poll:6.3f}s ({poll_requests} request, {len(changes["changed"])} changed), '
+              f'patching the table once {patch:6.3f}s')
+        client.close()
+        fake.stop()
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
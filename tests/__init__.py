@@ -0,0 +1,3 @@
+def format_page(paged_df):
+    """Formats rows of the ticket table the way the viewer shows them, with missing values as 'None'"""
+    return paged_df.astype('string').fillna('None')
@@ -0,0 +1,318 @@
+import argparse
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+BASE_TIME = 1637935695 # 2021-11-26T14:08:15Z, tickets are updated one minute apart in id order
+
+def make_ticket(ticket_id):
+    """Builds a synthetic ticket shaped like a Zendesk Tickets API record
+
+    Parameters
+    ----------
+    ticket_id : int
+        Ticket id
+
+    Returns
+    -------
+    dict
+        Ticket data
+    """
+
+    return {'url': f'https://fake.zendesk.com/api/v2/tickets/{ticket_id}.json', 'id': ticket_id, 'external_id': None,
+            'created_at': iso_time(BASE_TIME + ticket_id * 60), 'updated_at': iso_time(BASE_TIME + ticket_id * 60), 'type': 'incident',
+            'subject': f'Sample ticket {ticket_id}', 'raw_subject': f'Sample ticket {ticket_id}',
+            'description': f'Description of sample ticket {ticket_id}. ' * 10,
+            'priority': ('low', 'normal', 'high', 'urgent', None)[ticket_id % 5],
+            'status': ('new', 'open', 'pending', 'solved', 'closed')[ticket_id % 5],
+            'requester_id': 1000 + ticket_id % 50, 'submitter_id': 1000 + ticket_id % 50,
+            'assignee_id': 2000 + ticket_id % 7 if ticket_id % 11 else None,
+            'organization_id': 3000 + ticket_id % 3 if ticket_id % 13 else None,
+            'group_id': 4000, 'collaborator_ids': [], 'follower_ids': [], 'tags': ['sample', 'support'], 'custom_fields': []}
+
+def make_user(user_id):
+    """Builds the user a synthetic ticket refers to: customers 1000-1049 (requesters) and agents 2000-2006 (assignees)"""
+    role = 'agent' if user_id >= 2000 else 'end-user'
+    number = user_id - (2000 if role == 'agent' else 1000)
+    return {'url': f'https://fake.zendesk.com/api/v2/users/{user_id}.json', 'id': user_id, 'name': f'{"Agent" if role == "agent" else "Customer"} {number}',
+            'email': f'{role}{number}@example.com', 'role': role, 'time_zone': 'UTC', 'locale': 'en-US', 'active': True}
+
+def make_organization(organization_id):
+    """Builds the organization a synthetic ticket refers to, 3000-3002"""
+    return {'url': f'https://fake.zendesk.com/api/v2/organizations/{organization_id}.json', 'id': organization_id,
+            'name': f'Organization {organization_id - 3000}', 'domain_names': [], 'tags': []}
+
+USER_IDS = set(range(1000, 1050)) | set(range(2000, 2007))
+ORGANIZATION_IDS = set(range(3000, 3003))
+
+def iso_time(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def epoch_time(iso):
+    return int(datetime.strptime(iso, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc).timestamp())
+
+class FakeZendesk:
+    """Local stand-in for the Zendesk Tickets API, serving synthetic tickets over HTTP
+
+    Parameters
+    ----------
+    ticket_count : int, optional
+        Number of tickets in the fake account
+    latency : float, optional
+        Seconds each response is delayed by, to mimic network round-trips
+    export_page_size : int, optional
+        Number of tickets per incremental export page
+    requests_per_minute : int, optional
+        Rate limit enforced like the real API, with X-Rate-Limit headers and 429 + Retry-After once exceeded;
+        None serves every request
+    max_page_size : int, optional
+        Most tickets served per offset or cursor page, larger per_page / page[size] requests are cut down to it
+    throttle_rate : float, optional
+        Fraction of requests answered with 429 + Retry-After at random, on top of requests_per_minute
+    retry_after : float, optional
+        Retry-After seconds sent with the random 429s
+    port : int, optional
+        Port to listen on, 0 picks a free one
+    seed : int, optional
+        Seed of the random 429s, so runs are repeatable
+    """
+
+    def __init__(self, ticket_count=250, latency=0.0, export_page_size=1000, requests_per_minute=None, max_page_size=100,
+                 throttle_rate=0.0, retry_after=0.05, port=0, seed=0):
+        self.tickets = [make_ticket(ticket_id) for ticket_id in range(1, ticket_count + 1)]
+        self.latency = latency
+        self.export_page_size = export_page_size
+        self.max_page_size = max_page_size
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.requests_per_minute = requests_per_minute
+        self.rate_tokens = requests_per_minute / 60 if requests_per_minute else 0 # one second's worth of burst
+        self.rate_updated = time.monotonic()
+        self.throttled_count = 0
+        self.injected_statuses = []
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def update_ticket(self, ticket_id, updated_at=None, **fields):
+        """Changes a ticket's fields and bumps its updated_at, so it shows up in incremental exports
+
+        Parameters
+        ----------
+        ticket_id : int
+            Ticket id
+        updated_at : float, optional
+            Unix epoch time of the change, defaults to now
+        """
+
+        ticket = self.tickets[ticket_id - 1]
+        ticket.update(fields)
+        ticket['updated_at'] = iso_time(int(time.time() if updated_at is None else updated_at))
+
+    def inject_errors(self, *statuses):
+        """Makes the next requests fail with statuses, one status per request, before serving normally again
+
+        Parameters
+        ----------
+        statuses : int
+            HTTP status codes, e.g. 503
+        """
+
+        with self.lock:
+            self.injected_statuses.extend(statuses)
+
+    def throttle(self):
+        """Spends one request of the rate limit
+
+        Returns
+        -------
+        tuple of (float or None, dict)
+            Seconds to wait before retrying (None if the request is allowed), and the rate limit headers
+        """
+
+        if self.throttle_rate:
+            with self.lock:
+                if self.random.random() < self.throttle_rate:
+                    self.throttled_count += 1
+                    return self.retry_after, {}
+        if not self.requests_per_minute:
+            return None, {}
+        rate = self.requests_per_minute / 60
+        with self.lock:
+            now = time.monotonic()
+            self.rate_tokens = min(rate, self.rate_tokens + (now - self.rate_updated) * rate)
+            self.rate_updated = now
+            retry_after = None
+            if self.rate_tokens >= 1:
+                self.rate_tokens -= 1
+            else:
+                self.throttled_count += 1
+                retry_after = (1 - self.rate_tokens) / rate
+            return retry_after, {'X-Rate-Limit': str(self.requests_per_minute), 'X-Rate-Limit-Remaining': str(int(self.rate_tokens))}
+
+    def sideloads(self, tickets, query):
+        """Users and organizations referred to by tickets, for the include= kinds of query"""
+        include = query.get('include', [''])[0].split(',')
+        body = {}
+        if 'users' in include:
+            user_ids = {ticket[field] for ticket in tickets for field in ('requester_id', 'submitter_id', 'assignee_id') if ticket.get(field) is not None}
+            body['users'] = [make_user(user_id) for user_id in sorted(user_ids)]
+        if 'organizations' in include:
+            organization_ids = {ticket['organization_id'] for ticket in tickets if ticket.get('organization_id') is not None}
+            body['organizations'] = [make_organization(organization_id) for organization_id in sorted(organization_ids)]
+        return body
+
+    def respond(self, path, query):
+        """Builds the (status, body) response for an API path, with the users and organizations of the tickets
+        side-loaded when asked for with include=users,organizations
+
+        Parameters
+        ----------
+        path : str
+            Request path, e.g. /api/v2/tickets.json
+        query : dict
+            Parsed query string
+
+        Returns
+        -------
+        tuple of (int, dict)
+            HTTP status code and JSON body
+        """
+
+        status, body = self._respond(path, query)
+        if status == 200 and 'include' in query:
+            body.update(self.sideloads(body['tickets'] if 'tickets' in body else [body['ticket']], query))
+        return status, body
+
+    def _respond(self, path, query):
+        # (status, body) of an API path before side-loads, see respond
+        if path == '/api/v2/tickets.json' and 'page[size]' in query:
+            size = min(int(query['page[size]'][0]), self.max_page_size)
+            start = int(query.get('page[after]', ['0'])[0])
+            page_tickets = self.tickets[start:start + size]
+            has_more = start + size < len(self.tickets)
+            after_cursor = str(start + size) if has_more else None
+            next_link = f'{self.base_url}/api/v2/tickets.json?page[size]={size}&page[after]={after_cursor}' if has_more else None
+            return 200, {'tickets': page_tickets, 'meta': {'has_more': has_more, 'after_cursor': after_cursor}, 'links': {'next': next_link}}
+        if path == '/api/v2/incremental/tickets.json':
+            start_time = int(query['start_time'][0])
+            changed = sorted((ticket for ticket in self.tickets if epoch_time(ticket['updated_at']) >= start_time), key=lambda ticket: ticket['updated_at'])
+            page_tickets = changed[:self.export_page_size]
+            end_of_stream = len(changed) <= self.export_page_size
+            end_time = epoch_time(page_tickets[-1]['updated_at']) + 1 if page_tickets else start_time
+            return 200, {'tickets': page_tickets, 'count': len(page_tickets), 'end_time': end_time, 'end_of_stream': end_of_stream,
+                         'next_page': f'{self.base_url}/api/v2/incremental/tickets.json?start_time={end_time}'}
+        if path == '/api/v2/tickets.json':
+            page = int(query.get('page', ['1'])[0])
+            per_page = min(int(query.get('per_page', ['100'])[0]), self.max_page_size)
+            page_tickets = self.tickets[(page - 1) * per_page:page * per_page]
+            next_page = None
+            if page * per_page < len(self.tickets):
+                next_page = f'{self.base_url}/api/v2/tickets.json?page={page + 1}&per_page={per_page}'
+            return 200, {'tickets': page_tickets, 'next_page': next_page, 'count': len(self.tickets)}
+        if path == '/api/v2/tickets/show_many.json':
+            ticket_ids = [int(ticket_id) for ticket_id in query['ids'][0].split(',')]
+            if len(ticket_ids) > 100:
+                return 400, {'error': 'InvalidValue', 'description': 'ids limited to 100'}
+            return 200, {'tickets': [self.tickets[ticket_id - 1] for ticket_id in ticket_ids if 1 <= ticket_id <= len(self.tickets)]}
+        if path in ('/api/v2/users/show_many.json', '/api/v2/organizations/show_many.json'):
+            kind = path.split('/')[3]
+            record_ids = [int(record_id) for record_id in query['ids'][0].split(',')]
+            if len(record_ids) > 100:
+                return 400, {'error': 'InvalidValue', 'description': 'ids limited to 100'}
+            known, make = (USER_IDS, make_user) if kind == 'users' else (ORGANIZATION_IDS, make_organization)
+            return 200, {kind: [make(record_id) for record_id in record_ids if record_id in known]}
+        if path.startswith('/api/v2/tickets/') and path.endswith('.json'):
+            ticket_id = path[len('/api/v2/tickets/'):-len('.json')]
+            if ticket_id.isdigit() and 1 <= int(ticket_id) <= len(self.tickets):
+                return 200, {'ticket': self.tickets[int(ticket_id) - 1]}
+        return 404, {'error': 'RecordNotFound'}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # keep-alive, like the real API
+            disable_nagle_algorithm = True # headers and body are separate writes, Nagle would hold the body back ~40ms
+
+            def do_GET(self):
+                with fake.lock:
+                    fake.request_count += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                retry_after, headers = fake.throttle()
+                with fake.lock:
+                    injected = fake.injected_statuses.pop(0) if fake.injected_statuses else None
+                if retry_after is not None:
+                    status, body = 429, {'error': 'TooManyRequests'}
+                    headers['Retry-After'] = f'{retry_after:.3f}' # the real API sends whole seconds, fractions keep tests fast
+                elif injected:
+                    status, body = injected, {'error': 'InjectedError'}
+                else:
+                    url = urlparse(self.path)
+                    status, body = fake.respond(url.path, parse_qs(url.query))
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def main(argv=None):
+    """Serves a FakeZendesk until interrupted, e.g. to point the viewer at with ZCC_BASE_URL
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        Command line arguments, defaults to sys.argv[1:]
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m tests.fake_zendesk', description='Local stand-in for the Zendesk Tickets API')
+    parser.add_argument('--tickets', type=int, default=250, help='number of tickets in the fake account')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds each response is delayed by')
+    parser.add_argument('--page-size', type=int, default=100, help='most tickets served per offset or cursor page')
+    parser.add_argument('--export-page-size', type=int, default=1000, help='tickets per incremental export page')
+    parser.add_argument('--rpm', type=int, default=None, help='requests per minute allowed before answering 429')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered 429 at random')
+    parser.add_argument('--port', type=int, default=0, help='port to listen on, a free one by default')
+    args = parser.parse_args(argv)
+
+    fake = FakeZendesk(ticket_count=args.tickets, latency=args.latency, export_page_size=args.export_page_size, requests_per_minute=args.rpm,
+                       max_page_size=args.page_size, throttle_rate=args.throttle_rate, port=args.port)
+    print(f'Serving {args.tickets} tickets at {fake.base_url}', flush=True)
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        fake.server.server_close()
+
+if __name__ == '__main__':
+    main()
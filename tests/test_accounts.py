@@ -0,0 +1,75 @@
+import os
+import time
+from unittest import TestCase, mock
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.viewer import get_accounts, interface_tool, load_accounts_table
+
+class TestGetAccounts(TestCase):
+    def test_single_account(self):
+        with mock.patch('ticket_viewer.viewer.load_dotenv'), \
+             mock.patch.dict(os.environ, {'ZCC_SUBDOMAIN': 'one', 'ZCC_EMAIL_ADDRESS': 'a@abc.com', 'ZCC_API_KEY': 'key'}), \
+             mock.patch.dict(os.environ, {'ZCC_SUBDOMAINS': ''}):
+            self.assertEqual(get_accounts(), [('one', 'a@abc.com/token', 'key')])
+
+    def test_several_accounts(self):
+        env = {'ZCC_SUBDOMAINS': 'one, brand-two,one', 'ZCC_EMAIL_ADDRESS': 'a@abc.com', 'ZCC_API_KEY': 'key',
+               'ZCC_EMAIL_ADDRESS_BRAND_TWO': 'b@abc.com', 'ZCC_API_KEY_BRAND_TWO': 'key2'}
+        with mock.patch('ticket_viewer.viewer.load_dotenv'), mock.patch.dict(os.environ, env):
+            self.assertEqual(get_accounts(), [('one', 'a@abc.com/token', 'key'), ('brand-two', 'b@abc.com/token', 'key2')])
+
+class TestAccountsTable(TestCase):
+    def setUp(self) -> None:
+        TestAccountsTable.fakes = [FakeZendesk(ticket_count=count, latency=0.1).start() for count in (300, 250, 120)]
+        TestAccountsTable.accounts = [(ZendeskClient(subdomain, 'tester@abc.com', 'testAPIkey', base_url=fake.base_url), None)
+                                      for subdomain, fake in zip(('one', 'two', 'three'), TestAccountsTable.fakes)]
+
+    def test_merged_in_parallel(self):
+        start = time.perf_counter()
+        with mock.patch('builtins.print'):
+            tickets_df = load_accounts_table(TestAccountsTable.accounts)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(list(tickets_df.columns[:2]), ['subdomain', 'subject'])
+        self.assertEqual(tickets_df['subdomain'].value_counts().to_dict(), {'one': 300, 'two': 250, 'three': 120})
+        self.assertEqual(tickets_df[tickets_df['subdomain'] == 'two'].index.tolist(), list(range(1, 251)))
+        # every account fetches its 2-3 pages one after the other, but the accounts overlap
+        self.assertEqual([fake.request_count for fake in TestAccountsTable.fakes], [3, 3, 2])
+        self.assertLess(elapsed, 0.6)
+
+    def test_failed_account(self):
+        TestAccountsTable.fakes[2].inject_errors(404)
+        with mock.patch('builtins.print') as mock_print:
+            self.assertFalse(load_accounts_table(TestAccountsTable.accounts))
+        mock_print.assert_any_call('API request trouble encountered, status code: 404. Please try again.')
+
+    def tearDown(self) -> None:
+        for (client, _), fake in zip(TestAccountsTable.accounts, TestAccountsTable.fakes):
+            client.close()
+            fake.stop()
+
+class TestAccountsInterface(TestCase):
+    def setUp(self) -> None:
+        TestAccountsInterface.fake = FakeZendesk(ticket_count=30).start()
+
+    def test_all_merges_accounts(self):
+        accounts = [('one', 'a@abc.com/token', 'key'), ('two', 'b@abc.com/token', 'key2')]
+        with mock.patch.dict(os.environ, {'ZCC_BASE_URL': TestAccountsInterface.fake.base_url}), \
+             mock.patch('ticket_viewer.viewer.open_ticket_cache', return_value=None), \
+             mock.patch('ticket_viewer.viewer.get_accounts', return_value=accounts), \
+             mock.patch('ticket_viewer.viewer.validate_credentials', return_value=True) as mock_validate_credentials, \
+             mock.patch('ticket_viewer.viewer.check_terminal_window'), \
+             mock.patch('ticket_viewer.viewer.display_pages_25') as mock_display, \
+             mock.patch('builtins.input', side_effect=['all', 'filter status=new', 'filter subdomain=two', 'sort -subdomain', 'quit']), \
+             mock.patch('builtins.print') as mock_print:
+            interface_tool()
+        self.assertEqual(mock_validate_credentials.call_count, 2)
+        mock_print.assert_any_call('Tickets of two are merged into all, filter and sort.')
+        mock_print.assert_any_call('12 of 60 tickets match status=new, sorted by id.')
+        views = [call.args[0] for call in mock_display.call_args_list]
+        self.assertEqual(len(views[0]), 60)
+        self.assertEqual(views[1]['subdomain'].tolist(), ['one', 'two'] * 6)
+        mock_print.assert_any_call('30 of 60 tickets match subdomain=two, sorted by id.')
+        self.assertEqual(views[3]['subdomain'].tolist()[:2], ['two', 'two'])
+
+    def tearDown(self) -> None:
+        TestAccountsInterface.fake.stop()
@@ -0,0 +1,253 @@
+import asyncio
+import os
+import signal
+import tempfile
+import threading
+import time
+from unittest import TestCase, mock
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.aio import AsyncZendeskClient, interruptible, run_cancellable, run_in_thread
+from ticket_viewer.cache import TicketCache
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.viewer import aget_tickets, cancellable_pages, interface_tool, refresh_ticket_cache, sync_ticket_cache, sync_whole_cache
+
+def wait_until_idle(fake, idle=0.3):
+    """Waits until the fake server has received no request for idle seconds and returns its request count"""
+    count = -1
+    while count != fake.request_count:
+        count = fake.request_count
+        time.sleep(idle)
+    return count
+
+class TestAsyncHelpers(TestCase):
+    def test_run_in_thread(self):
+        async def run():
+            self.assertEqual(await run_in_thread(sum, [1, 2, 3]), 6)
+            with self.assertRaises(ZeroDivisionError):
+                await run_in_thread(lambda: 1 / 0)
+            # a cancelled call stops being awaited at once, while the blocking call carries on
+            release = threading.Event()
+            task = asyncio.ensure_future(run_in_thread(release.wait))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            release.set()
+        asyncio.run(run())
+
+    def test_run_cancellable_sets_event(self):
+        started = threading.Event()
+        seen = {}
+        def blocking(cancelled):
+            seen['cancelled'] = cancelled
+            started.set()
+            cancelled.wait(5)
+        async def run():
+            task = asyncio.ensure_future(run_cancellable(blocking))
+            await run_in_thread(started.wait)
+            task.cancel()
+            await asyncio.wait({task})
+        asyncio.run(run())
+        self.assertTrue(seen['cancelled'].is_set())
+
+    def test_interruptible_returns_to_prompt_on_ctrl_c(self):
+        async def run():
+            asyncio.get_running_loop().call_later(0.05, os.kill, os.getpid(), signal.SIGINT)
+            return await interruptible(asyncio.sleep(5)), await interruptible(run_in_thread(sum, [1, 2]))
+        with mock.patch('builtins.print') as mock_print:
+            self.assertEqual(asyncio.run(run()), (False, 3))
+        mock_print.assert_called_once_with('Command cancelled.')
+        self.assertIs(signal.getsignal(signal.SIGINT), signal.default_int_handler)
+
+    def test_cancellable_pages(self):
+        closed = []
+        def pages():
+            try:
+                yield from ([{'id': 1}], [{'id': 2}], [{'id': 3}])
+            finally:
+                closed.append(True)
+        cancelled = threading.Event()
+        stream = cancellable_pages(pages(), cancelled)
+        self.assertEqual(next(stream), [{'id': 1}])
+        cancelled.set()
+        self.assertEqual(list(stream), [False])
+        self.assertEqual(closed, [True])
+        self.assertEqual(list(cancellable_pages([{'id': 1}])), [[{'id': 1}]])
+
+class TestAsyncClient(TestCase):
+    def setUp(self) -> None:
+        TestAsyncClient.fake = FakeZendesk(ticket_count=1000, latency=0.02).start()
+        TestAsyncClient.client = ZendeskClient('fake', 'tester@abc.com/token', 'testAPIkey', base_url=TestAsyncClient.fake.base_url, requests_per_minute=60000)
+        TestAsyncClient.aclient = AsyncZendeskClient(TestAsyncClient.client)
+
+    def test_aget_tickets(self):
+        async def run():
+            # the single and bulk requests overlap instead of running one after the other
+            ticket, many = await asyncio.gather(aget_tickets(TestAsyncClient.aclient, 7), aget_tickets(TestAsyncClient.aclient, [9, 8]))
+            return ticket['id'], [ticket['id'] for ticket in many]
+        self.assertEqual(asyncio.run(run()), (7, [9, 8]))
+
+    def test_stream_pages(self):
+        async def run():
+            pages = await aget_tickets(TestAsyncClient.aclient, 'all', concurrency=4, stream=True)
+            return [ticket.id async for page in pages for ticket in page]
+        with mock.patch('builtins.print'):
+            self.assertEqual(asyncio.run(run()), list(range(1, 1001)))
+
+    def test_cancelled_stream_stops_downloading(self):
+        async def run():
+            pages = await aget_tickets(TestAsyncClient.aclient, 'all', concurrency=2, stream=True)
+            async for _ in pages:
+                raise asyncio.CancelledError
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(run())
+        # only the pages already in flight when the stream was cancelled are requested, not all 10
+        self.assertLess(wait_until_idle(TestAsyncClient.fake), 6)
+
+    def tearDown(self) -> None:
+        TestAsyncClient.client.close()
+        TestAsyncClient.fake.stop()
+
+class TestBackgroundSync(TestCase):
+    def setUp(self) -> None:
+        TestBackgroundSync.cache_dir = tempfile.TemporaryDirectory()
+        TestBackgroundSync.cache = TicketCache(TestBackgroundSync.cache_dir.name, 'fake')
+        TestBackgroundSync.fake = FakeZendesk(ticket_count=250, latency=0.05).start()
+        TestBackgroundSync.client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=TestBackgroundSync.fake.base_url, requests_per_minute=60000)
+        with mock.patch('builtins.print'):
+            list(sync_ticket_cache(TestBackgroundSync.client, TestBackgroundSync.cache))
+        # the cache was last synced well over its ttl ago and one ticket has changed since
+        TestBackgroundSync.cache.merge([], cursor=time.time() - 600)
+        TestBackgroundSync.cache.mark_synced(time.time() - 600)
+        TestBackgroundSync.fake.update_ticket(3, subject='changed', updated_at=time.time() - 90)
+
+    def test_refresh_in_background(self):
+        cache = TestBackgroundSync.cache
+        async def run():
+            refresh = asyncio.ensure_future(refresh_ticket_cache(TestBackgroundSync.client, cache))
+            while time.time() - cache.synced_at > 60:
+                await asyncio.sleep(0.01)
+            self.assertFalse(refresh.done()) # sleeps until the cache is stale again
+            refresh.cancel()
+        with mock.patch('builtins.print') as mock_print:
+            asyncio.run(run())
+        mock_print.assert_not_called()
+        self.assertEqual(cache.get(3)['subject'], 'changed')
+        self.assertEqual(TestBackgroundSync.fake.request_count, 4)
+
+    def test_concurrent_syncs_export_once(self):
+        with mock.patch('builtins.print'):
+            threads = [threading.Thread(target=sync_ticket_cache, args=(TestBackgroundSync.client, TestBackgroundSync.cache)) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(TestBackgroundSync.fake.request_count, 4)
+
+    def tearDown(self) -> None:
+        TestBackgroundSync.client.close()
+        TestBackgroundSync.fake.stop()
+        TestBackgroundSync.cache.close()
+        TestBackgroundSync.cache_dir.cleanup()
+
+class TestFirstDownload(TestCase):
+    def setUp(self) -> None:
+        TestFirstDownload.cache_dir = tempfile.TemporaryDirectory()
+        TestFirstDownload.cache = TicketCache(TestFirstDownload.cache_dir.name, 'fake')
+        TestFirstDownload.fake = FakeZendesk(ticket_count=1000, latency=0.05).start()
+        TestFirstDownload.client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=TestFirstDownload.fake.base_url, requests_per_minute=60000)
+
+    def test_sync_waits_for_running_full_download(self):
+        cache = TestFirstDownload.cache
+        synced = []
+        with mock.patch('builtins.print'):
+            pages = sync_ticket_cache(TestFirstDownload.client, cache)
+            first_page = next(pages)
+            # a search or summary started while 'all' is still downloading waits for it instead of downloading again
+            thread = threading.Thread(target=lambda: synced.append(list(sync_ticket_cache(TestFirstDownload.client, cache))))
+            thread.start()
+            time.sleep(0.2)
+            self.assertEqual(synced, [])
+            downloaded = [first_page] + list(pages)
+            thread.join()
+        self.assertEqual(sum(map(len, downloaded)), 1000)
+        self.assertEqual(sum(map(len, synced[0])), 1000)
+        self.assertEqual(TestFirstDownload.fake.request_count, 10)
+        self.assertEqual(cache.misses, 1)
+        self.assertIsNone(cache.full_download)
+
+    def test_sync_after_broken_full_download(self):
+        with mock.patch('builtins.print'):
+            pages = sync_ticket_cache(TestFirstDownload.client, TestFirstDownload.cache)
+            next(pages)
+            pages.close()
+            self.assertIsNone(TestFirstDownload.cache.full_download)
+            self.assertEqual(sum(map(len, sync_ticket_cache(TestFirstDownload.client, TestFirstDownload.cache))), 1000)
+        self.assertEqual(TestFirstDownload.cache.misses, 2)
+
+    def test_cleared_cache_never_left_waiting(self):
+        cache = TestFirstDownload.cache
+        # the background refresh never starts a full download, so none is left without a reader
+        self.assertIsNone(sync_ticket_cache(TestFirstDownload.client, cache, full_download=False))
+        self.assertIsNone(cache.full_download)
+        self.assertEqual(TestFirstDownload.fake.request_count, 0)
+        # a cache cleared after a command looked at its cursor is still downloaded in full
+        with mock.patch('builtins.print'):
+            self.assertTrue(sync_whole_cache(TestFirstDownload.client, cache))
+            self.assertIsNone(cache.full_download)
+            self.assertEqual(cache.size()[0], 1000)
+            self.assertEqual(sum(map(len, sync_ticket_cache(TestFirstDownload.client, cache))), 1000)
+
+    def tearDown(self) -> None:
+        TestFirstDownload.client.close()
+        TestFirstDownload.fake.stop()
+        TestFirstDownload.cache.close()
+        TestFirstDownload.cache_dir.cleanup()
+
+class TestAsyncInterface(TestCase):
+    def setUp(self) -> None:
+        TestAsyncInterface.fake = FakeZendesk(ticket_count=10000, latency=0.05).start()
+
+    def test_cancel_background_download(self):
+        with mock.patch.dict(os.environ, {'ZCC_BASE_URL': TestAsyncInterface.fake.base_url}), \
+             mock.patch('ticket_viewer.viewer.open_ticket_cache', return_value=None), \
+             mock.patch('ticket_viewer.viewer.get_credentials', return_value=('testerdomain', 'tester@abc.com', 'tester1234')), \
+             mock.patch('ticket_viewer.viewer.validate_credentials', return_value=True), \
+             mock.patch('ticket_viewer.viewer.check_terminal_window'), \
+             mock.patch('ticket_viewer.viewer.delete_terminal_lines'), \
+             mock.patch('builtins.input', side_effect=['all', 'q', 'select 7', 'cancel', 'cancel', 'quit']), \
+             mock.patch('builtins.print') as mock_print:
+            interface_tool()
+        printed = [call.args[0] for call in mock_print.call_args_list if call.args]
+        self.assertIn('Ticket ID: 7\tSubject: Sample ticket 7', printed) # answered while 'all' still downloads
+        cancelled = [line for line in printed if line.startswith('Download cancelled after ')]
+        self.assertEqual(len(cancelled), 1)
+        self.assertLess(int(cancelled[0].split()[3]), 10000)
+        self.assertEqual(printed[-2:], ['No download running.', 'Thank you for using the Zendesk Ticket Viewer'])
+        self.assertLess(wait_until_idle(TestAsyncInterface.fake), 100)
+
+    def test_select_runs_off_the_event_loop(self):
+        on_loop = []
+        def record(function):
+            def recorded(*args, **kwargs):
+                on_loop.append((function.__name__, threading.current_thread() is threading.main_thread()))
+                return function(*args, **kwargs)
+            return recorded
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = TicketCache(cache_dir, 'testerdomain')
+            with mock.patch.dict(os.environ, {'ZCC_BASE_URL': TestAsyncInterface.fake.base_url}), \
+                 mock.patch('ticket_viewer.viewer.open_ticket_cache', return_value=cache), \
+                 mock.patch('ticket_viewer.viewer.get_credentials', return_value=('testerdomain', 'tester@abc.com', 'tester1234')), \
+                 mock.patch('ticket_viewer.viewer.validate_credentials', return_value=True), \
+                 mock.patch.object(cache, 'get', side_effect=record(cache.get)), \
+                 mock.patch.object(cache, 'merge', side_effect=record(cache.merge)), \
+                 mock.patch('ticket_viewer.viewer.process_select_ticket', side_effect=record(lambda *args, **kwargs: None)), \
+                 mock.patch('builtins.input', side_effect=['select 7', 'select 8,9', 'quit']), \
+                 mock.patch('builtins.print'):
+                interface_tool()
+        # the cache, names and ticket details are read on threads, the event loop only awaits them
+        self.assertEqual({name for name, _ in on_loop}, {'get', 'merge', '<lambda>'})
+        self.assertFalse(any(main_thread for _, main_thread in on_loop))
+
+    def tearDown(self) -> None:
+        TestAsyncInterface.fake.stop()
@@ -0,0 +1,55 @@
+import tempfile
+from unittest import TestCase
+from ticket_viewer.cache import TicketCache
+
+def cached_tickets(cache):
+    """Reads every cached ticket in id order"""
+    return [ticket for page in cache.iter_pages() for ticket in page]
+
+class TestTicketCache(TestCase):
+    def setUp(self) -> None:
+        TestTicketCache.cache_dir = tempfile.TemporaryDirectory()
+        TestTicketCache.cache = TicketCache(TestTicketCache.cache_dir.name, 'testerdomain', ttl=60)
+        TestTicketCache.tickets = [{'id': 2, 'subject': 'sub2', 'status': 'open', 'updated_at': '2021-11-26T14:08:16Z'},
+                                   {'id': 1, 'subject': 'sub1', 'status': 'open', 'updated_at': '2021-11-26T14:08:15Z'}]
+
+    def test_merge_upserts_and_removes_deleted(self):
+        cache = TestTicketCache.cache
+        cache.merge(TestTicketCache.tickets, cursor=100)
+        cache.merge([{'id': 2, 'subject': 'changed', 'status': 'open'}, {'id': 1, 'status': 'deleted'}], cursor=200)
+        self.assertEqual(cached_tickets(cache), [{'id': 2, 'subject': 'changed', 'status': 'open'}])
+        self.assertEqual(cache.sync_cursor, 200)
+
+    def test_get_respects_ttl_and_counts_stats(self):
+        cache = TestTicketCache.cache
+        cache.merge(TestTicketCache.tickets, now=1000)
+        self.assertEqual(cache.get(1, now=1030)['subject'], 'sub1')
+        self.assertIsNone(cache.get(1, now=1100))
+        self.assertIsNone(cache.get(3, now=1030))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['tickets']), (1, 2, 2))
+        self.assertGreater(stats['bytes_saved'], 0)
+
+    def test_sync_refreshes_every_ticket(self):
+        cache = TestTicketCache.cache
+        cache.merge(TestTicketCache.tickets, now=1000)
+        cache.mark_synced(2000)
+        self.assertTrue(cache.is_fresh(2030))
+        self.assertFalse(cache.is_fresh(2100))
+        self.assertEqual(cache.get(1, now=2030)['id'], 1)
+
+    def test_persists_across_reopen_and_invalidates(self):
+        TestTicketCache.cache.merge(TestTicketCache.tickets, cursor=100)
+        TestTicketCache.cache.mark_synced()
+        TestTicketCache.cache.close()
+        reopened = TicketCache(TestTicketCache.cache_dir.name, 'testerdomain')
+        self.assertEqual([ticket['id'] for ticket in cached_tickets(reopened)], [1, 2])
+        self.assertEqual(reopened.sync_cursor, 100)
+        reopened.invalidate()
+        self.assertEqual(cached_tickets(reopened), [])
+        self.assertEqual((reopened.sync_cursor, reopened.synced_at), (0, 0))
+        TestTicketCache.cache = reopened
+
+    def tearDown(self) -> None:
+        TestTicketCache.cache.close()
+        TestTicketCache.cache_dir.cleanup()
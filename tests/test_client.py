@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+from unittest import TestCase, mock
+import requests
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.client import RateLimiter, ZendeskClient
+
+class TestZendeskClient(TestCase):
+    def setUp(self) -> None:
+        TestZendeskClient.client = ZendeskClient('testerdomain', 'tester@abc.com/token', 'testAPIkey', pool_maxsize=4)
+
+    def test_session_configured_once(self):
+        session = TestZendeskClient.client.session
+        self.assertEqual(session.auth, ('tester@abc.com/token', 'testAPIkey'))
+        self.assertEqual(session.headers['Accept'], 'application/json')
+        adapter = session.get_adapter('https://testerdomain.zendesk.com/api/v2/tickets.json')
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertIs(adapter, session.get_adapter('http://localhost:8000/api/v2/tickets.json'))
+
+    def test_url_default_and_override(self):
+        self.assertEqual(TestZendeskClient.client.url('tickets.json'), 'https://testerdomain.zendesk.com/api/v2/tickets.json')
+        local_client = ZendeskClient('testerdomain', 'tester@abc.com/token', 'testAPIkey', base_url='http://127.0.0.1:8000/')
+        self.assertEqual(local_client.url('tickets/1.json'), 'http://127.0.0.1:8000/api/v2/tickets/1.json')
+        local_client.close()
+
+    def test_get_reuses_session(self):
+        with mock.patch.object(TestZendeskClient.client.session, 'get') as mock_request:
+            TestZendeskClient.client.get('url1')
+            TestZendeskClient.client.get('url2')
+            timeout = TestZendeskClient.client.timeout
+            self.assertEqual(mock_request.call_args_list, [mock.call('url1', timeout=timeout), mock.call('url2', timeout=timeout)])
+
+    def tearDown(self) -> None:
+        TestZendeskClient.client.close()
+
+class TestRateLimiter(TestCase):
+    def test_acquire_within_burst_does_not_sleep(self):
+        limiter = RateLimiter(requests_per_minute=600, burst=3)
+        with mock.patch('ticket_viewer.client.time.sleep') as mock_sleep:
+            for _ in range(3):
+                limiter.acquire()
+            mock_sleep.assert_not_called()
+
+    def test_acquire_past_burst_waits_for_refill(self):
+        limiter = RateLimiter(requests_per_minute=600, burst=1)
+        limiter.acquire()
+        with mock.patch('ticket_viewer.client.time.sleep', side_effect=lambda seconds: setattr(limiter, 'tokens', 1)) as mock_sleep:
+            limiter.acquire()
+            mock_sleep.assert_called_once()
+            self.assertAlmostEqual(mock_sleep.call_args[0][0], 0.1, places=2)
+
+    def test_client_get_consumes_token(self):
+        client = ZendeskClient('testerdomain', 'tester@abc.com/token', 'testAPIkey')
+        with mock.patch.object(client.rate_limiter, 'acquire') as mock_acquire:
+            with mock.patch.object(client.session, 'get'):
+                client.get('url')
+            mock_acquire.assert_called_once()
+        client.close()
+
+    def test_update_follows_rate_limit_headers(self):
+        limiter = RateLimiter(requests_per_minute=6000, burst=50)
+        limiter.update({'x-rate-limit': '700', 'x-rate-limit-remaining': '3'})
+        self.assertAlmostEqual(limiter.rate, 700 / 60)
+        self.assertLessEqual(limiter.tokens, 3)
+        limiter.update({'ratelimit-remaining': '0', 'ratelimit-reset': '2'})
+        self.assertGreater(limiter.paused_until - time.monotonic(), 1.5)
+        limiter.update(mock.MagicMock()) # headers of mocked responses are ignored
+        self.assertAlmostEqual(limiter.rate, 700 / 60)
+
+    def test_pause_holds_back_acquire(self):
+        limiter = RateLimiter(requests_per_minute=600, burst=5)
+        limiter.pause(2)
+        with mock.patch('ticket_viewer.client.time.sleep') as mock_sleep:
+            limiter.acquire()
+            mock_sleep.assert_called_once()
+            self.assertAlmostEqual(mock_sleep.call_args[0][0], 2, places=1)
+
+class TestRetryScheduler(TestCase):
+    def setUp(self) -> None:
+        TestRetryScheduler.fake = FakeZendesk(ticket_count=10).start()
+        TestRetryScheduler.client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=TestRetryScheduler.fake.base_url,
+                                                  requests_per_minute=60000, max_retries=3)
+
+    def test_transient_errors_retried_with_backoff(self):
+        TestRetryScheduler.fake.inject_errors(503, 502)
+        with mock.patch('ticket_viewer.client.time.sleep') as mock_sleep:
+            resp = TestRetryScheduler.client.get(TestRetryScheduler.client.url('tickets/1.json'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertTrue(all(0 <= call[0][0] <= 1 for call in mock_sleep.call_args_list))
+
+    def test_retry_budget_exhausted_returns_last_response(self):
+        TestRetryScheduler.fake.inject_errors(*[500] * 10)
+        with mock.patch('ticket_viewer.client.time.sleep'):
+            resp = TestRetryScheduler.client.get(TestRetryScheduler.client.url('tickets/1.json'))
+        self.assertEqual(resp.status_code, 500)
+        self.assertEqual(TestRetryScheduler.fake.request_count, 4)
+
+    def test_client_errors_not_retried(self):
+        resp = TestRetryScheduler.client.get(TestRetryScheduler.client.url('tickets/999.json'))
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(TestRetryScheduler.fake.request_count, 1)
+
+    def test_timeouts_retried_then_raised(self):
+        client = TestRetryScheduler.client
+        with mock.patch('ticket_viewer.client.time.sleep'):
+            with mock.patch.object(client.session, 'get', side_effect=[requests.Timeout(), mock.Mock(status_code=200)]) as mock_request:
+                self.assertEqual(client.get('url').status_code, 200)
+                self.assertEqual(mock_request.call_args[1]['timeout'], client.timeout)
+            with mock.patch.object(client.session, 'get', side_effect=requests.ConnectionError('refused')) as mock_request:
+                with self.assertRaises(requests.ConnectionError):
+                    client.get('url')
+                self.assertEqual(mock_request.call_count, 4)
+
+    def test_throughput_under_throttling(self):
+        # the fake allows 1200 requests/minute, the client starts out configured for 60000
+        fake = FakeZendesk(ticket_count=10, requests_per_minute=1200).start()
+        client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=fake.base_url, requests_per_minute=60000)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            statuses = list(executor.map(lambda ticket_id: client.get(client.url(f'tickets/{ticket_id % 10 + 1}.json')).status_code, range(60)))
+        elapsed = time.perf_counter() - start
+        client.close()
+        fake.stop()
+        self.assertEqual(statuses, [200] * 60)
+        self.assertAlmostEqual(client.rate_limiter.rate, 20)
+        self.assertLess(fake.throttled_count, 15)
+        self.assertLess(elapsed, 6)
+
+    def test_random_throttling_retried(self):
+        fake = FakeZendesk(ticket_count=10, throttle_rate=0.5, retry_after=0.01, seed=1).start()
+        client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=fake.base_url, requests_per_minute=60000, max_retries=10)
+        with mock.patch('ticket_viewer.client.random.random', return_value=0):
+            statuses = [client.get(client.url(f'tickets/{ticket_id}.json')).status_code for ticket_id in range(1, 11)]
+        client.close()
+        fake.stop()
+        self.assertEqual(statuses, [200] * 10)
+        self.assertGreater(fake.throttled_count, 0)
+        self.assertEqual(fake.request_count, 10 + fake.throttled_count)
+
+    def tearDown(self) -> None:
+        TestRetryScheduler.client.close()
+        TestRetryScheduler.fake.stop()
@@ -0,0 +1,126 @@
+import csv
+import json
+import os
+import tempfile
+from unittest import TestCase, mock, skipUnless
+from ticket_viewer import viewer
+from ticket_viewer.export import PARQUET_AVAILABLE, TicketExport
+from ticket_viewer.viewer import export_tool, main
+from tests.fake_zendesk import FakeZendesk
+
+def fail_on_call(call_number):
+    """Wraps request_page so that its call_number-th call fails like an API error"""
+    calls = []
+    def request_page(*args, **kwargs):
+        calls.append(args[1])
+        if len(calls) == call_number:
+            return False
+        return viewer_request_page(*args, **kwargs)
+    return request_page, calls
+
+viewer_request_page = viewer.request_page
+
+class TestExport(TestCase):
+    def setUp(self):
+        TestExport.fake = FakeZendesk(ticket_count=250).start()
+        TestExport.out_dir = tempfile.TemporaryDirectory()
+        TestExport.patchers = [mock.patch.dict(os.environ, {'ZCC_BASE_URL': TestExport.fake.base_url}),
+                               mock.patch('ticket_viewer.viewer.get_credentials', return_value=('fake', 'tester@abc.com/token', 'testAPIkey')),
+                               mock.patch('builtins.print')]
+        for patcher in TestExport.patchers:
+            patcher.start()
+
+    def out(self, name):
+        return os.path.join(TestExport.out_dir.name, name)
+
+    def test_csv_export(self):
+        self.assertTrue(export_tool(self.out('tickets.csv')))
+        with open(self.out('tickets.csv'), newline='') as out_file:
+            rows = list(csv.reader(out_file))
+        self.assertEqual(rows[0], list(viewer.TICKET_FIELDS))
+        self.assertEqual(len(rows), 251)
+        self.assertEqual(rows[4], ['4', 'Sample ticket 4', '', 'closed', '1004', '2004', '3001'])
+        self.assertFalse(os.path.exists(self.out('tickets.csv.progress')))
+
+    def test_ndjson_export_of_other_fields(self):
+        self.assertTrue(export_tool(self.out('tickets.jsonl'), fields=('id', 'tags', 'created_at')))
+        with open(self.out('tickets.jsonl')) as out_file:
+            tickets = [json.loads(line) for line in out_file]
+        self.assertEqual([ticket['id'] for ticket in tickets], list(range(1, 251)))
+        self.assertEqual(tickets[0], {'id': 1, 'tags': ['sample', 'support'], 'created_at': '2021-11-26T14:09:15Z'})
+
+    def test_interrupted_export_resumes_from_last_page(self):
+        request_page, calls = fail_on_call(2) # page 1, then page 2 fails
+        with mock.patch('ticket_viewer.viewer.request_page', side_effect=request_page):
+            self.assertFalse(export_tool(self.out('tickets.csv')))
+        with open(self.out('tickets.csv.progress')) as checkpoint_file:
+            self.assertEqual(json.load(checkpoint_file)['tickets'], 100)
+        # a partly written page is cut off on resume
+        with open(self.out('tickets.csv'), 'a') as out_file:
+            out_file.write('101,Sample ticket 1')
+
+        request_count = TestExport.fake.request_count
+        self.assertTrue(export_tool(self.out('tickets.csv')))
+        self.assertEqual(TestExport.fake.request_count - request_count, 3) # credentials check, pages 2 and 3
+        with open(self.out('tickets.csv'), newline='') as out_file:
+            rows = list(csv.reader(out_file))
+        self.assertEqual([int(row[0]) for row in rows[1:]], list(range(1, 251)))
+        self.assertFalse(os.path.exists(self.out('tickets.csv.progress')))
+
+    def test_unknown_format_and_changed_fields(self):
+        self.assertFalse(TicketExport.open(self.out('tickets.xlsx')))
+        request_page, _ = fail_on_call(2)
+        with mock.patch('ticket_viewer.viewer.request_page', side_effect=request_page):
+            export_tool(self.out('tickets.ndjson'))
+        # another field list cannot continue the same file, so the export starts over
+        self.assertFalse(TicketExport.open(self.out('tickets.ndjson'), fields=('id',)).resumed)
+        self.assertTrue(TicketExport.open(self.out('tickets.ndjson')).resumed)
+
+    def test_corrupt_checkpoint_starts_over(self):
+        request_page, _ = fail_on_call(2)
+        with mock.patch('ticket_viewer.viewer.request_page', side_effect=request_page):
+            export_tool(self.out('tickets.csv'))
+        # a checkpoint cut off while being written cannot be resumed from
+        with open(self.out('tickets.csv.progress'), 'r+') as checkpoint_file:
+            checkpoint_file.truncate(10)
+        self.assertFalse(TicketExport.open(self.out('tickets.csv')).resumed)
+        self.assertTrue(export_tool(self.out('tickets.csv')))
+        with open(self.out('tickets.csv'), newline='') as out_file:
+            rows = list(csv.reader(out_file))
+        self.assertEqual([int(row[0]) for row in rows[1:]], list(range(1, 251)))
+
+    @skipUnless(PARQUET_AVAILABLE, 'pyarrow not installed')
+    def test_parquet_export_resumes_from_last_part(self):
+        import pyarrow.parquet as pq
+
+        with mock.patch('ticket_viewer.export.PARQUET_PART_TICKETS', 100):
+            request_page, _ = fail_on_call(2)
+            with mock.patch('ticket_viewer.viewer.request_page', side_effect=request_page):
+                self.assertFalse(export_tool(self.out('tickets.parquet')))
+            self.assertEqual(os.listdir(self.out('tickets.parquet.parts')), ['000000.parquet'])
+            with self.assertRaises(SystemExit) as exit_status:
+                main(['export', '--out', self.out('tickets.parquet')])
+            self.assertEqual(exit_status.exception.code, 0)
+        table = pq.read_table(self.out('tickets.parquet'))
+        self.assertEqual(table.column('id').to_pylist(), list(range(1, 251)))
+        self.assertEqual(str(table.schema.field('assignee_id').type), 'int64')
+        self.assertIsNone(table.column('priority')[3].as_py())
+        self.assertFalse(os.path.exists(self.out('tickets.parquet.parts')))
+
+    @skipUnless(PARQUET_AVAILABLE, 'pyarrow not installed')
+    def test_parquet_export_of_string_external_id(self):
+        import pyarrow.parquet as pq
+
+        for ticket in TestExport.fake.tickets:
+            ticket['external_id'] = f"crm-{ticket['id']}"
+        self.assertTrue(export_tool(self.out('tickets.parquet'), fields=('id', 'external_id', 'requester_id')))
+        table = pq.read_table(self.out('tickets.parquet'))
+        self.assertEqual(table.column('external_id').to_pylist()[:2], ['crm-1', 'crm-2'])
+        self.assertEqual([str(field.type) for field in table.schema], ['int64', 'string', 'string'])
+        self.assertFalse(os.path.exists(self.out('tickets.parquet.parts')))
+
+    def tearDown(self):
+        for patcher in TestExport.patchers:
+            patcher.stop()
+        TestExport.out_dir.cleanup()
+        TestExport.fake.stop()
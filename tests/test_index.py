@@ -0,0 +1,56 @@
+from unittest import TestCase
+from ticket_viewer.index import TicketIndex
+from ticket_viewer.table import TicketFrameBuilder, merge_account_frames
+
+def make_tickets():
+    return [{'id': 1, 'subject': 'Printer', 'priority': 'low', 'status': 'open', 'submitter_id': 33, 'assignee_id': 44, 'organization_id': 55},
+            {'id': 2, 'subject': 'apple', 'priority': 'urgent', 'status': 'open', 'submitter_id': 33, 'assignee_id': None, 'organization_id': 55},
+            {'id': 3, 'subject': None, 'priority': None, 'status': 'closed', 'submitter_id': 35, 'assignee_id': 46, 'organization_id': None},
+            {'id': 4, 'subject': 'Zebra', 'priority': 'high', 'status': 'pending', 'submitter_id': 33, 'assignee_id': 44, 'organization_id': 56},
+            {'id': 5, 'subject': 'mouse', 'priority': 'urgent', 'status': 'open', 'submitter_id': 37, 'assignee_id': 44, 'organization_id': 56},
+            {'id': 6, 'subject': 'keyboard', 'priority': 'normal', 'status': 'new', 'submitter_id': 33, 'assignee_id': 46, 'organization_id': None}]
+
+class TestTicketIndex(TestCase):
+    def setUp(self) -> None:
+        builder = TicketFrameBuilder()
+        builder.add_page(make_tickets())
+        TestTicketIndex.index = TicketIndex(builder.build())
+
+    def test_match_categories_and_ids(self):
+        index = TestTicketIndex.index
+        self.assertEqual(index.match('status', 'open').nonzero()[0].tolist(), [0, 1, 4])
+        self.assertEqual(index.match('priority', None).nonzero()[0].tolist(), [2])
+        self.assertEqual(index.match('assignee_id', 44).nonzero()[0].tolist(), [0, 3, 4])
+        self.assertEqual(index.match('organization_id', None).nonzero()[0].tolist(), [2, 5])
+        self.assertFalse(index.match('status', 'hold').any())
+        self.assertFalse(index.match('assignee_id', 99).any())
+
+    def test_sort_workflow_order_missing_last(self):
+        index = TestTicketIndex.index
+        self.assertEqual(index.view(sort_column='priority').index.tolist(), [1, 6, 4, 2, 5, 3])
+        self.assertEqual(index.view(sort_column='priority', descending=True).index.tolist(), [2, 5, 4, 6, 1, 3])
+        self.assertEqual(index.view(sort_column='status').index.tolist(), [6, 1, 2, 5, 4, 3])
+        self.assertEqual(index.view(sort_column='subject').index.tolist(), [2, 6, 5, 1, 4, 3])
+        self.assertEqual(index.view(sort_column='organization_id', descending=True).index.tolist(), [4, 5, 1, 2, 3, 6])
+
+    def test_view_filters_then_sorts(self):
+        index = TestTicketIndex.index
+        view_df = index.view({'status': 'open', 'assignee_id': 44}, 'subject')
+        self.assertEqual(view_df.index.tolist(), [5, 1])
+        self.assertEqual(index.view({'status': 'open', 'priority': 'urgent'}, 'id', True).index.tolist(), [5, 2])
+        self.assertEqual(len(index.view({'status': 'solved'})), 0)
+        self.assertEqual(index.view().index.tolist(), [1, 2, 3, 4, 5, 6])
+
+    def test_filter_and_sort_merged_subdomains(self):
+        tickets_df = TestTicketIndex.index.tickets_df
+        index = TicketIndex(merge_account_frames(['gamma', 'beta'], [tickets_df, tickets_df.iloc[:3]]))
+        beta_df = index.view({'subdomain': 'beta'})
+        self.assertEqual((beta_df['subdomain'].unique().tolist(), beta_df.index.tolist()), (['beta'], [1, 2, 3]))
+        self.assertEqual(len(index.view({'subdomain': 'beta', 'status': 'open'})), 2)
+        self.assertFalse(index.match('subdomain', 'delta').any())
+        # alphabetical, ties in table order
+        self.assertEqual(index.view(sort_column='subdomain')['subdomain'].tolist(), ['beta'] * 3 + ['gamma'] * 6)
+        self.assertEqual(index.view(sort_column='subdomain', descending=True)['subdomain'].tolist(), ['gamma'] * 6 + ['beta'] * 3)
+        # a single account has no subdomain column
+        self.assertFalse(TestTicketIndex.index.match('subdomain', 'beta').any())
+        self.assertEqual(TestTicketIndex.index.view(sort_column='subdomain').index.tolist(), [1, 2, 3, 4, 5, 6])
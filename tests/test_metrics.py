@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.metrics import LATENCY_BUCKETS, NULL_TIMER, Metrics, metrics, percentile
+from ticket_viewer.viewer import get_tickets, print_stats, process_all_tickets
+
+class TestMetrics(TestCase):
+    def setUp(self) -> None:
+        TestMetrics.metrics = Metrics()
+
+    def test_counters_and_timings(self):
+        TestMetrics.metrics.count('requests')
+        TestMetrics.metrics.count('bytes', 300)
+        TestMetrics.metrics.count('bytes', 200)
+        for seconds in (0.002, 0.004, 0.02, 3):
+            TestMetrics.metrics.observe('request', seconds)
+        snapshot = TestMetrics.metrics.snapshot()
+        self.assertEqual(snapshot['counters'], {'bytes': 500, 'requests': 1})
+        timing = snapshot['timings']['request']
+        self.assertEqual(timing['count'], 4)
+        self.assertAlmostEqual(timing['total_seconds'], 3.026)
+        self.assertAlmostEqual(timing['mean_seconds'], 3.026 / 4)
+        self.assertEqual(timing['max_seconds'], 3)
+        self.assertEqual((timing['p50_seconds'], timing['p90_seconds'], timing['p99_seconds']), (0.005, 3, 3))
+        self.assertEqual(len(timing['buckets']), len(LATENCY_BUCKETS) + 1)
+        self.assertEqual(sum(bucket['count'] for bucket in timing['buckets']), 4)
+        json.dumps(snapshot) # snapshots are plain JSON
+
+    def test_percentile_interpolated_and_capped_at_max(self):
+        buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        buckets[LATENCY_BUCKETS.index(0.1)] = 10 # 10 observations between 0.05s and 0.1s
+        self.assertAlmostEqual(percentile(buckets, 50, 0.09), 0.075)
+        self.assertAlmostEqual(percentile(buckets, 90, 0.09), 0.09)
+        self.assertEqual(percentile(buckets, 50, 0.06), 0.06)
+        self.assertEqual(percentile([0] * (len(LATENCY_BUCKETS) + 1), 50, 0.0), 0.0)
+
+    def test_timer_and_timed(self):
+        with TestMetrics.metrics.timer('block'):
+            pass
+        timed = TestMetrics.metrics.timed('call')(lambda value: value * 2)
+        self.assertEqual(timed(21), 42)
+        self.assertEqual({name: timing['count'] for name, timing in TestMetrics.metrics.snapshot()['timings'].items()}, {'block': 1, 'call': 1})
+
+    def test_disabled_records_nothing(self):
+        TestMetrics.metrics.enabled = False
+        TestMetrics.metrics.count('requests')
+        TestMetrics.metrics.observe('request', 0.1)
+        self.assertIs(TestMetrics.metrics.timer('request'), NULL_TIMER)
+        self.assertEqual(TestMetrics.metrics.timed('call')(lambda: 'done')(), 'done')
+        snapshot = TestMetrics.metrics.snapshot()
+        self.assertEqual((snapshot['counters'], snapshot['timings']), ({}, {}))
+
+    def test_reset_and_dump(self):
+        TestMetrics.metrics.count('requests')
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'metrics.json')
+            TestMetrics.metrics.dump(path)
+            with open(path) as metrics_file:
+                self.assertEqual(json.load(metrics_file)['counters'], {'requests': 1})
+        TestMetrics.metrics.reset()
+        self.assertEqual(TestMetrics.metrics.snapshot()['counters'], {})
+
+    def test_print_stats(self):
+        TestMetrics.metrics.observe('http.request', 0.02)
+        TestMetrics.metrics.count('fetch.bytes', 2500000)
+        TestMetrics.metrics.count('fetch.pages', 3)
+        with mock.patch('builtins.print') as mock_print:
+            print_stats(TestMetrics.metrics.snapshot())
+            print_stats(Metrics().snapshot())
+            print_stats(Metrics(enabled=False).snapshot())
+        lines = [call.args[0] for call in mock_print.call_args_list]
+        self.assertTrue(lines[1].startswith('http.request') and '20.0ms' in lines[1])
+        self.assertEqual(lines[2:], ['fetch.bytes                 2.5 MB', 'fetch.pages                    3',
+                                     'No metrics recorded yet.', 'Metrics are turned off (ZCC_METRICS=off).'])
+
+class TestHotPathMetrics(TestCase):
+    def setUp(self) -> None:
+        TestHotPathMetrics.fake = FakeZendesk(ticket_count=250, throttle_rate=0.3, retry_after=0.01, seed=2).start()
+        TestHotPathMetrics.client = ZendeskClient('fake', 'tester@abc.com/token', 'testAPIkey', base_url=TestHotPathMetrics.fake.base_url,
+                                                  requests_per_minute=60000, max_retries=10)
+        metrics.enabled = True
+        metrics.reset()
+
+    def test_fetch_and_build_recorded(self):
+        with mock.patch('ticket_viewer.client.random.random', return_value=0), mock.patch('builtins.print'):
+            tickets_df = process_all_tickets(get_tickets(TestHotPathMetrics.client, 'all', stream=True))
+        self.assertEqual(len(tickets_df), 250)
+        snapshot = metrics.snapshot()
+        counters, timings = snapshot['counters'], snapshot['timings']
+        self.assertEqual((counters['fetch.pages'], counters['fetch.tickets']), (3, 250))
+        self.assertEqual(counters['http.retry.rate_limited'], TestHotPathMetrics.fake.throttled_count)
+        self.assertEqual(timings['http.request']['count'], TestHotPathMetrics.fake.request_count)
+        self.assertEqual(timings['decode']['count'], 3)
+        self.assertEqual(timings['table.add_page']['count'], 3)
+        self.assertEqual(timings['table.build']['count'], 1)
+        self.assertGreater(counters['fetch.bytes'], 0)
+
+    def test_bytes_recorded_without_decoder(self):
+        # single tickets and pages read with resp.json(), e.g. those a cache sync stores, count their bytes too
+        with mock.patch('ticket_viewer.client.random.random', return_value=0), mock.patch('builtins.print'):
+            ticket = get_tickets(TestHotPathMetrics.client, 5)
+        self.assertEqual(ticket['id'], 5)
+        self.assertGreater(metrics.snapshot()['counters']['fetch.bytes'], 0)
+
+    def test_disabled_metrics_record_nothing(self):
+        metrics.enabled = False
+        with mock.patch('builtins.print'):
+            get_tickets(TestHotPathMetrics.client, 'all')
+        snapshot = metrics.snapshot()
+        self.assertEqual((snapshot['counters'], snapshot['timings']), ({}, {}))
+
+    def tearDown(self) -> None:
+        metrics.enabled = True
+        metrics.reset()
+        TestHotPathMetrics.client.close()
+        TestHotPathMetrics.fake.stop()
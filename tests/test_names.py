@@ -0,0 +1,125 @@
+import tempfile
+from unittest import TestCase, mock
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.cache import TicketCache
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.names import AccountNames, NameDirectory, with_include
+from ticket_viewer.render import PageRenderCache
+from ticket_viewer.table import TicketFrameBuilder, merge_account_frames
+from ticket_viewer.viewer import get_names, get_tickets, open_name_directory, process_select_ticket, sync_ticket_cache
+
+class TestNameDirectory(TestCase):
+    def setUp(self) -> None:
+        TestNameDirectory.names = NameDirectory(maxsize=3)
+
+    def test_with_include(self):
+        self.assertEqual(with_include('https://x/api/v2/tickets.json?per_page=100', 'users'), 'https://x/api/v2/tickets.json?per_page=100&include=users')
+        self.assertEqual(with_include('https://x/api/v2/tickets/1.json', 'users'), 'https://x/api/v2/tickets/1.json?include=users')
+        self.assertEqual(with_include('https://x/api/v2/tickets.json?include=users', 'users'), 'https://x/api/v2/tickets.json?include=users')
+        self.assertEqual(with_include('https://x/api/v2/tickets.json', None), 'https://x/api/v2/tickets.json')
+
+    def test_add_page_and_labels(self):
+        names = TestNameDirectory.names
+        names.add_page({'tickets': [], 'users': [{'id': 1, 'name': 'Ann', 'email': 'ann@abc.com'}, (2, 'Bob')], 'organizations': [(7, 'Acme')]})
+        self.assertEqual((names.get('users', 1), names.get('users', 2), names.get('organizations', 7)), ('Ann', 'Bob', 'Acme'))
+        self.assertEqual((names.label('assignee_id', 2), names.label('assignee_id', 9)), ('Bob', '9'))
+        self.assertEqual((names.describe('organization_id', 7), names.describe('submitter_id', 9), names.describe('submitter_id', None)), ('Acme (7)', 9, None))
+
+    def test_least_recently_used_evicted(self):
+        names = TestNameDirectory.names
+        names.add('users', [(1, 'Ann'), (2, 'Bob'), (3, 'Cat')])
+        names.get('users', 1)
+        names.add('users', [(4, 'Dan')])
+        self.assertEqual(list(names.names['users']), [3, 1, 4])
+        self.assertIsNone(names.get('users', 2))
+
+    def test_ensure_fetches_only_unknown_ids_once(self):
+        fetch = mock.Mock(return_value=[(2, 'Bob')])
+        names = NameDirectory(fetch=fetch)
+        names.add('users', [(1, 'Ann')])
+        self.assertTrue(names.ensure('users', [1, 2, 3, None, 2]))
+        self.assertTrue(names.ensure('users', [1, 2, 3]))
+        fetch.assert_called_once_with('users', [2, 3])
+        self.assertEqual((names.label('assignee_id', 2), names.label('assignee_id', 3)), ('Bob', '3'))
+
+    def test_ensure_reports_failed_fetch(self):
+        names = NameDirectory(fetch=mock.Mock(return_value=False))
+        self.assertFalse(names.ensure('organizations', [5]))
+        self.assertIsNone(names.get('organizations', 5))
+
+    def test_accounts_keep_their_own_names(self):
+        fetches = {subdomain: mock.Mock(side_effect=lambda kind, ids, subdomain=subdomain: [(record_id, f'{subdomain} {record_id}') for record_id in ids])
+                   for subdomain in ('one', 'two')}
+        names = AccountNames({subdomain: NameDirectory(fetch=fetch) for subdomain, fetch in fetches.items()})
+        frames = []
+        for _ in fetches:
+            builder = TicketFrameBuilder()
+            builder.add_page([{'id': 1, 'subject': 'sub', 'submitter_id': 33, 'assignee_id': 44, 'organization_id': None}])
+            frames.append(builder.build())
+        page_cache = PageRenderCache(merge_account_frames(list(fetches), frames), names=names)
+        lines = page_cache.get(0, 200)[0].split('\n')
+        page_cache.close()
+        # the same ids name different people in each account
+        self.assertEqual([[cell.strip() for cell in line.split('|')[6:8]] for line in lines[3:5]], [['one 33', 'one 44'], ['two 33', 'two 44']])
+        fetches['one'].assert_called_once_with('users', [33, 44])
+        fetches['two'].assert_called_once_with('users', [33, 44])
+        # commands of a single account use the first account's names
+        self.assertEqual(names.label('assignee_id', 44), 'one 44')
+
+    def test_names_persist_in_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = TicketCache(cache_dir, 'testerdomain')
+            NameDirectory(store=cache).add('users', [(1, 'Ann'), (2, 'Bob')])
+            cache.close()
+            cache = TicketCache(cache_dir, 'testerdomain')
+            fetch = mock.Mock()
+            evicting = NameDirectory(maxsize=1, store=cache, fetch=fetch)
+            self.assertEqual(evicting.get('users', 2), 'Bob') # most recent names are read on first use
+            self.assertIsNone(evicting.get('users', 1))
+            evicting.ensure('users', [1]) # evicted names come back from the store without a request
+            self.assertEqual(evicting.get('users', 1), 'Ann')
+            fetch.assert_not_called()
+            cache.invalidate()
+            self.assertEqual(cache.load_names('users'), [])
+            cache.close()
+
+class TestSideloading(TestCase):
+    def setUp(self) -> None:
+        TestSideloading.fake = FakeZendesk(ticket_count=250).start()
+        TestSideloading.client = ZendeskClient('fake', 'tester@abc.com/token', 'testAPIkey', base_url=TestSideloading.fake.base_url)
+
+    def test_names_arrive_with_ticket_pages(self):
+        names = NameDirectory(fetch=mock.Mock())
+        with mock.patch('builtins.print'):
+            tickets = get_tickets(TestSideloading.client, 'all', concurrency=2, names=names)
+        self.assertEqual(len(tickets), 250)
+        self.assertEqual(TestSideloading.fake.request_count, 3)
+        self.assertEqual((names.get('users', 1003), names.get('users', 2004), names.get('organizations', 3001)), ('Customer 3', 'Agent 4', 'Organization 1'))
+        self.assertEqual(len(names), 50 + 7 + 3)
+        names.ensure('users', [ticket['assignee_id'] for ticket in tickets])
+        names.fetch.assert_not_called()
+
+    def test_select_and_sync_sideload(self):
+        names = NameDirectory()
+        ticket = get_tickets(TestSideloading.client, 12, names=names)
+        self.assertEqual(names.get('users', ticket['submitter_id']), 'Customer 12')
+        with mock.patch('builtins.print') as mock_print:
+            process_select_ticket(ticket, names=names)
+        mock_print.assert_any_call('Organization: Organization 0 (3000)\tSubmitted by: Customer 12 (1012)\tAssigned to: Agent 5 (2005)')
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = TicketCache(cache_dir, 'fake')
+            names = open_name_directory(TestSideloading.client, cache)
+            list(sync_ticket_cache(TestSideloading.client, cache, names=names))
+            self.assertEqual(cache.load_names('organizations'), [(3000, 'Organization 0'), (3001, 'Organization 1'), (3002, 'Organization 2')])
+            cache.close()
+
+    def test_get_names_in_bulk(self):
+        with mock.patch('ticket_viewer.viewer.SHOW_MANY_LIMIT', 3):
+            found = get_names(TestSideloading.client, 'users', [1000, 2000, 1001, 99, 2006], concurrency=2)
+        self.assertEqual(sorted(found), [(1000, 'Customer 0'), (1001, 'Customer 1'), (2000, 'Agent 0'), (2006, 'Agent 6')])
+        self.assertEqual(TestSideloading.fake.request_count, 2)
+        self.assertEqual(get_names(TestSideloading.client, 'organizations', [3002]), [(3002, 'Organization 2')])
+
+    def tearDown(self) -> None:
+        TestSideloading.client.close()
+        TestSideloading.fake.stop()
@@ -0,0 +1,96 @@
+import json
+import threading
+from unittest import TestCase, mock
+import pandas as pd
+from ticket_viewer import pipeline
+from ticket_viewer.pipeline import TICKET_FIELDS, decode_ticket_page, project_tickets, to_records
+from ticket_viewer.table import TicketFrameBuilder, TicketPageBuffer, empty_ticket_frame
+from tests import format_page
+
+def make_page(start, stop):
+    return [{'id': i, 'subject': f'sub{i}', 'priority': None, 'status': 'open', 'submitter_id': 33, 'assignee_id': None, 'organization_id': 55, 'description': 'long'}
+            for i in range(start, stop)]
+
+class TestTicketFrameBuilder(TestCase):
+    def test_project_tickets_drops_unused_fields(self):
+        self.assertEqual(list(project_tickets(make_page(1, 2))[0]), list(TICKET_FIELDS))
+        self.assertIn('description', project_tickets(make_page(1, 2), fields=None)[0])
+
+    def test_build_concatenates_pages_in_order(self):
+        builder = TicketFrameBuilder()
+        builder.add_page(make_page(1, 4))
+        builder.add_page(make_page(4, 6))
+        tickets_df = builder.build()
+        self.assertEqual(tickets_df.index.tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(format_page(tickets_df).loc[2].tolist(), ['sub2', 'None', 'open', '33', 'None', '55'])
+        self.assertEqual(tickets_df['status'].cat.categories.tolist(), ['open'])
+
+    def test_build_empty(self):
+        pd.testing.assert_frame_equal(TicketFrameBuilder().build(), empty_ticket_frame())
+
+class TestTicketPageBuffer(TestCase):
+    def test_rows_available_before_download_finishes(self):
+        release = threading.Event()
+
+        def pages():
+            yield make_page(1, 31)
+            release.wait(5)
+            yield make_page(31, 61)
+
+        buffer = TicketPageBuffer(pages())
+        self.assertEqual(buffer.wait_for_rows(25), 30)
+        self.assertEqual(buffer.rows(0, 25).index.tolist(), list(range(1, 26)))
+        self.assertFalse(buffer.is_available(50))
+        self.assertIsNotNone(buffer.time_to_first_page)
+        release.set()
+        self.assertEqual(buffer.rows(25, 50).index.tolist(), list(range(26, 51)))
+        self.assertEqual(len(buffer.frame()), 60)
+
+    def test_rows_past_end_and_failure(self):
+        buffer = TicketPageBuffer(iter([make_page(1, 11), False]))
+        self.assertEqual(len(buffer.rows(0, 25)), 10)
+        self.assertTrue(buffer.rows(25, 50).empty)
+        self.assertFalse(buffer.frame())
+
+    def test_frame_matches_single_build(self):
+        buffer = TicketPageBuffer(iter([make_page(1, 101), make_page(101, 151)]))
+        builder = TicketFrameBuilder()
+        builder.add_page(make_page(1, 151))
+        pd.testing.assert_frame_equal(buffer.frame(), builder.build())
+
+class TestDecodeTicketPage(TestCase):
+    def setUp(self) -> None:
+        TestDecodeTicketPage.tickets = make_page(1, 4)
+        TestDecodeTicketPage.tickets[1]['custom_fields'] = [{'id': 1, 'value': 'x'}]
+        TestDecodeTicketPage.content = json.dumps({'tickets': TestDecodeTicketPage.tickets, 'count': 3, 'next_page': None,
+                                                   'meta': {'has_more': False}}).encode()
+
+    def test_decode_keeps_only_table_fields(self):
+        page_data = decode_ticket_page(TestDecodeTicketPage.content)
+        self.assertEqual(page_data['tickets'], to_records(TestDecodeTicketPage.tickets))
+        self.assertEqual(page_data['count'], 3)
+        self.assertEqual(page_data['meta'], {'has_more': False})
+
+    def test_backends_agree(self):
+        backends = pipeline.JSON_BACKENDS
+        decoded = []
+        for backend in backends:
+            with mock.patch('ticket_viewer.pipeline.JSON_BACKEND', backend):
+                decoded.append(decode_ticket_page(TestDecodeTicketPage.content)['tickets'])
+        self.assertTrue(all(tickets == decoded[0] for tickets in decoded))
+
+    def test_sideloads_decoded_as_pairs(self):
+        content = json.dumps({'tickets': TestDecodeTicketPage.tickets, 'users': [{'id': 33, 'name': 'Ann', 'email': 'ann@abc.com'}],
+                              'organizations': [{'id': 55, 'name': 'Acme', 'tags': []}]}).encode()
+        for backend in pipeline.JSON_BACKENDS:
+            with mock.patch('ticket_viewer.pipeline.JSON_BACKEND', backend):
+                page_data = decode_ticket_page(content)
+            self.assertEqual((page_data['users'], page_data['organizations']), ([(33, 'Ann')], [(55, 'Acme')]))
+        self.assertNotIn('users', decode_ticket_page(TestDecodeTicketPage.content))
+
+    def test_builder_accepts_records_and_dicts(self):
+        from_records = TicketFrameBuilder()
+        from_records.add_page(to_records(TestDecodeTicketPage.tickets))
+        from_dicts = TicketFrameBuilder()
+        from_dicts.add_page(TestDecodeTicketPage.tickets)
+        pd.testing.assert_frame_equal(from_records.build(), from_dicts.build())
@@ -0,0 +1,192 @@
+import threading
+from unittest import TestCase, mock
+import pandas as pd
+from tabulate import tabulate
+from tests.fake_zendesk import make_ticket
+from ticket_viewer.names import NameDirectory
+from ticket_viewer.table import TicketFrameBuilder, TicketPageBuffer
+from tests import format_page
+from ticket_viewer.render import PageRenderCache, TableLayout
+
+def make_df(count):
+    return pd.DataFrame({'id': range(1, count + 1), 'subject': [f'sub{i}' for i in range(1, count + 1)]}).set_index('id')
+
+def make_tickets(start, stop):
+    return [{'id': i, 'subject': 'sub' * i, 'priority': (None, 'low', 'high')[i % 3], 'status': 'open', 'submitter_id': 33,
+             'assignee_id': None if i % 4 == 0 else 44, 'organization_id': 55} for i in range(start, stop)]
+
+class TestTableLayout(TestCase):
+    def setUp(self) -> None:
+        builder = TicketFrameBuilder()
+        builder.add_page(make_tickets(1, 12))
+        TestTableLayout.tickets_df = builder.build()
+
+    def test_render_matches_tabulate_pretty(self):
+        tickets_df = TestTableLayout.tickets_df
+        expected = tabulate(format_page(tickets_df), headers='keys', tablefmt='pretty')
+        self.assertEqual(TableLayout.fit(tickets_df, 200).render(tickets_df), expected)
+
+    def test_widths_fixed_across_pages(self):
+        tickets_df = TestTableLayout.tickets_df
+        layout = TableLayout.fit(tickets_df, 200)
+        first_page = layout.render(tickets_df.iloc[:3]).split('\n')
+        last_page = layout.render(tickets_df.iloc[8:]).split('\n')
+        self.assertEqual({len(line) for line in first_page + last_page}, {len(first_page[0])})
+        self.assertEqual(first_page[0], last_page[0])
+        self.assertIn('None', last_page[3])
+
+    def test_text_truncated_to_terminal_width(self):
+        tickets_df = TestTableLayout.tickets_df
+        lines = TableLayout.fit(tickets_df, 90).render(tickets_df).split('\n')
+        self.assertTrue(all(len(line) <= 90 for line in lines))
+        self.assertIn('subsubsubsu... ', lines[-2])
+
+    def test_partial_layout_reserves_room_for_later_pages(self):
+        layout = TableLayout.fit(TestTableLayout.tickets_df.iloc[:2], 200, complete=False)
+        self.assertEqual(layout.widths[0], len('id'))
+        self.assertEqual(layout.widths[3], len('pending'))
+        self.assertEqual(TableLayout.fit(TestTableLayout.tickets_df.iloc[:2], 200, complete=False, names=NameDirectory()).widths[6], 20)
+
+    def test_partial_layout_gives_reserved_room_to_subjects(self):
+        builder = TicketFrameBuilder()
+        builder.add_page([make_ticket(ticket_id) for ticket_id in range(101, 126)])
+        tickets_df = builder.build()
+        names = NameDirectory()
+        names.add('users', [(1000 + number, f'Customer {number}') for number in range(50)] + [(2000 + number, f'Agent {number}') for number in range(7)])
+        names.add('organizations', [(3000 + number, f'Organization {number}') for number in range(3)])
+        for width in (80, 100):
+            lines = TableLayout.fit(tickets_df, width, complete=False, names=names).render(tickets_df).split('\n')
+            self.assertTrue(all(len(line) <= width for line in lines))
+        self.assertEqual([cell.strip() for cell in lines[3].split('|')[1:3]], ['101', 'Sample ticket 101'])
+
+    def test_widened_to_longer_ids(self):
+        tickets_df = TestTableLayout.tickets_df
+        layout = TableLayout.fit(tickets_df.iloc[8:10], 100, complete=False)
+        self.assertIs(layout.widened(tickets_df.iloc[2:5]), layout)
+        builder = TicketFrameBuilder()
+        builder.add_page([dict(ticket, id=ticket['id'] * 10 ** 6, submitter_id=12345678901234) for ticket in make_tickets(1, 3)])
+        paged_df = builder.build()
+        wider = layout.widened(paged_df)
+        # the subject gives up the room the longer ids take
+        self.assertEqual([wider.widths[0], wider.widths[1], wider.widths[4]], [len('2000000'), layout.widths[1] - 7, len('12345678901234')])
+        lines = wider.render(paged_df).split('\n')
+        self.assertTrue(all(len(line) <= 100 for line in lines))
+        self.assertEqual([line.split('|')[1].strip() for line in lines[3:5]], ['1000000', '2000000'])
+
+    def test_names_shown_instead_of_ids(self):
+        tickets_df = TestTableLayout.tickets_df
+        names = NameDirectory(fetch=mock.Mock(side_effect=lambda kind, ids: [(44, 'Agent Smith')] if kind == 'users' else []))
+        names.add('users', [(33, 'Ann')])
+        page_cache = PageRenderCache(tickets_df, names=names)
+        lines = page_cache.get(0, 200)[0].split('\n')
+        page_cache.close()
+        self.assertEqual(names.fetch.call_args_list, [mock.call('users', [44]), mock.call('organizations', [55])])
+        self.assertEqual([header.strip() for header in lines[1].split('|')[5:8]], ['submitter', 'assignee', 'organization'])
+        self.assertEqual([cell.strip() for cell in lines[3].split('|')[5:8]], ['Ann', 'Agent Smith', '55'])
+        self.assertEqual([cell.strip() for cell in lines[6].split('|')[5:8]], ['Ann', 'None', '55'])
+        self.assertEqual(len(lines[1].split('|')[6]), len(' Agent Smith ')) # the first page's names are known before the layout is fitted
+        self.assertEqual(TableLayout.fit(tickets_df, 200, names=NameDirectory()).widths[6], 20) # room for names requested later
+
+class TestPageRenderCache(TestCase):
+    def setUp(self) -> None:
+        TestPageRenderCache.page_cache = PageRenderCache(make_df(60), page_size=25, maxsize=2)
+
+    def test_get_renders_once_per_page_and_width(self):
+        page_cache = TestPageRenderCache.page_cache
+        with mock.patch.object(TableLayout, 'render', autospec=True, side_effect=TableLayout.render) as mock_render:
+            page, row_count = page_cache.get(0, 80)
+            self.assertEqual(page_cache.get(0, 80), (page, 25))
+            self.assertEqual(mock_render.call_count, 1)
+            page_cache.get(0, 120)
+            self.assertEqual(mock_render.call_count, 2)
+        self.assertIn('sub25', page)
+        self.assertEqual(page_cache.get(2, 80)[1], 10)
+        self.assertEqual(page_cache.get(3, 80)[1], 0)
+
+    def test_least_recently_used_page_evicted(self):
+        page_cache = TestPageRenderCache.page_cache
+        page_cache.get(0, 80)
+        page_cache.get(1, 80)
+        page_cache.get(0, 80)
+        page_cache.get(2, 80)
+        self.assertEqual(list(page_cache.pages), [(0, 80), (2, 80)])
+
+    def test_prefetch_renders_neighbours(self):
+        page_cache = TestPageRenderCache.page_cache
+        page_cache.prefetch(0, 80)
+        page_cache.executor.shutdown(wait=True)
+        self.assertEqual(list(page_cache.pages), [(1, 80)])
+        with mock.patch.object(TableLayout, 'render') as mock_render:
+            self.assertEqual(page_cache.get(1, 80)[1], 25)
+            mock_render.assert_not_called()
+
+    def test_page_count(self):
+        self.assertEqual(TestPageRenderCache.page_cache.page_count(), 3)
+        self.assertEqual(PageRenderCache(make_df(0)).page_count(), 1)
+
+    def test_buffer_layout_fitted_to_first_page(self):
+        release = threading.Event()
+        def pages():
+            yield make_tickets(1, 26)
+            release.wait(5)
+            yield make_tickets(26, 31)
+        buffer = TicketPageBuffer(pages())
+        buffer.wait_for_rows(25)
+        page_cache = PageRenderCache(buffer)
+        first_page = page_cache.get(0, 300)[0]
+        release.set()
+        last_page = page_cache.get(1, 300)[0]
+        self.assertEqual(first_page.split('\n')[0], last_page.split('\n')[0])
+        self.assertIn('subsubsub...', last_page)
+        page_cache.close()
+
+    def test_buffer_layout_widened_for_longer_ids(self):
+        release = threading.Event()
+        def pages():
+            yield make_tickets(1, 26)
+            release.wait(5)
+            yield [dict(ticket, id=ticket['id'] * 1000) for ticket in make_tickets(26, 31)]
+        buffer = TicketPageBuffer(pages())
+        buffer.wait_for_rows(25)
+        page_cache = PageRenderCache(buffer)
+        first_page = page_cache.get(0, 300)[0]
+        release.set()
+        buffer.wait_for_rows(30)
+        last_page = page_cache.get(1, 300)[0]
+        self.assertIn(' 30000 ', last_page)
+        # the first page is rendered again with the wider ids, so the columns line up across pages
+        self.assertNotEqual(first_page.split('\n')[0], last_page.split('\n')[0])
+        self.assertEqual(page_cache.get(0, 300)[0].split('\n')[0], last_page.split('\n')[0])
+        page_cache.close()
+
+    def tearDown(self) -> None:
+        TestPageRenderCache.page_cache.close()
+
+    def test_prefetch_running_during_widen_not_kept(self):
+        release = threading.Event()
+        def pages():
+            yield make_tickets(1, 51)
+            release.wait(5)
+            yield [dict(ticket, id=ticket['id'] * 1000) for ticket in make_tickets(51, 56)]
+        buffer = TicketPageBuffer(pages())
+        buffer.wait_for_rows(50)
+        page_cache = PageRenderCache(buffer)
+        layout = page_cache.layout(300)
+        rendering, finish_render = threading.Event(), threading.Event()
+        def render(paged_df):
+            rendering.set()
+            finish_render.wait(5)
+            return TableLayout.render(layout, paged_df)
+        with mock.patch.object(layout, 'render', side_effect=render):
+            page_cache.prefetch(0, 300)
+            self.assertTrue(rendering.wait(5))
+            release.set()
+            buffer.wait_for_rows(55)
+            last_page = page_cache.get(2, 300)[0]
+            prefetched = page_cache.pending[(1, 300)]
+            finish_render.set()
+            prefetched.result()
+        # the page prefetched with the old layout is dropped, not shown with columns out of line
+        self.assertNotIn((1, 300), page_cache.pages)
+        self.assertEqual(page_cache.get(1, 300)[0].split('\n')[0], last_page.split('\n')[0])
+        page_cache.close()
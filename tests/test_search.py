@@ -0,0 +1,127 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+from tests.fake_zendesk import FakeZendesk
+from ticket_viewer.cache import TicketCache
+from ticket_viewer.search import SearchIndex, tokenize
+from ticket_viewer.viewer import interface_tool
+
+def make_tickets():
+    return [{'id': 1, 'subject': 'Printer jam', 'description': 'The printer on floor 2 jams on every page.', 'status': 'open'},
+            {'id': 2, 'subject': 'Password reset', 'description': 'I cannot reset my password, the reset email never arrives.', 'status': 'open'},
+            {'id': 3, 'subject': 'Printer toner', 'description': 'Order new toner for the printer, the printer prints faded pages.', 'status': 'solved'},
+            {'id': 4, 'subject': 'Login issue', 'description': 'Login fails after the password change.', 'status': 'new'}]
+
+class TestSearchIndex(TestCase):
+    def setUp(self) -> None:
+        TestSearchIndex.index = SearchIndex()
+        TestSearchIndex.index.add_tickets(make_tickets())
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Can't log-in, Error 503!"), ['can', 't', 'log', 'in', 'error', '503'])
+        self.assertEqual(tokenize(None), [])
+
+    def test_ranks_by_bm25(self):
+        results, total = TestSearchIndex.index.search('printer')
+        self.assertEqual(total, 2)
+        # ticket 3 mentions printer three times, against twice for ticket 1
+        self.assertEqual([ticket_id for ticket_id, _, _ in results], [3, 1])
+        results, total = TestSearchIndex.index.search('password reset')
+        self.assertEqual(([ticket_id for ticket_id, _, _ in results], total), ([2, 4], 2))
+        self.assertEqual(results[0][1], 'Password reset')
+        self.assertEqual(TestSearchIndex.index.search('scanner'), ([], 0))
+
+    def test_limit_and_ties_in_id_order(self):
+        index = SearchIndex()
+        index.add_tickets([{'id': ticket_id, 'subject': 'same words', 'description': None} for ticket_id in (5, 3, 9)])
+        results, total = index.search('same', limit=2)
+        self.assertEqual(([ticket_id for ticket_id, _, _ in results], total), ([3, 5], 3))
+
+    def test_updates_replace_and_deleted_removed(self):
+        index = TestSearchIndex.index
+        index.add_tickets([{'id': 1, 'subject': 'Scanner jam', 'description': 'The scanner jams.', 'status': 'open'},
+                           {'id': 3, 'status': 'deleted'}])
+        self.assertEqual(index.search('printer'), ([], 0))
+        self.assertEqual([ticket_id for ticket_id, _, _ in index.search('jam scanner')[0]], [1])
+        self.assertEqual(len(index), 3)
+
+    def test_compaction_keeps_results(self):
+        index = TestSearchIndex.index
+        for _ in range(600):
+            index.add_tickets(make_tickets())
+        self.assertLess(len(index.doc_tickets), 1100)
+        self.assertEqual([ticket_id for ticket_id, _, _ in index.search('printer')[0]], [3, 1])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            path = os.path.join(index_dir, 'tickets.search')
+            TestSearchIndex.index.version = 7
+            TestSearchIndex.index.save(path)
+            loaded = SearchIndex.load(path)
+            self.assertEqual(loaded.version, 7)
+            self.assertEqual(loaded.search('password reset'), TestSearchIndex.index.search('password reset'))
+            with open(path, 'wb') as index_file:
+                index_file.write(b'not an index')
+            self.assertIsNone(SearchIndex.load(path))
+            self.assertIsNone(SearchIndex.load(os.path.join(index_dir, 'missing.search')))
+
+class TestCacheSearchIndex(TestCase):
+    def setUp(self) -> None:
+        TestCacheSearchIndex.cache_dir = tempfile.TemporaryDirectory()
+        TestCacheSearchIndex.cache = TicketCache(TestCacheSearchIndex.cache_dir.name, 'testerdomain')
+
+    def test_merge_updates_index_and_persists(self):
+        cache = TestCacheSearchIndex.cache
+        cache.merge(make_tickets()[:2])
+        cache.merge(make_tickets()[2:])
+        self.assertEqual(cache.search_index().search('printer')[1], 2)
+        cache.close()
+        self.assertTrue(os.path.exists(cache.search_path))
+        cache = TestCacheSearchIndex.cache = TicketCache(TestCacheSearchIndex.cache_dir.name, 'testerdomain')
+        self.assertEqual([ticket_id for ticket_id, _, _ in cache.search_index().search('password')[0]], [2, 4])
+
+    def test_stale_index_rebuilt_from_cache(self):
+        cache = TestCacheSearchIndex.cache
+        cache.merge(make_tickets())
+        cache.close()
+        # a ticket merged by another process, without the index being saved
+        cache = TicketCache(TestCacheSearchIndex.cache_dir.name, 'testerdomain')
+        with cache.conn:
+            cache.conn.execute("UPDATE sync SET value = value + 1 WHERE key = 'version'")
+            cache.conn.execute("UPDATE tickets SET data = ? WHERE id = 4", ('{"id": 4, "subject": "Scanner", "status": "new"}',))
+        self.assertEqual([ticket_id for ticket_id, _, _ in cache.search_index().search('scanner login')[0]], [4])
+        self.assertEqual(cache.search_index().search('login')[1], 0)
+        TestCacheSearchIndex.cache = cache
+
+    def test_invalidate_clears_index(self):
+        cache = TestCacheSearchIndex.cache
+        cache.merge(make_tickets())
+        cache.mark_synced()
+        cache.invalidate()
+        self.assertEqual(cache.search_index().search('printer'), ([], 0))
+        self.assertFalse(os.path.exists(cache.search_path))
+
+    def tearDown(self) -> None:
+        TestCacheSearchIndex.cache.close()
+        TestCacheSearchIndex.cache_dir.cleanup()
+
+class TestSearchInterface(TestCase):
+    def setUp(self) -> None:
+        TestSearchInterface.fake = FakeZendesk(ticket_count=0).start()
+
+    def test_search_empty_account(self):
+        with mock.patch.dict(os.environ, {'ZCC_BASE_URL': TestSearchInterface.fake.base_url}), \
+             mock.patch('ticket_viewer.viewer.open_ticket_cache', return_value=None), \
+             mock.patch('ticket_viewer.viewer.get_credentials', return_value=('testerdomain', 'tester@abc.com', 'tester1234')), \
+             mock.patch('ticket_viewer.viewer.validate_credentials', return_value=True), \
+             mock.patch('builtins.input', side_effect=['search foo', 'search bar', 'quit']), \
+             mock.patch('builtins.print') as mock_print:
+            interface_tool()
+        printed = [call.args[0] for call in mock_print.call_args_list if call.args]
+        self.assertIn("No tickets match 'foo'.", printed)
+        self.assertIn("No tickets match 'bar'.", printed)
+        # the empty index is kept for the session rather than downloaded again
+        self.assertEqual(TestSearchInterface.fake.request_count, 1)
+
+    def tearDown(self) -> None:
+        TestSearchInterface.fake.stop()
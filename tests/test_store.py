@@ -0,0 +1,116 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+import numpy as np
+import pandas as pd
+from tests.fake_zendesk import make_ticket
+from ticket_viewer.cache import TicketCache
+from ticket_viewer.pipeline import TICKET_FIELDS
+from ticket_viewer.summary import SUMMARY_FIELDS
+from ticket_viewer.table import TicketFrameBuilder, empty_ticket_frame, merge_account_frames
+from ticket_viewer.store import open_table, write_table
+from ticket_viewer.viewer import process_all_tickets
+
+def is_mapped(values):
+    """Tells if an array is a view of a memory-mapped file"""
+    while values is not None and not isinstance(values, np.memmap):
+        values = values.base
+    return values is not None
+
+class TestTableStore(TestCase):
+    def setUp(self) -> None:
+        TestTableStore.temp_dir = tempfile.TemporaryDirectory()
+        TestTableStore.path = os.path.join(TestTableStore.temp_dir.name, 'tickets.table')
+        tickets = [make_ticket(ticket_id) for ticket_id in range(1, 101)]
+        tickets[3]['subject'] = None
+        tickets[5]['subject'] = 'Café ✓ réunion'
+        TestTableStore.tickets_df = process_all_tickets(tickets)
+
+    def assert_same_table(self, stored_df, tickets_df):
+        # text columns may come back Arrow-backed, every value and missing value is the same
+        pd.testing.assert_frame_equal(stored_df, tickets_df, check_dtype=False)
+        self.assertEqual([str(dtype) for dtype in stored_df.dtypes], [str(dtype) for dtype in tickets_df.dtypes])
+
+    def test_round_trip(self):
+        write_table(TestTableStore.path, TestTableStore.tickets_df, version=3)
+        stored_df = open_table(TestTableStore.path, version=3)
+        self.assert_same_table(stored_df, TestTableStore.tickets_df)
+        self.assertEqual((stored_df.loc[4, 'subject'], stored_df.loc[6, 'subject']), (pd.NA, 'Café ✓ réunion'))
+        # ids and user/organization ids are used straight from the mapped file
+        self.assertTrue(is_mapped(stored_df.index.to_numpy()))
+        self.assertTrue(is_mapped(stored_df['assignee_id'].array._data))
+
+    def test_other_tables(self):
+        frames = {'empty': empty_ticket_frame(), 'merged': merge_account_frames(['one', 'two'], [TestTableStore.tickets_df] * 2)}
+        builder = TicketFrameBuilder(SUMMARY_FIELDS)
+        builder.add_page([dict(make_ticket(1), updated_at=None), make_ticket(2)])
+        frames['summary'] = builder.build()
+        for name, tickets_df in frames.items():
+            with self.subTest(name):
+                write_table(TestTableStore.path, tickets_df)
+                self.assert_same_table(open_table(TestTableStore.path), tickets_df)
+
+    def test_strings_without_arrow(self):
+        write_table(TestTableStore.path, TestTableStore.tickets_df)
+        with mock.patch('ticket_viewer.store.ARROW_AVAILABLE', False):
+            stored_df = open_table(TestTableStore.path)
+        self.assertEqual(stored_df['subject'].tolist(), TestTableStore.tickets_df['subject'].tolist())
+
+    def test_stale_or_unreadable(self):
+        self.assertIsNone(open_table(TestTableStore.path))
+        write_table(TestTableStore.path, TestTableStore.tickets_df, version=3)
+        self.assertIsNone(open_table(TestTableStore.path, version=4))
+        with open(TestTableStore.path, 'wb') as table_file:
+            table_file.write(b'not a table')
+        self.assertIsNone(open_table(TestTableStore.path))
+
+    def tearDown(self) -> None:
+        TestTableStore.temp_dir.cleanup()
+
+class TestCachedTableStore(TestCase):
+    def setUp(self) -> None:
+        TestCachedTableStore.cache_dir = tempfile.TemporaryDirectory()
+        TestCachedTableStore.cache = TicketCache(TestCachedTableStore.cache_dir.name, 'testerdomain')
+        TestCachedTableStore.cache.merge([make_ticket(ticket_id) for ticket_id in range(1, 51)])
+
+    def test_table_reopened_by_next_session(self):
+        cache = TestCachedTableStore.cache
+        tickets_df = cache.ticket_table(TICKET_FIELDS)
+        self.assertTrue(os.path.exists(cache.table_path(TICKET_FIELDS)))
+        cache.close()
+        cache = TestCachedTableStore.cache = TicketCache(TestCachedTableStore.cache_dir.name, 'testerdomain')
+        with mock.patch.object(cache, 'iter_pages') as mock_pages:
+            pd.testing.assert_frame_equal(cache.ticket_table(TICKET_FIELDS), tickets_df, check_dtype=False)
+        mock_pages.assert_not_called()
+        # a changed cache writes the rebuilt table over the stale one
+        cache.merge([make_ticket(51)])
+        cache._tables = {}
+        self.assertEqual(len(cache.ticket_table(TICKET_FIELDS)), 51)
+        self.assertEqual(len(open_table(cache.table_path(TICKET_FIELDS), version=cache.version)), 51)
+        cache.invalidate()
+        self.assertFalse(os.path.exists(cache.table_path(TICKET_FIELDS)))
+
+    def test_stored_table_patched_with_synced_changes(self):
+        cache = TestCachedTableStore.cache
+        cache.ticket_table(TICKET_FIELDS)
+        cache.close()
+        cache = TestCachedTableStore.cache = TicketCache(TestCachedTableStore.cache_dir.name, 'testerdomain')
+        cache.merge([dict(make_ticket(3), subject='changed'), make_ticket(51)])
+        cache.merge([dict(make_ticket(7), status='deleted')])
+        # only the tickets merged since the stored table was written are decoded
+        with mock.patch.object(cache, 'iter_pages') as mock_pages:
+            tickets_df = cache.ticket_table(TICKET_FIELDS)
+        mock_pages.assert_not_called()
+        expected_df = process_all_tickets([ticket for ticket in map(make_ticket, range(1, 52)) if ticket['id'] != 7])
+        expected_df.loc[3, 'subject'] = 'changed'
+        pd.testing.assert_frame_equal(tickets_df.astype(object), expected_df.astype(object))
+        pd.testing.assert_frame_equal(open_table(cache.table_path(TICKET_FIELDS), version=cache.version).astype(object), expected_df.astype(object))
+        self.assertEqual(cache.conn.execute('SELECT COUNT(*) FROM changes').fetchone(), (0,))
+        # most of the table changing rebuilds it instead
+        cache.merge([dict(make_ticket(ticket_id), subject='again') for ticket_id in range(1, 40)])
+        self.assertEqual(cache.patch_table(TICKET_FIELDS, tickets_df, cache.version - 1, cache.version), None)
+        self.assertEqual(cache.ticket_table(TICKET_FIELDS).loc[39, 'subject'], 'again')
+
+    def tearDown(self) -> None:
+        TestCachedTableStore.cache.close()
+        TestCachedTableStore.cache_dir.cleanup()
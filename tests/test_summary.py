@@ -0,0 +1,106 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+from tests.fake_zendesk import BASE_TIME, FakeZendesk, iso_time, make_ticket
+from ticket_viewer.cache import TicketCache
+from ticket_viewer.names import NameDirectory
+from ticket_viewer.summary import DAY, SUMMARY_FIELDS, summarize
+from ticket_viewer.table import TicketFrameBuilder, empty_ticket_frame
+from ticket_viewer.viewer import interface_tool, print_summary
+
+def summary_ticket(ticket_id, priority, status, assignee_id, organization_id, created_days, updated_days):
+    """Builds a ticket of SUMMARY_FIELDS created and updated the given number of days before BASE_TIME"""
+    return {'id': ticket_id, 'priority': priority, 'status': status, 'assignee_id': assignee_id, 'organization_id': organization_id,
+            'created_at': iso_time(BASE_TIME - created_days * DAY), 'updated_at': iso_time(BASE_TIME - updated_days * DAY)}
+
+class TestSummarize(TestCase):
+    def setUp(self) -> None:
+        builder = TicketFrameBuilder(SUMMARY_FIELDS)
+        builder.add_page([summary_ticket(1, 'high', 'open', 7, None, 10, 1), summary_ticket(2, None, 'solved', 7, 5, 20, 3)])
+        builder.add_page([summary_ticket(3, 'low', 'new', None, 5, 2, 2)])
+        TestSummarize.tickets_df = builder.build()
+
+    def test_time_columns(self):
+        tickets_df = TestSummarize.tickets_df
+        self.assertEqual(list(tickets_df.columns), list(SUMMARY_FIELDS[1:]))
+        self.assertEqual(tickets_df.loc[3, 'created_at'].timestamp(), BASE_TIME - 2 * DAY)
+        self.assertEqual(tickets_df.dtypes.astype(str).to_dict(), empty_ticket_frame(SUMMARY_FIELDS).dtypes.astype(str).to_dict())
+
+    def test_counts(self):
+        summary = summarize(TestSummarize.tickets_df, now=BASE_TIME, weeks=2)
+        self.assertEqual((summary['tickets'], summary['open']), (3, 2))
+        self.assertEqual(summary['status'], [('new', 1, 1), ('open', 1, 1), ('solved', 1, 0)])
+        self.assertEqual(summary['priority'], [('low', 1, 1), ('high', 1, 1), (None, 1, 0)])
+        self.assertEqual(summary['assignee_id'], [(7, 2, 1), (None, 1, 1)])
+        self.assertEqual(summary['organization_id'], [(5, 2, 1), (None, 1, 1)])
+        self.assertEqual(summarize(TestSummarize.tickets_df, now=BASE_TIME, top=1)['assignee_id'], [(7, 2, 1)])
+
+    def test_ages_and_trend(self):
+        summary = summarize(TestSummarize.tickets_df, now=BASE_TIME, weeks=2)
+        self.assertEqual((summary['age_days']['p50'], summary['age_days']['max']), (6, 10))
+        self.assertEqual((summary['idle_days']['p50'], summary['idle_days']['max']), (1.5, 2))
+        self.assertEqual(summary['trend'], [{'week_start': BASE_TIME - 14 * DAY, 'created': 1, 'solved': 0, 'open': 2},
+                                            {'week_start': BASE_TIME - 7 * DAY, 'created': 1, 'solved': 1, 'open': 2}])
+
+    def test_empty_table(self):
+        summary = summarize(empty_ticket_frame(SUMMARY_FIELDS), now=BASE_TIME)
+        self.assertEqual((summary['tickets'], summary['open'], summary['status'], summary['age_days']), (0, 0, [], None))
+        with mock.patch('builtins.print') as mock_print:
+            print_summary(summary)
+        mock_print.assert_called_once_with('No tickets to summarize.')
+
+    def test_print_summary(self):
+        names = NameDirectory()
+        names.add('users', [(7, 'Jane Agent')])
+        with mock.patch('builtins.print') as mock_print:
+            print_summary(summarize(TestSummarize.tickets_df, now=BASE_TIME, weeks=2), names=names)
+        printed = [call.args[0] if call.args else '' for call in mock_print.call_args_list]
+        self.assertEqual(printed[0], '3 tickets, 2 open')
+        self.assertIn('Jane Agent            2         1', printed)
+        self.assertIn('unassigned            1         1', printed)
+        self.assertIn('Open ticket age (days): p50 6.0  p90 9.2  p99 9.9  max 10.0', printed)
+        self.assertEqual(printed[-2:], ['2021-11-12           1         0         2', '2021-11-19           1         1         2'])
+
+class TestSummaryTable(TestCase):
+    def setUp(self) -> None:
+        TestSummaryTable.cache_dir = tempfile.TemporaryDirectory()
+        TestSummaryTable.cache = TicketCache(TestSummaryTable.cache_dir.name, 'testerdomain')
+
+    def test_table_reused_until_cache_changes(self):
+        cache = TestSummaryTable.cache
+        cache.merge([make_ticket(ticket_id) for ticket_id in range(1, 6)])
+        tickets_df = cache.ticket_table(SUMMARY_FIELDS)
+        self.assertEqual(list(tickets_df.index), [1, 2, 3, 4, 5])
+        with mock.patch.object(cache, 'iter_pages') as mock_pages:
+            self.assertIs(cache.ticket_table(SUMMARY_FIELDS), tickets_df)
+        mock_pages.assert_not_called()
+        cache.merge([make_ticket(6)])
+        self.assertEqual(len(cache.ticket_table(SUMMARY_FIELDS)), 6)
+        cache.invalidate()
+        self.assertEqual(len(cache.ticket_table(SUMMARY_FIELDS)), 0)
+
+    def tearDown(self) -> None:
+        TestSummaryTable.cache.close()
+        TestSummaryTable.cache_dir.cleanup()
+
+class TestSummaryCommand(TestCase):
+    def setUp(self) -> None:
+        TestSummaryCommand.fake = FakeZendesk(ticket_count=100).start()
+
+    def test_summary_command(self):
+        with mock.patch.dict(os.environ, {'ZCC_BASE_URL': TestSummaryCommand.fake.base_url}), \
+             mock.patch('ticket_viewer.viewer.open_ticket_cache', return_value=None), \
+             mock.patch('ticket_viewer.viewer.get_credentials', return_value=('testerdomain', 'tester@abc.com', 'tester1234')), \
+             mock.patch('ticket_viewer.viewer.validate_credentials', return_value=True), \
+             mock.patch('builtins.input', side_effect=['summary', 'summary', 'quit']), \
+             mock.patch('builtins.print') as mock_print:
+            interface_tool()
+        printed = [call.args[0] for call in mock_print.call_args_list if call.args]
+        self.assertEqual(printed.count('100 tickets, 60 open'), 2)
+        self.assertIn('closed         20         0', printed)
+        self.assertIn('Agent 2              14         9', printed)
+        # without a cache the tickets are downloaded once, the second summary reuses them
+        self.assertEqual(TestSummaryCommand.fake.request_count, 1)
+
+    def tearDown(self) -> None:
+        TestSummaryCommand.fake.stop()
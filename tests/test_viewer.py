@@ -1,15 +1,29 @@
 import contextlib
 import io
 from unittest import TestCase, mock
+import pandas as pd
 from pandas.api.types import is_string_dtype
 import os
+import subprocess
+import sys
+import tempfile
+import threading
 from ticket_viewer.viewer import *
+from ticket_viewer.table import TicketPageBuffer
+from tests import format_page
+from tests.fake_zendesk import FakeZendesk
+
+def respond_then_fail(*responses):
+    # fake server responses served in order, then a persistent 500
+    responses = list(responses)
+    return lambda path, query: responses.pop(0) if responses else (500, {})
 
 class TestCredentials(TestCase):
     def setUp(self) -> None:
         TestCredentials.subdomain = 'testerdomain'
         TestCredentials.email = 'tester@abc.com'
         TestCredentials.api_key = 'testAPIkey'
+        TestCredentials.client = ZendeskClient(TestCredentials.subdomain, TestCredentials.email, TestCredentials.api_key)
 
     def test_get_credentials_returns_str(self):
         subdomain, email, password = get_credentials()
@@ -30,20 +44,28 @@ class TestCredentials(TestCase):
                 mock_getenv.assert_has_calls(env_calls)
     
     def test_validate_credentials_fail(self):
-        with mock.patch('ticket_viewer.viewer.requests.get') as mock_request:
+        with mock.patch.object(TestCredentials.client.session, 'get') as mock_request:
             mock_request.return_value.status_code = 404
-            fake_credentials = validate_credentials(TestCredentials.subdomain, TestCredentials.email, TestCredentials.api_key)
+            fake_credentials = validate_credentials(TestCredentials.client)
         self.assertFalse(fake_credentials)
 
     def test_validate_credentials_pass(self):
-        with mock.patch('ticket_viewer.viewer.requests.get') as mock_request:
+        with mock.patch.object(TestCredentials.client.session, 'get') as mock_request:
             mock_request.return_value.status_code = 200
-            true_credentials = validate_credentials(TestCredentials.subdomain, TestCredentials.email, TestCredentials.api_key)
-            mock_request.assert_called_once()
+            true_credentials = validate_credentials(TestCredentials.client)
+            mock_request.assert_called_once_with('https://testerdomain.zendesk.com/api/v2/tickets.json', timeout=TestCredentials.client.timeout)
         self.assertTrue(true_credentials)
+
+    def test_validate_credentials_shares_session_with_get_tickets(self):
+        with mock.patch.object(TestCredentials.client.session, 'get') as mock_request:
+            mock_request.return_value.status_code = 200
+            mock_request.return_value.json.return_value = {"ticket": "mock ticket"}
+            validate_credentials(TestCredentials.client)
+            get_tickets(TestCredentials.client, 1)
+            self.assertEqual(mock_request.call_count, 2)
     
     def tearDown(self) -> None:
-        pass
+        TestCredentials.client.close()
     
 class TestInterfaceActions(TestCase):
     def setUp(self) -> None:
@@ -53,10 +75,40 @@ class TestInterfaceActions(TestCase):
         self.assertIsNone(menu_action())
     
     def test_load_select_ticket_differentiate_commands(self):
-        test_cases = ['select 1', 'select 222', 'select 33', 'select 5 ', 'select  3', 'select 3 4', 'select ', 'select a', 'select 3A', 'select 5,2']
-        test_answers = [1, 222, 33, 5, 3, 34, False, False, False, False]
+        test_cases = ['select 1', 'select 222', 'select 33', 'select 5 ', 'select  3', 'select 3 4', 'select ', 'select a', 'select 3A', 'select 5,2',
+                      'select 2-4 9', 'select 4-2', 'select 3-', 'select 1 1-2', 'select 1-1001']
+        test_answers = [1, 222, 33, 5, 3, [3, 4], False, False, False, [5, 2], [2, 3, 4, 9], False, False, [1, 2], False]
         test_results = [load_select_ticket(test_case) for test_case in test_cases]
         [self.assertEqual(value, test_answers[index]) for index, value in enumerate(test_results)]
+
+    def test_load_select_ticket_rejects_before_expanding(self):
+        with mock.patch('builtins.print') as mock_print, mock.patch('ticket_viewer.viewer.range', create=True, side_effect=range) as mock_range:
+            self.assertFalse(load_select_ticket('select 1-50000000'))
+            self.assertFalse(load_select_ticket('select 1-600 700-1200'))
+        # the 50 million ids are never built, only the first range of 600 ids is
+        self.assertEqual([call.args for call in mock_range.call_args_list], [(1, 601)])
+        mock_print.assert_called_with(f'Select command understood but at most {MAX_SELECT_TICKETS} tickets can be selected at once. Please try again.')
+        with mock.patch('builtins.print') as mock_print:
+            self.assertFalse(load_select_ticket('select 9-3'))
+        mock_print.assert_called_once_with("Select command understood but range '9-3' is reversed, use 3-9. Please try again.")
+
+    def test_load_filter_command(self):
+        test_cases = ['filter', 'filter status=open priority=urgent assignee=123', 'filter org=none', 'filter organization_id=7',
+                      'filter assignee=abc', 'filter colour=red', 'filter status', 'filter status=', 'filter subdomain=beta status=new']
+        test_answers = [{}, {'status': 'open', 'priority': 'urgent', 'assignee_id': 123}, {'organization_id': None}, {'organization_id': 7},
+                        False, False, False, False, {'subdomain': 'beta', 'status': 'new'}]
+        with mock.patch('builtins.print'):
+            test_results = [load_filter_command(test_case) for test_case in test_cases]
+        [self.assertEqual(value, test_answers[index]) for index, value in enumerate(test_results)]
+
+    def test_load_sort_command(self):
+        test_cases = ['sort', 'sort priority', 'sort -priority', 'sort assignee desc', 'sort subject asc', 'sort colour', 'sort id down', 'sort id desc x',
+                      'sort subdomain desc']
+        test_answers = [('id', False), ('priority', False), ('priority', True), ('assignee_id', True), ('subject', False), False, False, False,
+                        ('subdomain', True)]
+        with mock.patch('builtins.print'):
+            test_results = [load_sort_command(test_case) for test_case in test_cases]
+        [self.assertEqual(value, test_answers[index]) for index, value in enumerate(test_results)]
                                                     
     def tearDown(self) -> None:
         pass
@@ -66,52 +118,279 @@ class TestTicketsAPI(TestCase):
         TestTicketsAPI.subdomain = 'testerdomain'
         TestTicketsAPI.email = 'tester@abc.com'
         TestTicketsAPI.api_key = 'testAPIkey'
+        TestTicketsAPI.client = ZendeskClient(TestTicketsAPI.subdomain, TestTicketsAPI.email, TestTicketsAPI.api_key)
 
     def test_get_tickets_status_429(self):
-        with mock.patch('ticket_viewer.viewer.requests.get', side_effect = [mock.Mock(status_code=429, headers = {'retry-after': 1}), mock.Mock(status_code=404)]) as mock_request:
-            with mock.patch('ticket_viewer.viewer.time.sleep') as mock_sleep:
+        with mock.patch.object(TestTicketsAPI.client.session, 'get', side_effect = [mock.Mock(status_code=429, headers = {'retry-after': 1}), mock.Mock(status_code=404)]) as mock_request:
+            with mock.patch('ticket_viewer.client.time.sleep') as mock_sleep:
                 mock_sleep.return_value = None
-                tickets = get_tickets(TestTicketsAPI.subdomain, TestTicketsAPI.email, TestTicketsAPI.api_key, 'all')
+                tickets = get_tickets(TestTicketsAPI.client, 'all')
                 mock_sleep.assert_called_once()
 
     def test_get_tickets_status_404(self):
-        with mock.patch('ticket_viewer.viewer.requests.get') as mock_request:
+        with mock.patch.object(TestTicketsAPI.client.session, 'get') as mock_request:
             mock_request.return_value.status_code = 404
-            tickets = get_tickets(TestTicketsAPI.subdomain, TestTicketsAPI.email, TestTicketsAPI.api_key, 'all')
+            tickets = get_tickets(TestTicketsAPI.client, 'all')
             self.assertFalse(tickets)
 
     def test_get_tickets_status_not_200(self):
-        with mock.patch('ticket_viewer.viewer.requests.get') as mock_request:
+        with mock.patch.object(TestTicketsAPI.client.session, 'get') as mock_request:
             mock_request.return_value.status_code = 555
-            tickets = get_tickets(TestTicketsAPI.subdomain, TestTicketsAPI.email, TestTicketsAPI.api_key, 'all')
+            tickets = get_tickets(TestTicketsAPI.client, 'all')
             self.assertFalse(tickets)
             
     def test_get_tickets_return_single_ticket(self):
-        with mock.patch('ticket_viewer.viewer.requests.get') as mock_request:
+        with mock.patch.object(TestTicketsAPI.client.session, 'get') as mock_request:
             mock_request.return_value.status_code = 200
             mock_request.return_value.json.return_value = {"ticket": {"mock ticket"}}
-            tickets = get_tickets(TestTicketsAPI.subdomain, TestTicketsAPI.email, TestTicketsAPI.api_key, 'select 1')
+            tickets = get_tickets(TestTicketsAPI.client, 'select 1')
             self.assertEqual(tickets, {"mock ticket"})
 
     def test_get_tickets_paginate_correctly(self):
-        with mock.patch('ticket_viewer.viewer.requests.get', 
-                        side_effect = [mock.Mock(status_code=200, json=lambda : {"tickets": {"mock"}, "next_page": "mockwebsite.com", "count": 2}),
-                                       mock.Mock(status_code=200, json=lambda : {"tickets": {"mock2"}, "count": 2})]) as mock_request:
-            tickets = get_tickets(TestTicketsAPI.subdomain, TestTicketsAPI.email, TestTicketsAPI.api_key, 'all')
-            mock_request.assert_called_with('mockwebsite.com', auth=('tester@abc.com', 'testAPIkey'), headers={'Accept': 'application/json'})
+        with mock.patch.object(TestTicketsAPI.client.session, 'get', 
+                        side_effect = [mock.Mock(status_code=200, content=b"{}", json=lambda : {"tickets": {"mock"}, "next_page": "mockwebsite.com", "count": 2}),
+                                       mock.Mock(status_code=200, content=b"{}", json=lambda : {"tickets": {"mock2"}, "count": 2})]) as mock_request:
+            tickets = get_tickets(TestTicketsAPI.client, 'all')
+            mock_request.assert_called_with('mockwebsite.com', timeout=TestTicketsAPI.client.timeout)
             self.assertEqual(tickets, ["mock", "mock2"])
         
     def test_get_tickets_print_correct_percent_downloaded(self):
-        with mock.patch('ticket_viewer.viewer.requests.get', 
-                        side_effect = [mock.Mock(status_code=200, json=lambda : {"tickets": {"mock"}, "next_page": "mockwebsite.com", "count": 2}),
-                                       mock.Mock(status_code=200, json=lambda : {"tickets": {"mock2"}, "count": 2})]) as mock_request:
+        with mock.patch.object(TestTicketsAPI.client.session, 'get', 
+                        side_effect = [mock.Mock(status_code=200, content=b"{}", json=lambda : {"tickets": {"mock"}, "next_page": "mockwebsite.com", "count": 2}),
+                                       mock.Mock(status_code=200, content=b"{}", json=lambda : {"tickets": {"mock2"}, "count": 2})]) as mock_request:
             with mock.patch('builtins.print') as mocked_print:
-                _ = get_tickets(TestTicketsAPI.subdomain, TestTicketsAPI.email, TestTicketsAPI.api_key, 'all')
+                _ = get_tickets(TestTicketsAPI.client, 'all')
                 calls = [mock.call('50.0% downloaded...', end='\r'), mock.call('100.0% downloaded...', end='\r')]
                 mocked_print.assert_has_calls(calls)
         
     def tearDown(self) -> None:
-        pass
+        TestTicketsAPI.client.close()
+
+class TestConcurrentFetch(TestCase):
+    def setUp(self):
+        TestConcurrentFetch.fake = FakeZendesk(ticket_count=950, latency=0.02).start()
+        TestConcurrentFetch.client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=TestConcurrentFetch.fake.base_url, requests_per_minute=60000)
+
+    def test_get_tickets_concurrently_keeps_ticket_order(self):
+        with mock.patch('builtins.print'):
+            tickets = get_tickets(TestConcurrentFetch.client, 'all', concurrency=4)
+        self.assertEqual([ticket['id'] for ticket in tickets], list(range(1, 951)))
+        self.assertEqual(TestConcurrentFetch.fake.request_count, 10)
+
+    def test_get_tickets_concurrently_faster_than_sequential(self):
+        with mock.patch('builtins.print'):
+            start = time.perf_counter()
+            sequential = get_tickets(TestConcurrentFetch.client, 'all')
+            sequential_time = time.perf_counter() - start
+            start = time.perf_counter()
+            concurrent = get_tickets(TestConcurrentFetch.client, 'all', concurrency=5)
+            concurrent_time = time.perf_counter() - start
+        self.assertEqual(sequential, concurrent)
+        self.assertLess(concurrent_time, sequential_time)
+
+    def test_pages_follow_server_page_size(self):
+        fake = FakeZendesk(ticket_count=250, max_page_size=40).start()
+        client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=fake.base_url, requests_per_minute=60000)
+        with mock.patch('builtins.print'):
+            for strategy in ('offset', 'cursor'):
+                tickets = get_tickets(client, 'all', concurrency=3, strategy=strategy)
+                self.assertEqual([ticket['id'] for ticket in tickets], list(range(1, 251)))
+        self.assertEqual(fake.request_count, 14)
+        client.close()
+        fake.stop()
+
+    def test_get_tickets_concurrently_page_failure(self):
+        # the third page keeps failing, through every retry of the client
+        with mock.patch.object(TestConcurrentFetch.fake, 'respond', side_effect=respond_then_fail((200, {'tickets': [{'id': 1}], 'count': 300}), (200, {'tickets': [{'id': 2}]}))):
+            with mock.patch('ticket_viewer.client.time.sleep'):
+                with mock.patch('builtins.print'):
+                    self.assertFalse(get_tickets(TestConcurrentFetch.client, 'all', concurrency=2))
+
+    def tearDown(self) -> None:
+        TestConcurrentFetch.client.close()
+        TestConcurrentFetch.fake.stop()
+
+class TestFetchStrategies(TestCase):
+    def setUp(self):
+        TestFetchStrategies.fake = FakeZendesk(ticket_count=250, export_page_size=120).start()
+        TestFetchStrategies.client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=TestFetchStrategies.fake.base_url, requests_per_minute=60000)
+
+    def test_select_fetch_strategy(self):
+        self.assertEqual(select_fetch_strategy(10), 'offset')
+        self.assertEqual(select_fetch_strategy(OFFSET_PAGINATION_LIMIT), 'offset')
+        self.assertEqual(select_fetch_strategy(OFFSET_PAGINATION_LIMIT + 1), 'cursor')
+
+    def test_strategies_return_same_tickets(self):
+        with mock.patch('builtins.print'):
+            offset = get_tickets(TestFetchStrategies.client, 'all', strategy='offset')
+            cursor = get_tickets(TestFetchStrategies.client, 'all', strategy='cursor')
+            incremental = get_tickets(TestFetchStrategies.client, 'all', strategy='incremental')
+        self.assertEqual([ticket['id'] for ticket in offset], list(range(1, 251)))
+        self.assertEqual(cursor, offset)
+        self.assertEqual(incremental, offset)
+
+    def test_auto_strategy_switches_to_cursor_above_offset_cap(self):
+        with mock.patch('ticket_viewer.viewer.OFFSET_PAGINATION_LIMIT', 100):
+            with mock.patch.dict(FETCH_STRATEGIES, {'cursor': mock.Mock(wraps=fetch_cursor_pages)}) as strategies:
+                with mock.patch('builtins.print'):
+                    tickets = get_tickets(TestFetchStrategies.client, 'all')
+                strategies['cursor'].assert_called_once()
+        self.assertEqual(len(tickets), 250)
+
+    def test_incremental_keeps_latest_version_and_drops_deleted(self):
+        pages = [{'tickets': [{'id': 2, 'status': 'open'}, {'id': 1, 'status': 'open'}], 'end_time': 5},
+                 {'tickets': [{'id': 2, 'status': 'solved'}, {'id': 3, 'status': 'deleted'}], 'end_time': 9}]
+        with mock.patch.dict(FETCH_STRATEGIES, {'incremental': lambda client, **kwargs: iter(pages)}):
+            with mock.patch('builtins.print') as mocked_print:
+                tickets = get_tickets(TestFetchStrategies.client, 'all', strategy='incremental')
+                mocked_print.assert_called_with('4 tickets downloaded...', end='\r')
+        self.assertEqual(tickets, [{'id': 1, 'status': 'open'}, {'id': 2, 'status': 'solved'}])
+
+    def tearDown(self) -> None:
+        TestFetchStrategies.client.close()
+        TestFetchStrategies.fake.stop()
+
+class TestSelectMany(TestCase):
+    def setUp(self):
+        TestSelectMany.fake = FakeZendesk(ticket_count=250).start()
+        TestSelectMany.client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=TestSelectMany.fake.base_url, requests_per_minute=60000)
+
+    def test_get_many_tickets_chunks_of_100_in_requested_order(self):
+        ticket_ids = list(range(250, 0, -1))
+        with mock.patch.object(TestSelectMany.client, 'get', wraps=TestSelectMany.client.get) as mock_get:
+            tickets = get_tickets(TestSelectMany.client, ticket_ids, concurrency=3)
+        self.assertEqual([ticket['id'] for ticket in tickets], ticket_ids)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertTrue(all('show_many.json?ids=' in call[0][0] for call in mock_get.call_args_list))
+
+    def test_get_many_tickets_reports_missing(self):
+        with mock.patch('builtins.print') as mocked_print:
+            tickets = get_tickets(TestSelectMany.client, [3, 999, 1])
+            mocked_print.assert_called_once_with('Tickets not found: 999')
+        self.assertEqual([ticket['id'] for ticket in tickets], [3, 1])
+
+    def test_get_many_tickets_api_error(self):
+        with mock.patch.object(TestSelectMany.client.session, 'get') as mock_request:
+            mock_request.return_value.status_code = 400
+            with mock.patch('builtins.print'):
+                self.assertFalse(get_tickets(TestSelectMany.client, list(range(1, 301)), concurrency=2))
+
+    def test_get_selected_tickets_fetches_only_uncached(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = TicketCache(cache_dir, 'fake')
+            cache.merge([TestSelectMany.fake.tickets[1]])
+            with mock.patch('ticket_viewer.viewer.get_tickets', wraps=get_tickets) as mock_get_tickets:
+                tickets = get_selected_tickets(TestSelectMany.client, cache, [1, 2, 3])
+                self.assertEqual(mock_get_tickets.call_args[1]['tickets'], [1, 3])
+            self.assertEqual([ticket['id'] for ticket in tickets], [1, 2, 3])
+            self.assertIsNotNone(cache.get(3))
+            cache.close()
+
+    def tearDown(self) -> None:
+        TestSelectMany.client.close()
+        TestSelectMany.fake.stop()
+
+class TestTicketCacheSync(TestCase):
+    def setUp(self):
+        TestTicketCacheSync.cache_dir = tempfile.TemporaryDirectory()
+        TestTicketCacheSync.cache = TicketCache(TestTicketCacheSync.cache_dir.name, 'fake', ttl=0)
+        TestTicketCacheSync.fake = FakeZendesk(ticket_count=250).start()
+        TestTicketCacheSync.client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=TestTicketCacheSync.fake.base_url, requests_per_minute=60000)
+
+    def test_sync_downloads_everything_then_only_changes(self):
+        cache, fake = TestTicketCacheSync.cache, TestTicketCacheSync.fake
+        with mock.patch('builtins.print'):
+            tickets = [ticket for page in sync_ticket_cache(TestTicketCacheSync.client, cache) for ticket in page]
+            self.assertEqual(len(tickets), 250)
+            self.assertEqual(fake.request_count, 3)
+
+            cache.merge([], cursor=time.time() - 120)
+            fake.update_ticket(3, subject='changed', updated_at=time.time() - 90)
+            tickets = [ticket for page in sync_ticket_cache(TestTicketCacheSync.client, cache) for ticket in page]
+        self.assertEqual(fake.request_count, 4)
+        self.assertEqual(len(tickets), 250)
+        self.assertEqual(tickets[2]['subject'], 'changed')
+        self.assertGreater(cache.bytes_saved, 0)
+
+    def test_search_index_follows_sync(self):
+        cache, fake = TestTicketCacheSync.cache, TestTicketCacheSync.fake
+        with mock.patch('builtins.print'):
+            search_index = load_search_index(TestTicketCacheSync.client, cache)
+            self.assertEqual(len(search_index), 250)
+            self.assertEqual(search_index.search('sample 7')[0][0][0], 7)
+
+            cache.merge([], cursor=time.time() - 120)
+            fake.update_ticket(3, subject='Refund request', description='Please refund my order', updated_at=time.time() - 90)
+            search_index = load_search_index(TestTicketCacheSync.client, cache)
+        self.assertEqual(search_index.search('refund'), ([(3, 'Refund request', mock.ANY)], 1))
+        self.assertEqual(fake.request_count, 4)
+
+    def test_search_without_cache_and_results(self):
+        with mock.patch('builtins.print') as mocked_print:
+            search_index = load_search_index(TestTicketCacheSync.client, None, concurrency=2)
+            self.assertEqual(len(search_index), 250)
+            mocked_print.reset_mock()
+            display_search_results(search_index, 'ticket 42', limit=2)
+            display_search_results(search_index, 'scanner')
+        printed = [call[0][0] for call in mocked_print.call_args_list]
+        self.assertEqual(printed[0], "250 tickets match 'ticket 42', best 2 shown:")
+        self.assertEqual(printed[1], 'id   score  subject')
+        self.assertTrue(printed[2].startswith('42 ') and printed[2].endswith('Sample ticket 42'))
+        self.assertEqual(printed[-1], "No tickets match 'scanner'.")
+
+    def test_fresh_cache_served_without_requests(self):
+        cache = TestTicketCacheSync.cache
+        cache.ttl = 300
+        cache.merge([{'id': 1, 'subject': 'cached'}], cursor=time.time())
+        cache.mark_synced()
+        with mock.patch.object(TestTicketCacheSync.client, 'get') as mock_request:
+            pages = list(sync_ticket_cache(TestTicketCacheSync.client, cache))
+            mock_request.assert_not_called()
+        self.assertEqual(pages, [[{'id': 1, 'subject': 'cached', 'priority': None, 'status': None, 'submitter_id': None, 'assignee_id': None, 'organization_id': None}]])
+        self.assertEqual(cache.hits, 1)
+
+    def test_open_ticket_cache_env(self):
+        with mock.patch.dict(os.environ, {'ZCC_CACHE_DIR': TestTicketCacheSync.cache_dir.name, 'ZCC_CACHE_TTL': '42'}):
+            cache = open_ticket_cache('envdomain')
+            self.assertEqual((os.path.dirname(cache.path), cache.ttl), (TestTicketCacheSync.cache_dir.name, 42))
+            cache.close()
+        with mock.patch.dict(os.environ, {'ZCC_CACHE': 'off'}):
+            self.assertIsNone(open_ticket_cache('envdomain'))
+
+    def tearDown(self) -> None:
+        TestTicketCacheSync.client.close()
+        TestTicketCacheSync.fake.stop()
+        TestTicketCacheSync.cache.close()
+        TestTicketCacheSync.cache_dir.cleanup()
+
+class TestStreamingPipeline(TestCase):
+    def setUp(self):
+        TestStreamingPipeline.fake = FakeZendesk(ticket_count=250).start()
+        TestStreamingPipeline.client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=TestStreamingPipeline.fake.base_url, requests_per_minute=60000)
+
+    def test_stream_yields_projected_pages(self):
+        with mock.patch('builtins.print'):
+            pages = list(get_tickets(TestStreamingPipeline.client, 'all', stream=True))
+        self.assertEqual([len(page) for page in pages], [100, 100, 50])
+        self.assertEqual(pages[0][0]._fields, TICKET_FIELDS)
+        self.assertEqual(pages[0][0].subject, 'Sample ticket 1')
+
+    def test_streamed_table_matches_list_table(self):
+        with mock.patch('builtins.print'):
+            streamed_df = process_all_tickets(get_tickets(TestStreamingPipeline.client, 'all', stream=True))
+            listed_df = process_all_tickets(get_tickets(TestStreamingPipeline.client, 'all'))
+        pd.testing.assert_frame_equal(streamed_df, listed_df)
+        self.assertEqual(len(streamed_df), 250)
+
+    def test_stream_failure_returns_false(self):
+        with mock.patch.object(TestStreamingPipeline.fake, 'respond', side_effect=respond_then_fail((200, {'tickets': [{'id': 1}], 'next_page': TestStreamingPipeline.fake.base_url + '/api/v2/tickets.json?page=2', 'count': 2}))):
+            with mock.patch('ticket_viewer.client.time.sleep'):
+                with mock.patch('builtins.print'):
+                    self.assertFalse(process_all_tickets(get_tickets(TestStreamingPipeline.client, 'all', stream=True)))
+
+    def tearDown(self) -> None:
+        TestStreamingPipeline.client.close()
+        TestStreamingPipeline.fake.stop()
 
 class TestTicketProcessing(TestCase):      
     def test_process_all_tickets_return_all_rows_expected_cols(self):
@@ -143,11 +422,13 @@ class TestTicketProcessing(TestCase):
                    {'id': 10, 'subject': 'sub10', 'priority': 'low', 'status': 'open', 'submitter_id': 39, 'assignee_id': 42, 'organization_id': 55}]
         output_df = process_all_tickets(test_case)
         self.assertTrue(is_string_dtype(output_df['subject']))
-        self.assertTrue(is_string_dtype(output_df['priority']))
-        self.assertTrue(is_string_dtype(output_df['status']))
-        self.assertTrue(is_string_dtype(output_df['submitter_id']))
-        self.assertTrue(is_string_dtype(output_df['assignee_id']))
-        self.assertTrue(is_string_dtype(output_df['organization_id']))
+        self.assertIsInstance(output_df['priority'].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(output_df['status'].dtype, pd.CategoricalDtype)
+        self.assertEqual(output_df['submitter_id'].dtype, 'Int64')
+        self.assertEqual(output_df['assignee_id'].dtype, 'Int64')
+        self.assertEqual(output_df['organization_id'].dtype, 'Int64')
+        formatted_df = format_page(output_df)
+        [self.assertTrue(is_string_dtype(formatted_df[column])) for column in formatted_df.columns]
     
     def test_process_all_tickets_no_nan(self):
         test_case=[{'id': 1, 'subject': 'sub1', 'priority': None, 'status': 'open', 'submitter_id': 33, 'assignee_id': 44, 'organization_id': 55},
@@ -161,7 +442,10 @@ class TestTicketProcessing(TestCase):
                    {'id': 9, 'subject': 'sub9', 'priority': 'high', 'status': 'closed', 'submitter_id': 33, 'assignee_id': 48, 'organization_id': 55},
                    {'id': 10, 'subject': 'sub10', 'priority': 'low', 'status': 'open', 'submitter_id': 39, 'assignee_id': 42, 'organization_id': 55}]
         output_df = process_all_tickets(test_case)
-        self.assertFalse(output_df.isnull().values.any())
+        self.assertEqual(output_df.isnull().sum().sum(), 9)
+        formatted_df = format_page(output_df)
+        self.assertFalse(formatted_df.isnull().values.any())
+        self.assertEqual(formatted_df.loc[4].tolist(), ['None', 'None', 'open', 'None', 'None', 'None'])
     
     def test_delete_terminal_lines(self):
         console1 = io.StringIO()
@@ -202,6 +486,57 @@ class TestTicketProcessing(TestCase):
                          mock.call(1)]
                 mock_delete_terminal_lines.assert_has_calls(calls)
             
+    def test_display_pages_25_jumps(self):
+        test_df = pd.DataFrame({'id':[i for i in range(1,61)], 'subject': ['sub'+str(i) for i in range(1,61)]}).set_index('id')
+        with mock.patch('builtins.input', side_effect = ['last', 'g 2', 'g 9', 'first', 'first', 'q']):
+            with mock.patch('ticket_viewer.viewer.delete_terminal_lines') as mock_delete_terminal_lines:
+                with mock.patch('builtins.print') as mock_print:
+                    display_pages_25(test_df)
+                calls = [mock.call(1), mock.call(25+4), mock.call(1), mock.call(10+4), mock.call(1), mock.call(1),
+                         mock.call(25+4), mock.call(1), mock.call(1)]
+                self.assertEqual(mock_delete_terminal_lines.call_args_list, calls)
+                pages = [call[0][0] for call in mock_print.call_args_list[1:]]
+                self.assertEqual([('sub1 ' in page, 'sub60' in page, 'sub26' in page) for page in pages],
+                                 [(True, False, False), (False, True, False), (False, False, True), (True, False, False)])
+
+    def test_display_pages_25_last_waits_for_download(self):
+        pages = [[{'id': i, 'subject': 'sub'+str(i)} for i in range(start, start+10)] for start in range(1, 46, 10)]
+        buffer = process_all_tickets(iter(pages), background=True)
+        with mock.patch('builtins.input', side_effect = ['last', 'q']):
+            with mock.patch('ticket_viewer.viewer.delete_terminal_lines'):
+                with mock.patch('builtins.print') as mock_print:
+                    display_pages_25(buffer)
+                    self.assertIn('sub50', mock_print.call_args_list[-1][0][0])
+
+    def test_display_pages_25_progressive(self):
+        pages = [[{'id': i, 'subject': 'sub'+str(i)} for i in range(start, start+10)] for start in range(1, 46, 10)]
+        buffer = process_all_tickets(iter(pages), background=True)
+        self.assertIsInstance(buffer, TicketPageBuffer)
+        self.assertEqual(len(buffer.frame()), 50)
+        with mock.patch('builtins.input', side_effect = ['>', '>', '>', '<', 'q']):
+            with mock.patch('ticket_viewer.viewer.delete_terminal_lines') as mock_delete_terminal_lines:
+                with mock.patch('builtins.print') as mock_print:
+                    display_pages_25(buffer)
+                    self.assertIn('First page downloaded in', mock_print.call_args_list[0][0][0])
+                calls = [mock.call(1), mock.call(25+4), mock.call(1), mock.call(1), mock.call(1), mock.call(25+4), mock.call(1)]
+                self.assertEqual(mock_delete_terminal_lines.call_args_list, calls)
+
+    def test_display_pages_25_waits_for_page(self):
+        release = threading.Event()
+        def pages():
+            yield [{'id': i, 'subject': 'sub'+str(i)} for i in range(1, 26)]
+            release.wait(5)
+            yield [{'id': i, 'subject': 'sub'+str(i)} for i in range(26, 31)]
+        buffer = process_all_tickets(pages(), background=True)
+        with mock.patch('builtins.input', side_effect = ['>', 'q']):
+            with mock.patch('ticket_viewer.viewer.delete_terminal_lines'):
+                with mock.patch('builtins.print', side_effect=lambda *args, **kwargs: args == ('Waiting for page to download...',) and release.set()) as mock_print:
+                    display_pages_25(buffer)
+                    mock_print.assert_any_call('Waiting for page to download...')
+
+    def test_process_all_tickets_background_failed_first_page(self):
+        self.assertFalse(process_all_tickets(iter([False]), background=True))
+
     def test_process_select_ticket_print_correctly(self):
         test_cases = [{'url': 'https://subdomain.zendesk.com/api/v2/tickets/55.json', 'id': 1, 'external_id': None, 'via': {'channel': 'sample_ticket','source': {'from': {}, 'to': {}, 'rel': None}}, 'created_at': '2021-11-26T14:08:15Z',
                       'updated_at': '2021-11-26T14:08:16Z', 'type': 'incident', 'subject': 'Sample', 'raw_subject': 'Sample ticket: Meet the ticket', 'description': 'Sample desc', 'priority': 'normal', 'status': 'open',
@@ -227,7 +562,75 @@ class TestTicketProcessing(TestCase):
                              mock.call(f'Organization: {test_case["organization_id"]}\tSubmitted by: {test_case["submitter_id"]}\tAssigned to: {test_case["assignee_id"]}')]
                     mocked_print.assert_has_calls(calls)
                     
+class TestStartup(TestCase):
+    def test_viewer_import_defers_table_modules(self):
+        statement = 'import sys, ticket_viewer.viewer; print(sorted({"pandas", "numpy", "tabulate", "msgspec", "orjson"} & set(sys.modules)))'
+        result = subprocess.run([sys.executable, '-c', statement], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '[]')
+
 class TestIntegrationInterface(TestCase):
+    def setUp(self) -> None:
+        # keep the integration test off the user's local ticket cache
+        self.cache_patcher = mock.patch('ticket_viewer.viewer.open_ticket_cache', return_value=None)
+        self.cache_patcher.start()
+
+    def tearDown(self) -> None:
+        self.cache_patcher.stop()
+
+    def test_interface_tool_filter_and_sort(self):
+        tickets = [{'id': i, 'subject': f'sub{i}', 'priority': ('low', 'urgent')[i % 2], 'status': ('open', 'solved')[i % 3 == 0],
+                    'submitter_id': 33, 'assignee_id': 44 if i < 5 else None, 'organization_id': 55} for i in range(1, 9)]
+        with mock.patch('ticket_viewer.viewer.get_credentials', return_value=('testerdomain', 'tester@abc.com', 'tester1234')), \
+             mock.patch('ticket_viewer.viewer.validate_credentials', return_value=True), \
+             mock.patch('builtins.input', side_effect=['filter status=open priority=urgent', 'sort -id', 'filter assignee=none', 'filter status=hold', 'quit']), \
+             mock.patch('ticket_viewer.viewer.get_tickets', return_value=tickets) as mock_get_tickets, \
+             mock.patch('ticket_viewer.viewer.check_terminal_window'), \
+             mock.patch('ticket_viewer.viewer.display_pages_25') as mock_display, \
+             mock.patch('builtins.print') as mock_print:
+            interface_tool()
+        # the tickets are downloaded once and each filter replaces the last one, keeping the sort order
+        mock_get_tickets.assert_called_once()
+        views = [call.args[0].index.tolist() for call in mock_display.call_args_list]
+        self.assertEqual(views, [[1, 5, 7], [7, 5, 1], [8, 7, 6, 5]])
+        mock_print.assert_any_call('3 of 8 tickets match status=open priority=urgent, sorted by id.')
+        mock_print.assert_any_call('0 of 8 tickets match status=hold, sorted by id (descending).')
+
+    def test_interface_tool_filter_after_failed_all(self):
+        tickets = [{'id': i, 'subject': f'sub{i}', 'priority': ('low', 'urgent')[i % 2], 'status': ('open', 'solved')[i % 3 == 0],
+                    'submitter_id': 33, 'assignee_id': 44, 'organization_id': 55} for i in range(1, 9)]
+        def failing_pages():
+            yield tickets[:4]
+            yield False # e.g. a 500 on page 2
+        with mock.patch('ticket_viewer.viewer.get_credentials', return_value=('testerdomain', 'tester@abc.com', 'tester1234')), \
+             mock.patch('ticket_viewer.viewer.validate_credentials', return_value=True), \
+             mock.patch('builtins.input', side_effect=['all', 'filter status=open', 'filter status=open', 'quit']), \
+             mock.patch('ticket_viewer.viewer.get_tickets', side_effect=[failing_pages(), tickets]) as mock_get_tickets, \
+             mock.patch('ticket_viewer.viewer.check_terminal_window'), \
+             mock.patch('ticket_viewer.viewer.display_pages_25') as mock_display, \
+             mock.patch('builtins.print') as mock_print:
+            interface_tool()
+        # the failed table of 'all' is downloaded again instead of leaving every filter without output
+        self.assertEqual(mock_get_tickets.call_count, 2)
+        self.assertEqual(mock_display.call_args.args[0].index.tolist(), [1, 2, 4, 5, 7, 8])
+        mock_print.assert_any_call('6 of 8 tickets match status=open, sorted by id.')
+
+    def test_interface_tool_stats(self):
+        with tempfile.TemporaryDirectory() as temp_dir, \
+             mock.patch.dict(os.environ, {'ZCC_METRICS': 'on', 'ZCC_METRICS_FILE': os.path.join(temp_dir, 'metrics.json')}), \
+             mock.patch('ticket_viewer.viewer.get_credentials', return_value=('testerdomain', 'tester@abc.com', 'tester1234')), \
+             mock.patch('ticket_viewer.viewer.validate_credentials', return_value=True), \
+             mock.patch('builtins.input', side_effect=['stats', 'stats json', 'stats reset', 'quit']), \
+             mock.patch('ticket_viewer.viewer.print_stats') as mock_print_stats, \
+             mock.patch('builtins.print') as mock_print:
+            metrics.count('fetch.pages', 2) # recorded before the session starts, dropped by configure_metrics
+            interface_tool()
+            with open(os.path.join(temp_dir, 'metrics.json')) as metrics_file:
+                dumped = json.load(metrics_file)
+        self.assertEqual(mock_print_stats.call_args.args[0]['counters'], {})
+        self.assertEqual(json.loads(mock_print.call_args_list[2].args[0])['counters'], {})
+        mock_print.assert_any_call('Metrics reset.')
+        self.assertTrue(dumped['enabled'])
+
     def test_interface_tool_integration(self):
         """Integration test for interface tool
         1. Call all possible commands ('menu', 'all', 'select 5', 'hello world', 'quit') with fail criteria on ticket commands ('all' and 'select 5')
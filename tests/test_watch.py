@@ -0,0 +1,131 @@
+import os
+import signal
+import tempfile
+import threading
+import time
+from unittest import TestCase, mock
+import pandas as pd
+from tests.fake_zendesk import FakeZendesk, make_ticket
+from ticket_viewer.cache import TicketCache
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.pipeline import TICKET_FIELDS
+from ticket_viewer.store import open_table, write_table
+from ticket_viewer.viewer import finish_ticket_watch, interface_tool, poll_ticket_changes, process_all_tickets, start_ticket_watch
+from ticket_viewer.watch import TicketWatch
+
+class TestTicketWatch(TestCase):
+    def setUp(self) -> None:
+        TestTicketWatch.tickets = [make_ticket(ticket_id) for ticket_id in range(1, 11)]
+        TestTicketWatch.watch = TicketWatch(process_all_tickets(TestTicketWatch.tickets), cursor=100)
+
+    def test_apply_lists_changes(self):
+        watch = TestTicketWatch.watch
+        changed = dict(make_ticket(4), subject='changed', updated_at='2030-01-01T00:00:00Z')
+        deleted = dict(make_ticket(6), status='deleted', updated_at='2030-01-01T00:00:00Z')
+        changes = watch.apply([make_ticket(11), changed, deleted], cursor=200)
+        self.assertEqual([[ticket['id'] for ticket in changes[kind]] for kind in ('new', 'changed', 'deleted')], [[11], [4], [6]])
+        self.assertEqual(changes['changed'][0]['subject'], 'changed')
+        self.assertEqual(watch.cursor, 200)
+        # overlapping exports repeat the last changes, a ticket deleted before it was ever listed is not reported
+        changes = watch.apply([changed, dict(make_ticket(12), status='deleted')], cursor=300)
+        self.assertEqual(changes, {'new': [], 'changed': [], 'deleted': []})
+        # the table is only patched when asked for
+        self.assertEqual(len(watch.tickets_df), 10)
+        self.assertEqual(watch.table().index.tolist(), [1, 2, 3, 4, 5, 7, 8, 9, 10, 11])
+
+    def test_table_matches_rebuilt_table(self):
+        watch = TestTicketWatch.watch
+        watch.apply([dict(make_ticket(2), priority='urgent', updated_at='2030-01-01T00:00:00Z'), make_ticket(12), make_ticket(11)], cursor=200)
+        watch.apply([dict(make_ticket(12), status='deleted', updated_at='2030-01-01T00:00:00Z')], cursor=300)
+        tickets = TestTicketWatch.tickets + [make_ticket(11)]
+        tickets[1] = dict(tickets[1], priority='urgent')
+        expected_df = process_all_tickets(tickets)
+        tickets_df = watch.table()
+        # categories may come in another order, every value is the same
+        pd.testing.assert_frame_equal(tickets_df.astype(object), expected_df.astype(object))
+        self.assertIs(watch.table(), tickets_df)
+
+    def test_read_only_table(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'tickets.table')
+            write_table(path, TestTicketWatch.watch.tickets_df)
+            watch = TicketWatch(open_table(path), cursor=100)
+            watch.apply([dict(make_ticket(3), subject='changed', updated_at='2030-01-01T00:00:00Z')], cursor=200)
+            self.assertEqual(watch.table().loc[3, 'subject'], 'changed')
+
+class TestWatchPolling(TestCase):
+    def setUp(self) -> None:
+        TestWatchPolling.cache_dir = tempfile.TemporaryDirectory()
+        TestWatchPolling.cache = TicketCache(TestWatchPolling.cache_dir.name, 'fake')
+        TestWatchPolling.fake = FakeZendesk(ticket_count=2500).start()
+        TestWatchPolling.client = ZendeskClient('fake', 'tester@abc.com', 'testAPIkey', base_url=TestWatchPolling.fake.base_url, requests_per_minute=60000)
+
+    def test_poll_without_cache(self):
+        fake = TestWatchPolling.fake
+        with mock.patch('builtins.print'):
+            watch = start_ticket_watch(TestWatchPolling.client, None, concurrency=4)
+        fake.update_ticket(7, subject='changed', updated_at=time.time() + 1)
+        requests = fake.request_count
+        changes = poll_ticket_changes(TestWatchPolling.client, None, watch)
+        self.assertEqual([ticket['subject'] for ticket in changes['changed']], ['changed'])
+        # only the changed ticket is exported, in a single request whatever the number of tickets
+        self.assertEqual(fake.request_count, requests + 1)
+        self.assertEqual(finish_ticket_watch(None, watch).loc[7, 'subject'], 'changed')
+
+    def test_poll_syncs_cache(self):
+        cache = TestWatchPolling.cache
+        fake = TestWatchPolling.fake
+        with mock.patch('builtins.print'):
+            watch = start_ticket_watch(TestWatchPolling.client, cache)
+        fake.update_ticket(2500, priority='urgent', updated_at=time.time() + 1)
+        # a poll only updates the search index in memory, it is saved once when the watch ends
+        with mock.patch('ticket_viewer.search.SearchIndex.save') as mock_save:
+            changes = poll_ticket_changes(TestWatchPolling.client, cache, watch)
+            mock_save.assert_not_called()
+            self.assertEqual([ticket['id'] for ticket in changes['changed']], [2500])
+            self.assertEqual(cache.get(2500)['priority'], 'urgent')
+            tickets_df = finish_ticket_watch(cache, watch)
+            mock_save.assert_called_once_with(cache.search_path)
+        # the patched table replaces the cache's table, which is neither rebuilt nor reread
+        with mock.patch.object(cache, 'iter_pages') as mock_pages:
+            self.assertIs(cache.ticket_table(TICKET_FIELDS), tickets_df)
+        mock_pages.assert_not_called()
+        self.assertEqual(open_table(cache.table_path(TICKET_FIELDS), version=cache.version).loc[2500, 'priority'], 'urgent')
+
+    def tearDown(self) -> None:
+        TestWatchPolling.client.close()
+        TestWatchPolling.fake.stop()
+        TestWatchPolling.cache.close()
+        TestWatchPolling.cache_dir.cleanup()
+
+class TestWatchInterface(TestCase):
+    def setUp(self) -> None:
+        TestWatchInterface.fake = FakeZendesk(ticket_count=300).start()
+
+    def test_watch_until_ctrl_c(self):
+        fake = TestWatchInterface.fake
+
+        def change_tickets():
+            # once the watch has its table, a ticket changes and Ctrl+C stops the watch after its first poll
+            fake.update_ticket(9, status='hold', priority='urgent', subject='Printer on fire', updated_at=time.time() + 1)
+            threading.Timer(2.5, os.kill, (os.getpid(), signal.SIGINT)).start()
+
+        with mock.patch.dict(os.environ, {'ZCC_BASE_URL': fake.base_url}), \
+             mock.patch('ticket_viewer.viewer.EXPORT_MIN_AGE', 0), \
+             mock.patch('ticket_viewer.viewer.open_ticket_cache', return_value=None), \
+             mock.patch('ticket_viewer.viewer.get_credentials', return_value=('testerdomain', 'tester@abc.com', 'tester1234')), \
+             mock.patch('ticket_viewer.viewer.validate_credentials', return_value=True), \
+             mock.patch('ticket_viewer.viewer.check_terminal_window'), \
+             mock.patch('ticket_viewer.viewer.display_pages_25') as mock_display, \
+             mock.patch('builtins.input', side_effect=['watch 1', 'filter status=hold', 'quit']), \
+             mock.patch('builtins.print', side_effect=lambda *args, **kwargs: args[:1] == ('Watching 300 tickets of testerdomain for changes every 1s. Press Ctrl+C to stop.',) and change_tickets()) as mock_print:
+            interface_tool()
+        printed = [call.args[0] for call in mock_print.call_args_list if call.args]
+        self.assertIn('  changed        9  hold    urgent  Printer on fire', printed)
+        self.assertIn('Command cancelled.', printed)
+        # filter works on the watched table without downloading the tickets again
+        self.assertIn('1 of 300 tickets match status=hold, sorted by id.', printed)
+        self.assertEqual(mock_display.call_args.args[0].index.tolist(), [9])
+
+    def tearDown(self) -> None:
+        TestWatchInterface.fake.stop()
@@ -0,0 +1,171 @@
+import asyncio
+import signal
+import threading
+
+def _settle(future, result=None, error=None):
+    # runs on the event loop: results of calls whose awaiting task was cancelled are dropped
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+async def run_in_thread(function, *args, **kwargs):
+    """Runs a blocking call (a request, a download, the pager's input) on a daemon thread and awaits its result
+
+    Cancelling the awaiting task returns control at once, the call itself runs to completion in the background
+    and its result is dropped. Daemon threads never hold up the viewer when it exits, even if one is still
+    blocked reading input.
+
+    Parameters
+    ----------
+    function : callable
+        Blocking call
+    *args, **kwargs
+        Arguments of the call
+
+    Returns
+    -------
+    object
+        Result of the call, its exception is raised in the awaiting task
+    """
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def call():
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as error:
+            settle = (future, None, error)
+        else:
+            settle = (future, result)
+        try:
+            loop.call_soon_threadsafe(_settle, *settle)
+        except RuntimeError: # the event loop has closed, nobody is waiting for the result
+            pass
+
+    threading.Thread(target=call, daemon=True).start()
+    return await future
+
+async def run_cancellable(function, *args, **kwargs):
+    """Runs a blocking call taking a cancelled Event (e.g. load_ticket_table), setting it if the awaiting task is cancelled
+
+    Parameters
+    ----------
+    function : callable
+        Blocking call accepting a cancelled keyword argument, which it checks to stop early
+    *args, **kwargs
+        Arguments of the call, cancelled is created if not given
+
+    Returns
+    -------
+    object
+        Result of the call
+    """
+
+    cancelled = kwargs.setdefault('cancelled', threading.Event())
+    try:
+        return await run_in_thread(function, *args, **kwargs)
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+
+async def read_input(prompt=''):
+    """Reads a line of user input without blocking the event loop"""
+    return await run_in_thread(input, prompt)
+
+async def interruptible(coroutine):
+    """Runs a command so Ctrl+C cancels it and returns to the prompt, instead of ending the viewer
+
+    Where the event loop cannot handle signals (e.g. on Windows), Ctrl+C keeps its default behavior.
+
+    Parameters
+    ----------
+    coroutine : coroutine
+        Command to run
+
+    Returns
+    -------
+    object or Bool
+        Result of the command; False if it was cancelled
+    """
+
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(coroutine)
+    try:
+        loop.add_signal_handler(signal.SIGINT, task.cancel)
+        handled = True
+    except (NotImplementedError, RuntimeError):
+        handled = False
+    try:
+        await asyncio.wait({task})
+    finally:
+        if handled:
+            loop.remove_signal_handler(signal.SIGINT)
+        task.cancel()
+    if task.cancelled():
+        print('Command cancelled.')
+        return False
+    return task.result()
+
+def _pull(iterator):
+    # StopIteration cannot be raised into a future, so the end of the iterator is reported as a flag
+    for item in iterator:
+        return False, item
+    return True, None
+
+class AsyncZendeskClient:
+    """asyncio front of a ZendeskClient, so an event loop can run API calls without waiting on them
+
+    Requests still go through the client's pooled session, rate limiter and retries; each call runs on a
+    thread (see run_in_thread) and is awaited, so several calls overlap and any of them can be cancelled.
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client the requests are sent through
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def iterate(self, iterable):
+        """Iterates a blocking iterable, e.g. a stream of ticket pages, without blocking the event loop
+
+        Items are pulled one at a time on a thread. When the consumer stops early or is cancelled, the
+        iterable is closed as soon as the item being pulled has arrived, which stops a page stream from
+        requesting any further pages.
+
+        Parameters
+        ----------
+        iterable : iterable
+            Blocking iterable, e.g. iter_ticket_pages
+
+        Yields
+        ------
+        object
+            Items of iterable
+        """
+
+        iterator = iter(iterable)
+        lock = threading.Lock() # a generator cannot be closed while a thread is pulling from it
+
+        def pull():
+            with lock:
+                return _pull(iterator)
+
+        def close():
+            with lock:
+                iterator.close()
+
+        try:
+            while True:
+                done, item = await run_in_thread(pull)
+                if done:
+                    return
+                yield item
+        finally:
+            if hasattr(iterator, 'close'):
+                threading.Thread(target=close, daemon=True).start()
@@ -0,0 +1,450 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from ticket_viewer.search import SEARCH_FIELDS, SearchIndex
+
+class TicketCache:
+    """On-disk SQLite store of raw ticket data for one subdomain, kept current by incremental sync
+
+    Tickets are stored as JSON keyed by id, next to a sync cursor (the incremental export start_time to
+    resume from) and the time of the last successful sync. The cache is considered fresh for ttl seconds
+    after a sync or after an individual ticket was fetched. A full-text SearchIndex of the cached tickets is
+    kept in a file alongside, updated by every merge, and the names of users and organizations side-loaded
+    with the tickets are kept for the NameDirectory. The ids each merge changed are logged against the cache
+    version, so a stored ticket table is patched with what changed since it was written, see ticket_table.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding the cache files, created if missing
+    subdomain : str
+        Name of Zendesk subdomain, one cache file per subdomain
+    ttl : int, optional
+        Seconds cached data is served without asking the API for changes
+    """
+
+    def __init__(self, cache_dir, subdomain, ttl=300):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, f'{subdomain}.sqlite3')
+        self.search_path = os.path.join(cache_dir, f'{subdomain}.search')
+        self.table_prefix = os.path.join(cache_dir, f'{subdomain}.') # + crc32 of the fields + '.table', see table_path
+        self._search_index = None
+        self._tables = {} # fields: (version, DataFrame), see ticket_table
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock() # held by sync_ticket_cache, so two syncs never export the same changes
+        self.full_download = None # Event set once the full download that sync_ticket_cache started has ended, None if none is running
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS tickets (id INTEGER PRIMARY KEY, updated_at TEXT, fetched_at REAL, data TEXT)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS sync (key TEXT PRIMARY KEY, value REAL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS names (kind TEXT, id INTEGER, name TEXT, PRIMARY KEY (kind, id))')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS changes (version INTEGER, id INTEGER)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS changes_version ON changes (version)')
+            # tables written before the log was kept (i.e. below this version) are rebuilt instead of patched
+            self.conn.execute("INSERT OR IGNORE INTO sync VALUES ('changes_from', ?)", (self._sync_value('version'),))
+
+    def _sync_value(self, key):
+        row = self.conn.execute('SELECT value FROM sync WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else 0
+
+    @property
+    def sync_cursor(self):
+        """Unix epoch time the next incremental export starts from, 0 if never synced"""
+        with self.lock:
+            return self._sync_value('cursor')
+
+    @property
+    def version(self):
+        """Number of merges of tickets into the cache, 0 if none were cached yet"""
+        with self.lock:
+            return self._sync_value('version')
+
+    @property
+    def synced_at(self):
+        """Unix epoch time of the last successful sync, 0 if never synced"""
+        with self.lock:
+            return self._sync_value('synced_at')
+
+    def is_fresh(self, now=None):
+        """Checks if the whole ticket set was synced within ttl seconds
+
+        Parameters
+        ----------
+        now : float, optional
+            Current unix epoch time
+
+        Returns
+        -------
+        Bool
+            True if the cache can be served without a sync
+        """
+
+        now = time.time() if now is None else now
+        return now - self.synced_at <= self.ttl
+
+    def merge(self, tickets, cursor=None, now=None):
+        """Upserts tickets (removing deleted ones) and optionally advances the sync cursor, in one transaction
+
+        Every merge of tickets bumps the cache version, logs the ids it changed against it and adds the tickets to
+        the search index, so the index grows page by page while tickets download.
+
+        Parameters
+        ----------
+        tickets : list of dicts
+            Ticket data from API
+        cursor : float, optional
+            New incremental export start_time, committed together with the tickets
+        now : float, optional
+            Fetch time recorded against the tickets
+
+        Returns
+        -------
+        int
+            Number of bytes written for the tickets
+        """
+
+        now = time.time() if now is None else now
+        rows = [(ticket['id'], ticket.get('updated_at'), now, json.dumps(ticket)) for ticket in tickets if ticket.get('status') != 'deleted']
+        deleted = [(ticket['id'],) for ticket in tickets if ticket.get('status') == 'deleted']
+        with self.lock, self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO tickets VALUES (?, ?, ?, ?)', rows)
+            self.conn.executemany('DELETE FROM tickets WHERE id = ?', deleted)
+            if cursor is not None:
+                self.conn.execute("INSERT OR REPLACE INTO sync VALUES ('cursor', ?)", (cursor,))
+            if tickets:
+                version = self._sync_value('version') + 1
+                self.conn.execute("INSERT OR REPLACE INTO sync VALUES ('version', ?)", (version,))
+                self.conn.executemany('INSERT INTO changes VALUES (?, ?)', [(version, ticket['id']) for ticket in tickets])
+        if tickets:
+            self.search_index().add_tickets([{field: ticket.get(field) for field in SEARCH_FIELDS} for ticket in tickets], version=version)
+        return sum(len(row[3]) for row in rows)
+
+    def mark_synced(self, now=None):
+        """Records a completed sync, restarting the ttl
+
+        The search index is not saved here, a sync of a few changed tickets would otherwise rewrite the whole
+        index; it is saved after a full download, when a watch ends and when the cache is closed.
+
+        Parameters
+        ----------
+        now : float, optional
+            Unix epoch time of the sync
+        """
+
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sync VALUES ('synced_at', ?)", (time.time() if now is None else now,))
+
+    def search_index(self):
+        """Returns the SearchIndex of the cached tickets, loading it on first use
+
+        The index file records the cache version it was saved at; if the cache changed since (e.g. the viewer
+        was stopped before saving), the index is rebuilt from the cached tickets without any API request.
+
+        Returns
+        -------
+        SearchIndex
+            Full-text index of the cached tickets' subjects and descriptions
+        """
+
+        if self._search_index is None:
+            with self.lock:
+                version = self._sync_value('version')
+            index = SearchIndex.load(self.search_path)
+            if index is None or index.version != version:
+                index = SearchIndex(version)
+                for page_tickets in self.iter_pages(SEARCH_FIELDS):
+                    index.add_tickets(page_tickets)
+            self._search_index = index
+        return self._search_index
+
+    def save_search_index(self):
+        """Writes the search index next to the cache if it changed since it was loaded or last saved
+        """
+
+        if self._search_index is not None and self._search_index.dirty:
+            self._search_index.save(self.search_path)
+
+    def table_path(self, fields):
+        """Path of the columnar file the table of fields is stored in next to the cache, see ticket_table"""
+        return f"{self.table_prefix}{zlib.crc32(','.join(fields).encode()):08x}.table"
+
+    def ticket_table(self, fields):
+        """Returns a table of the cached tickets, built once and kept current as the cache version changes
+
+        Like the search index, the table is built from the cached tickets without any API request, so
+        repeated commands over an unchanged cache skip decoding every cached ticket again. Every table is
+        also written next to the cache in a compact columnar file (see ticket_viewer.store), which a later
+        session maps into memory in milliseconds. Once the cache has changed, only the tickets merged since
+        the table was written are decoded and patched into it (see patch_table); the whole table is only
+        rebuilt when there is none yet or most of it changed.
+
+        Parameters
+        ----------
+        fields : tuple of str
+            Fields of the table, 'id' first, see TicketFrameBuilder
+
+        Returns
+        -------
+        DataFrame
+            Ticket data indexed by 'id'
+        """
+
+        from ticket_viewer.store import open_table, table_version, write_table
+        from ticket_viewer.table import TicketFrameBuilder
+
+        version = self.version
+        path = self.table_path(fields)
+        cached = self._tables.get(fields)
+        if cached is None:
+            stored_version = table_version(path)
+            stored_df = open_table(path, version=stored_version) if stored_version is not None else None
+            cached = (stored_version, stored_df) if stored_df is not None else None
+        if cached is None or cached[0] != version:
+            tickets_df = self.patch_table(fields, cached[1], cached[0], version) if cached is not None else None
+            if tickets_df is None:
+                builder = TicketFrameBuilder(fields)
+                for page_tickets in self.iter_pages(fields):
+                    builder.add_page(page_tickets)
+                tickets_df = builder.build()
+            write_table(path, tickets_df, version=version)
+            self.prune_changes()
+            cached = (version, tickets_df)
+        self._tables[fields] = cached
+        return cached[1]
+
+    def patch_table(self, fields, tickets_df, from_version, version):
+        """Patches the tickets merged between two cache versions into a table of the cached tickets
+
+        Parameters
+        ----------
+        fields : tuple of str
+            Fields of the table, 'id' first
+        tickets_df : DataFrame
+            Ticket data indexed by 'id', holding every cached ticket as of from_version
+        from_version : int
+            Cache version the table is current at
+        version : int
+            Cache version to bring the table to
+
+        Returns
+        -------
+        DataFrame or None
+            Ticket data as of version; None if the changes since from_version are no longer logged, or
+            touch more than half of the table, which is then cheaper to rebuild
+        """
+
+        from ticket_viewer.table import patch_ticket_frame
+
+        with self.lock:
+            if from_version < self._sync_value('changes_from') or from_version > version:
+                return None
+            ticket_ids = [ticket_id for ticket_id, in self.conn.execute('SELECT DISTINCT id FROM changes WHERE version > ? AND version <= ?',
+                                                                        (from_version, version))]
+        if len(ticket_ids) > len(tickets_df) // 2:
+            return None
+        tickets = []
+        for start in range(0, len(ticket_ids), 500): # within SQLite's limit on query parameters
+            chunk = ticket_ids[start:start + 500]
+            with self.lock:
+                rows = self.conn.execute(f'SELECT data FROM tickets WHERE id IN ({",".join("?" * len(chunk))})', chunk).fetchall()
+            tickets.extend({field: ticket.get(field) for field in fields} for ticket in (json.loads(data) for data, in rows))
+        return patch_ticket_frame(tickets_df, ticket_ids, tickets, fields)
+
+    def prune_changes(self):
+        """Drops the logged changes every table stored next to the cache already holds
+        """
+
+        from ticket_viewer.store import table_version
+
+        versions = [table_version(path) for path in glob.glob(f'{glob.escape(self.table_prefix)}*.table')]
+        oldest = min([version for version in versions if version is not None], default=None)
+        if oldest is None:
+            return
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM changes WHERE version <= ?', (oldest,))
+            self.conn.execute("INSERT OR REPLACE INTO sync VALUES ('changes_from', ?)", (max(oldest, self._sync_value('changes_from')),))
+
+    def update_table(self, fields, tickets_df, version):
+        """Takes a table patched with the changes merged into the cache (see ticket_viewer.watch) as the table of fields
+
+        The table is kept and written next to the cache as if ticket_table had rebuilt it, provided no other merge
+        has changed the cache since, so the next ticket_table does not decode every cached ticket again.
+
+        Parameters
+        ----------
+        fields : tuple of str
+            Fields of the table, 'id' first
+        tickets_df : DataFrame
+            Ticket data indexed by 'id', holding every cached ticket as of version
+        version : int
+            Cache version the table is current at
+
+        Returns
+        -------
+        Bool
+            True if the table was taken; False if the cache has changed since version
+        """
+
+        from ticket_viewer.store import write_table
+
+        if version != self.version:
+            return False
+        write_table(self.table_path(fields), tickets_df, version=version)
+        self._tables[fields] = (version, tickets_df)
+        self.prune_changes()
+        return True
+
+    def iter_pages(self, fields=None, page_size=1000):
+        """Yields cached tickets in id order, page_size tickets at a time, so the whole cache is never decoded at once
+
+        Parameters
+        ----------
+        fields : tuple of str, optional
+            Ticket fields kept, None keeps every field
+        page_size : int, optional
+            Number of tickets per page
+
+        Yields
+        ------
+        list of dicts
+            Ticket data of one page
+        """
+
+        last_id = -1
+        while True:
+            with self.lock:
+                rows = self.conn.execute('SELECT id, data FROM tickets WHERE id > ? ORDER BY id LIMIT ?', (last_id, page_size)).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            tickets = [json.loads(data) for _, data in rows]
+            if fields is not None:
+                tickets = [{field: ticket.get(field) for field in fields} for ticket in tickets]
+            yield tickets
+
+    def save_names(self, kind, pairs):
+        """Stores user or organization names
+
+        Parameters
+        ----------
+        kind : {'users', 'organizations'}
+            Kind of record
+        pairs : list of tuples
+            (id, name) pairs, a None name records an id the API has no name for
+        """
+
+        with self.lock, self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO names VALUES (?, ?, ?)', [(kind, record_id, name) for record_id, name in pairs])
+
+    def load_names(self, kind, ids=None, limit=None):
+        """Reads stored user or organization names
+
+        Parameters
+        ----------
+        kind : {'users', 'organizations'}
+            Kind of record
+        ids : list of ints, optional
+            Ids to read, None reads the most recently stored names
+        limit : int, optional
+            Most names read when ids is None
+
+        Returns
+        -------
+        list of tuples
+            (id, name) pairs found, oldest first
+        """
+
+        with self.lock:
+            if ids is None:
+                rows = self.conn.execute('SELECT id, name FROM names WHERE kind = ? ORDER BY rowid DESC LIMIT ?', (kind, -1 if limit is None else limit)).fetchall()
+                return rows[::-1]
+            rows = []
+            for start in range(0, len(ids), 500): # within SQLite's limit on query parameters
+                chunk = ids[start:start + 500]
+                rows.extend(self.conn.execute(f'SELECT id, name FROM names WHERE kind = ? AND id IN ({",".join("?" * len(chunk))})', (kind, *chunk)))
+            return rows
+
+    def size(self):
+        """Counts the cached tickets and their stored bytes
+
+        Returns
+        -------
+        tuple of (int, int)
+            Number of tickets and total bytes of ticket data
+        """
+
+        with self.lock:
+            count, total_bytes = self.conn.execute('SELECT COUNT(*), SUM(LENGTH(data)) FROM tickets').fetchone()
+        return count, total_bytes or 0
+
+    def get(self, ticket_id, now=None):
+        """Returns a cached ticket if it is fresh enough, counting the cache hit or miss
+
+        A ticket is fresh if it was fetched, or the whole cache was synced, within ttl seconds.
+
+        Parameters
+        ----------
+        ticket_id : int
+            Ticket id
+        now : float, optional
+            Current unix epoch time
+
+        Returns
+        -------
+        dict or None
+            Ticket data; None if the ticket is missing or stale
+        """
+
+        now = time.time() if now is None else now
+        with self.lock:
+            row = self.conn.execute('SELECT fetched_at, data FROM tickets WHERE id = ?', (ticket_id,)).fetchone()
+            synced_at = self._sync_value('synced_at')
+        if row is None or now - max(row[0], synced_at) > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.bytes_saved += len(row[1])
+        return json.loads(row[1])
+
+    def invalidate(self):
+        """Drops every cached ticket and the sync cursor, so the next sync downloads everything again
+        """
+
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM tickets')
+            self.conn.execute('DELETE FROM sync')
+            self.conn.execute('DELETE FROM names')
+            self.conn.execute('DELETE FROM changes')
+            self.conn.execute("INSERT INTO sync VALUES ('changes_from', 0)")
+        self._search_index = SearchIndex()
+        self._tables = {}
+        for path in [self.search_path] + glob.glob(f'{glob.escape(self.table_prefix)}*.table'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def stats(self):
+        """Summarises cache usage
+
+        Returns
+        -------
+        dict
+            Cache hits, misses, bytes_saved, cached tickets and bytes, and seconds since the last sync
+        """
+
+        count, total_bytes = self.size()
+        synced_at = self.synced_at
+        return {'hits': self.hits, 'misses': self.misses, 'bytes_saved': self.bytes_saved,
+                'tickets': count, 'bytes': total_bytes,
+                'last_sync_age': round(time.time() - synced_at) if synced_at else None}
+
+    def close(self):
+        self.save_search_index()
+        self.conn.close()
@@ -0,0 +1,226 @@
+import random
+import requests
+from requests.adapters import HTTPAdapter
+import threading
+import time
+from ticket_viewer.metrics import metrics
+
+RETRY_STATUSES = (500, 502, 503, 504) # transient server errors worth retrying
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every request made through a ZendeskClient
+
+    Tokens refill continuously at requests_per_minute / 60 per second, up to burst tokens,
+    so concurrent page fetches together never exceed the account's API rate limit. The rate and
+    tokens are corrected from the rate limit headers of each response (see update).
+
+    Parameters
+    ----------
+    requests_per_minute : int, optional
+        Request budget per minute, defaults to Zendesk's 400 requests/minute limit
+    burst : int, optional
+        Maximum number of requests that may be sent back-to-back, defaults to a tenth of the minute budget
+    """
+
+    def __init__(self, requests_per_minute=400, burst=None):
+        self.rate = requests_per_minute / 60
+        self.capacity = burst or max(1, requests_per_minute // 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request token is available and consumes it
+        """
+
+        with self.lock:
+            pause = self.paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Holds back every caller of acquire for seconds, e.g. after a 429 response with Retry-After
+
+        Parameters
+        ----------
+        seconds : float
+            Seconds before the next request may be sent
+        """
+
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def update(self, headers):
+        """Adapts the bucket to the rate limit the API reports on a response
+
+        The refill rate follows the account's per-minute limit (X-Rate-Limit / ratelimit-limit) and the bucket
+        never holds more tokens than the API says remain (X-Rate-Limit-Remaining / ratelimit-remaining). When
+        none remain, requests are paused until the reported reset (ratelimit-reset).
+
+        Parameters
+        ----------
+        headers : dict
+            Response headers
+        """
+
+        limit = header_number(headers, 'x-rate-limit', 'ratelimit-limit')
+        remaining = header_number(headers, 'x-rate-limit-remaining', 'ratelimit-remaining')
+        reset = header_number(headers, 'ratelimit-reset')
+        with self.lock:
+            if limit:
+                self.rate = limit / 60
+            if remaining is not None:
+                self.tokens = min(self.tokens, remaining)
+            if remaining == 0 and reset:
+                self.paused_until = max(self.paused_until, time.monotonic() + reset)
+
+def header_number(headers, *names):
+    """Reads the first of names present in headers as a number, None if missing or not numeric"""
+    for name in names:
+        value = headers.get(name)
+        if isinstance(value, (str, int, float)):
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    return None
+
+class ZendeskClient:
+    """Pooled, keep-alive HTTP client for a single Zendesk subdomain
+
+    Owns one requests.Session with auth, headers and connection pool set once, so every API call
+    (credential validation, ticket pages, single tickets) reuses the same TCP+TLS connection.
+
+    Parameters
+    ----------
+    subdomain : str
+        Name of Zendesk subdomain
+    email : str
+        Login email credential
+    api_token : str
+        Login API token credential
+    base_url : str, optional
+        Override for the API host (e.g. a local stand-in server), defaults to https://{subdomain}.zendesk.com
+    pool_maxsize : int, optional
+        Maximum number of keep-alive connections held open to the API host
+    requests_per_minute : int, optional
+        Rate limit budget shared by every request sent through this client
+    timeout : float or tuple of (float, float), optional
+        Seconds to wait for the connection and for the response of each request
+    max_retries : int, optional
+        Retries allowed per request for 429s, transient 5xx responses, timeouts and connection errors
+    backoff : float, optional
+        Base delay in seconds of the exponential backoff between retries
+    """
+
+    def __init__(self, subdomain, email, api_token, base_url=None, pool_maxsize=10, requests_per_minute=400,
+                 timeout=(5, 30), max_retries=5, backoff=0.5):
+        self.subdomain = subdomain
+        self.email = email
+        self.base_url = (base_url or f'https://{subdomain}.zendesk.com').rstrip('/')
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = 30
+
+        self.session = requests.Session()
+        self.session.auth = (email, api_token)
+        self.session.headers.update({'Accept': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def url(self, path):
+        """Builds the full API url for path, e.g. url('tickets.json')
+
+        Parameters
+        ----------
+        path : str
+            API path relative to /api/v2/
+
+        Returns
+        -------
+        str
+            Absolute API url
+        """
+
+        return f'{self.base_url}/api/v2/{path}'
+
+    def get(self, url, **kwargs):
+        """Sends a GET request over the pooled session once the rate limit budget allows it, retrying failures
+
+        Every request goes through the shared RateLimiter, which is fed the rate limit headers of each response.
+        A 429 pauses all requests of the client for its Retry-After (plus jitter, so threads do not retry in
+        lockstep); 5xx responses, timeouts and connection errors are retried after an exponential backoff with
+        full jitter. Each request gets at most max_retries retries.
+
+        Parameters
+        ----------
+        url : str
+            Absolute API url
+
+        Returns
+        -------
+        Response
+            requests Response object, the last one received if every retry failed
+
+        Raises
+        ------
+        requests.RequestException
+            If the request timed out or could not connect on every attempt
+        """
+
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.max_retries + 1):
+            with metrics.timer('http.wait'):
+                self.rate_limiter.acquire()
+            last_attempt = attempt == self.max_retries
+            try:
+                with metrics.timer('http.request'):
+                    resp = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+                metrics.count('http.retry.connection')
+                with metrics.timer('http.wait'):
+                    time.sleep(self.backoff_delay(attempt))
+                continue
+            self.rate_limiter.update(resp.headers)
+            if resp.status_code == 429 and not last_attempt:
+                metrics.count('http.retry.rate_limited')
+                retry_after = header_number(resp.headers, 'retry-after')
+                self.rate_limiter.pause((retry_after if retry_after is not None else self.backoff_delay(attempt)) + random.random())
+            elif resp.status_code in RETRY_STATUSES and not last_attempt:
+                metrics.count('http.retry.server_error')
+                with metrics.timer('http.wait'):
+                    time.sleep(self.backoff_delay(attempt))
+            else:
+                return resp
+
+    def backoff_delay(self, attempt):
+        """Random delay before retry number attempt + 1: full jitter over an exponentially growing window"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def close(self):
+        """Closes all pooled connections
+        """
+
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
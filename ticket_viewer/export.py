@@ -0,0 +1,287 @@
+import csv
+from importlib.util import find_spec
+import io
+import json
+import os
+import shutil
+from ticket_viewer.pipeline import TICKET_FIELDS
+
+EXPORT_FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.parquet': 'parquet'} # file extension -> format
+PARQUET_AVAILABLE = find_spec('pyarrow') is not None # Parquet export needs pyarrow, which is optional
+PARQUET_PART_TICKETS = 10000 # tickets buffered per Parquet part file, bounding memory and the work redone on resume
+INTEGER_FIELDS = frozenset(field for field in TICKET_FIELDS if field == 'id' or field.endswith('_id')) # other fields, e.g. the free-form external_id, are strings
+
+def cell(value):
+    """Formats a ticket value for a text column, lists and dicts (tags, custom fields) as JSON"""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return str(value)
+
+class LineWriter:
+    """Appends pages of rows to a CSV or NDJSON file, which can be cut back to any page boundary
+
+    Parameters
+    ----------
+    path : str
+        Output file path
+    export_format : {'csv', 'ndjson'}
+        Output format
+    fields : tuple of str
+        Ticket fields, in column order
+    position : int, optional
+        Byte size of the output after the last completed page of an export being resumed, None starts over
+    """
+
+    def __init__(self, path, export_format, fields, position=None):
+        self.export_format = export_format
+        self.fields = fields
+        if position is None:
+            self.file = open(path, 'wb')
+            if export_format == 'csv':
+                self.write([fields], header=True)
+        else:
+            # drop anything written after the last completed page
+            self.file = open(path, 'r+b')
+            self.file.truncate(position)
+            self.file.seek(position)
+
+    def write(self, rows, header=False):
+        text = io.StringIO()
+        if self.export_format == 'csv':
+            csv.writer(text, lineterminator='\n').writerows(rows if header else ([cell(value) for value in row] for row in rows))
+        else:
+            for row in rows:
+                text.write(json.dumps(dict(zip(self.fields, row))) + '\n')
+        self.file.write(text.getvalue().encode())
+
+    def commit(self):
+        """Makes the pages written so far durable
+
+        Returns
+        -------
+        int
+            Byte size of the output, the position a resumed export continues from
+        """
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def finish(self):
+        self.file.close()
+
+    def close(self):
+        self.file.close()
+
+class ParquetWriter:
+    """Writes pages of rows to a Parquet file through part files, so an interrupted export keeps its finished parts
+
+    A Parquet file is only readable once its footer is written, so rows are buffered into part files of
+    PARQUET_PART_TICKETS tickets next to the output, and the parts are copied into the output one row group
+    at a time when the export completes. The ticket and user/organization ids of INTEGER_FIELDS are stored as int64,
+    everything else as strings.
+
+    Parameters
+    ----------
+    path : str
+        Output file path
+    fields : tuple of str
+        Ticket fields, in column order
+    position : int, optional
+        Number of completed part files of an export being resumed, None starts over
+    """
+
+    def __init__(self, path, fields, position=None):
+        import pyarrow as pa
+
+        self.path = path
+        self.fields = fields
+        self.parts_dir = path + '.parts'
+        self.schema = pa.schema([(field, pa.int64() if field in INTEGER_FIELDS else pa.string()) for field in fields])
+        if position is None and os.path.isdir(self.parts_dir):
+            shutil.rmtree(self.parts_dir)
+        os.makedirs(self.parts_dir, exist_ok=True)
+        self.part_count = position or 0
+        for name in os.listdir(self.parts_dir):
+            if name.endswith('.tmp') or int(name.split('.')[0]) >= self.part_count:
+                os.remove(os.path.join(self.parts_dir, name))
+        self.rows = []
+
+    def part_path(self, part):
+        return os.path.join(self.parts_dir, f'{part:06d}.parquet')
+
+    def write(self, rows):
+        self.rows.extend(rows)
+
+    def _write_part(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = list(zip(*self.rows))
+        arrays = [pa.array(values if field.type == pa.int64() else [cell(value) for value in values], type=field.type)
+                  for field, values in zip(self.schema, columns)]
+        path = self.part_path(self.part_count)
+        pq.write_table(pa.Table.from_arrays(arrays, schema=self.schema), path + '.tmp')
+        os.replace(path + '.tmp', path)
+        self.part_count += 1
+        self.rows = []
+
+    def commit(self):
+        """Writes a part file once enough rows are buffered
+
+        Returns
+        -------
+        int or None
+            Number of completed part files; None if the buffered rows are not durable yet
+        """
+
+        if len(self.rows) < PARQUET_PART_TICKETS:
+            return None
+        self._write_part()
+        return self.part_count
+
+    def finish(self):
+        import pyarrow.parquet as pq
+
+        if self.rows:
+            self._write_part()
+        with pq.ParquetWriter(self.path + '.tmp', self.schema) as writer:
+            for part in range(self.part_count):
+                writer.write_table(pq.read_table(self.part_path(part), schema=self.schema))
+        os.replace(self.path + '.tmp', self.path)
+        shutil.rmtree(self.parts_dir)
+
+    def close(self):
+        pass
+
+class TicketExport:
+    """Export of every ticket to a file, resumable from its last completed page
+
+    After each page is durably written, a checkpoint file next to the output records the url of the next
+    page and the output position, so a broken export is picked up from there by running it again. The
+    checkpoint is removed once the export completes.
+
+    Parameters
+    ----------
+    path : str
+        Output file path
+    export_format : {'csv', 'ndjson', 'parquet'}
+        Output format
+    fields : tuple of str
+        Ticket fields exported, in column order
+    checkpoint : dict, optional
+        Checkpoint of an export being resumed
+    """
+
+    def __init__(self, path, export_format, fields, checkpoint=None):
+        self.path = path
+        self.checkpoint_path = path + '.progress'
+        self.export_format = export_format
+        self.fields = tuple(fields)
+        checkpoint = checkpoint or {}
+        self.next_url = checkpoint.get('next_url')
+        self.tickets = checkpoint.get('tickets', 0)
+        self.pending_tickets = 0
+        position = checkpoint.get('position')
+        if export_format == 'parquet':
+            self.writer = ParquetWriter(path, self.fields, position)
+        else:
+            self.writer = LineWriter(path, export_format, self.fields, position)
+
+    @property
+    def resumed(self):
+        return self.next_url is not None
+
+    @classmethod
+    def open(cls, path, export_format=None, fields=TICKET_FIELDS, restart=False):
+        """Starts an export, or resumes the export to path if its checkpoint matches the format and fields
+
+        Parameters
+        ----------
+        path : str
+            Output file path
+        export_format : {'csv', 'ndjson', 'parquet'}, optional
+            Output format, guessed from the file extension if not given
+        fields : tuple of str, optional
+            Ticket fields exported
+        restart : Bool, optional
+            Ignore any checkpoint and start over
+
+        Returns
+        -------
+        TicketExport or Bool
+            Export ready for its next page; False if the format is unknown or unavailable
+        """
+
+        export_format = export_format or EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+        if export_format not in EXPORT_FORMATS.values():
+            print(f"Export format of '{path}' unknown, use --format with one of csv, ndjson, parquet.")
+            return False
+        if export_format == 'parquet' and not PARQUET_AVAILABLE:
+            print('Parquet export needs pyarrow, install it with pip install pyarrow.')
+            return False
+        checkpoint = None
+        if not restart and os.path.exists(path + '.progress'):
+            try:
+                with open(path + '.progress') as checkpoint_file:
+                    checkpoint = json.load(checkpoint_file)
+            except (ValueError, OSError):
+                checkpoint = None
+            if not isinstance(checkpoint, dict):
+                print(f"Found an unfinished export to '{path}' but its checkpoint is unreadable, starting over.")
+                checkpoint = None
+            elif (checkpoint.get('format'), tuple(checkpoint.get('fields', ()))) != (export_format, tuple(fields)):
+                print(f"Found an unfinished export to '{path}' with another format or fields, starting over.")
+                checkpoint = None
+            elif not os.path.exists(path + '.parts' if export_format == 'parquet' else path):
+                print(f"Found an unfinished export to '{path}' but its output is missing, starting over.")
+                checkpoint = None
+        return cls(path, export_format, fields, checkpoint)
+
+    def write_page(self, tickets, next_url):
+        """Writes a page of tickets and checkpoints the export once they are durable
+
+        Parameters
+        ----------
+        tickets : list of dicts or TicketRecords
+            Ticket data of one page; TicketRecords are taken as rows in TICKET_FIELDS order
+        next_url : str or None
+            Url of the next page, None after the last page
+        """
+
+        rows = [tuple(map(ticket.get, self.fields)) if isinstance(ticket, dict) else ticket for ticket in tickets]
+        self.writer.write(rows)
+        self.pending_tickets += len(rows)
+        position = self.writer.commit()
+        if position is not None and next_url is not None:
+            self.tickets += self.pending_tickets
+            self.pending_tickets = 0
+            self.next_url = next_url
+            checkpoint = {'format': self.export_format, 'fields': self.fields, 'next_url': next_url, 'tickets': self.tickets, 'position': position}
+            with open(self.checkpoint_path + '.tmp', 'w') as checkpoint_file:
+                json.dump(checkpoint, checkpoint_file)
+            os.replace(self.checkpoint_path + '.tmp', self.checkpoint_path)
+
+    def finish(self):
+        """Completes the output file and removes the checkpoint
+
+        Returns
+        -------
+        int
+            Number of tickets in the output
+        """
+
+        self.writer.finish()
+        self.tickets += self.pending_tickets
+        self.pending_tickets = 0
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return self.tickets
+
+    def close(self):
+        """Closes the output of an unfinished export, leaving its checkpoint for a later resume
+        """
+
+        self.writer.close()
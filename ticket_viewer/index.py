@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from ticket_viewer.table import ACCOUNT_COLUMN, CATEGORY_COLUMNS, ID_COLUMNS, KNOWN_CATEGORIES, TEXT_COLUMNS
+
+MISSING_ID = -1 # stands in for a missing user/organization id in the id indexes, Zendesk ids are positive
+MISSING_KEY = np.iinfo('int64').max # sort key of missing values, so they come last in either direction
+CODE_COLUMNS = CATEGORY_COLUMNS + (ACCOUNT_COLUMN,) # matched and sorted on their categorical codes, subdomain only in merged tables
+SORT_COLUMNS = ('id',) + TEXT_COLUMNS + CODE_COLUMNS + ID_COLUMNS
+
+class TicketIndex:
+    """Per-column indexes over the ticket table, built once per dataset, for filtering and sorting without Python scans
+
+    priority, status and, in a table merged from several accounts, subdomain are matched on their categorical
+    codes, a vectorized comparison per filter. User and organization ids are kept sorted alongside their row
+    positions, so matching an id is a binary search that returns its rows directly. Sort orders are stable (ties stay in id order) and computed once per column.
+
+    Parameters
+    ----------
+    tickets_df : DataFrame
+        Ticket table as built by process_all_tickets
+    """
+
+    def __init__(self, tickets_df):
+        self.tickets_df = tickets_df
+        # a table of a single account has no subdomain column, which then matches no value and sorts nothing
+        code_columns = [column for column in CODE_COLUMNS if column in tickets_df.columns]
+        self.codes = {column: np.asarray(tickets_df[column].cat.codes) for column in code_columns}
+        self.category_codes = {column: {value: code for code, value in enumerate(tickets_df[column].cat.categories)} for column in code_columns}
+        self.id_indexes = {}
+        for column in ID_COLUMNS:
+            values = tickets_df[column].to_numpy(dtype='int64', na_value=MISSING_ID)
+            order = np.argsort(values, kind='stable')
+            self.id_indexes[column] = (values[order], order)
+        self.orders = {}
+
+    def __len__(self):
+        return len(self.tickets_df)
+
+    def match(self, column, value):
+        """Finds the rows where column equals value
+
+        Parameters
+        ----------
+        column : str
+            One of CODE_COLUMNS or ID_COLUMNS
+        value : str, int or None
+            Value to match, None matches missing values
+
+        Returns
+        -------
+        ndarray of bool
+            Row mask
+        """
+
+        if column in CODE_COLUMNS:
+            code = -1 if value is None else self.category_codes.get(column, {}).get(value)
+            if code is None or column not in self.codes:
+                return np.zeros(len(self), dtype=bool)
+            return self.codes[column] == code
+        sorted_values, order = self.id_indexes[column]
+        value = MISSING_ID if value is None else value
+        start, stop = np.searchsorted(sorted_values, value, side='left'), np.searchsorted(sorted_values, value, side='right')
+        mask = np.zeros(len(self), dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    def sort_key(self, column):
+        """Integer sort key of a column, missing values as MISSING_KEY
+
+        priority and status sort in workflow order (KNOWN_CATEGORIES), e.g. low < normal < high < urgent,
+        subdomains alphabetically.
+        """
+
+        if column == 'id':
+            return np.asarray(self.tickets_df.index, dtype='int64')
+        if column == ACCOUNT_COLUMN and column not in self.codes:
+            return np.zeros(len(self), dtype='int64')
+        if column in CODE_COLUMNS:
+            # known values in workflow order, then any others alphabetically; code -1 (missing) picks the last rank
+            known = KNOWN_CATEGORIES.get(column, ())
+            categories = list(self.category_codes[column])
+            rank_of = {value: rank for rank, value in enumerate(list(known) + sorted(value for value in categories if value not in known))}
+            ranks = np.array([rank_of[value] for value in categories] + [MISSING_KEY], dtype='int64')
+            return ranks[self.codes[column]]
+        if column in ID_COLUMNS:
+            return self.tickets_df[column].to_numpy(dtype='int64', na_value=MISSING_KEY)
+        codes, _ = pd.factorize(self.tickets_df[column].str.lower(), sort=True)
+        return np.where(codes == -1, MISSING_KEY, codes)
+
+    def order(self, column, descending=False):
+        """Row positions of the table sorted by column, missing values last
+
+        Parameters
+        ----------
+        column : str
+            One of SORT_COLUMNS
+        descending : Bool, optional
+            Sort from largest to smallest
+
+        Returns
+        -------
+        ndarray of int
+            Row positions
+        """
+
+        key = (column, descending)
+        if key not in self.orders:
+            sort_key = self.sort_key(column)
+            if descending:
+                sort_key = np.where(sort_key == MISSING_KEY, MISSING_KEY, -sort_key)
+            self.orders[key] = np.argsort(sort_key, kind='stable')
+        return self.orders[key]
+
+    def view(self, filters=None, sort_column='id', descending=False):
+        """Returns the rows matching every filter, in sort order
+
+        Parameters
+        ----------
+        filters : dict, optional
+            Column to value, see match
+        sort_column : str, optional
+            Column to sort by, see order
+        descending : Bool, optional
+            Sort from largest to smallest
+
+        Returns
+        -------
+        DataFrame
+            Matching rows of the ticket table
+        """
+
+        mask = None
+        for column, value in (filters or {}).items():
+            column_mask = self.match(column, value)
+            mask = column_mask if mask is None else mask & column_mask
+        positions = self.order(sort_column, descending)
+        if mask is not None:
+            positions = positions[mask[positions]]
+        return self.tickets_df.iloc[positions]
@@ -0,0 +1,159 @@
+import bisect
+import functools
+import json
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10) # histogram bucket upper bounds, seconds
+
+class Timer:
+    """Context manager recording the seconds spent in its block as one observation of a timing"""
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+
+class NullTimer:
+    """Timer handed out while metrics are disabled, recording nothing"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+NULL_TIMER = NullTimer()
+
+class Metrics:
+    """Counters and timings of the viewer's hot paths, e.g. request latency, bytes received, retries and render time
+
+    Timings keep their count, total, maximum and a histogram over LATENCY_BUCKETS, from which percentiles are
+    estimated. Hooks are placed per request or per page, never per ticket, and return straight after checking
+    enabled when metrics are turned off.
+
+    Parameters
+    ----------
+    enabled : Bool, optional
+        Record observations; False turns every hook into a no-op
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drops every recorded counter and timing
+        """
+
+        with self.lock:
+            self.counters = {}
+            self.timings = {} # name -> [count, total seconds, max seconds, bucket counts]
+            self.started = time.time()
+
+    def count(self, name, value=1):
+        """Adds value to counter name"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Records one observation of timing name"""
+        if not self.enabled:
+            return
+        with self.lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = [0, 0.0, 0.0, [0] * (len(LATENCY_BUCKETS) + 1)]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+            timing[3][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def timer(self, name):
+        """Returns a context manager timing its block as an observation of name"""
+        return Timer(self, name) if self.enabled else NULL_TIMER
+
+    def timed(self, name):
+        """Decorator timing every call of a function as an observation of name"""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with Timer(self, name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Summarises everything recorded since the last reset
+
+        Returns
+        -------
+        dict
+            enabled, started (unix epoch time), counters, and per timing its count, total, mean, max, estimated
+            p50/p90/p99 in seconds and histogram buckets as {'le': upper bound, 'count': observations}
+        """
+
+        with self.lock:
+            counters = dict(self.counters)
+            timings = {name: (count, total, maximum, list(buckets)) for name, (count, total, maximum, buckets) in self.timings.items()}
+        summary = {}
+        for name, (count, total, maximum, buckets) in sorted(timings.items()):
+            summary[name] = {'count': count, 'total_seconds': total, 'mean_seconds': total / count, 'max_seconds': maximum,
+                             **{f'p{percent}_seconds': percentile(buckets, percent, maximum) for percent in (50, 90, 99)},
+                             'buckets': [{'le': bound, 'count': bucket_count} for bound, bucket_count in zip(LATENCY_BUCKETS + ('inf',), buckets)]}
+        return {'enabled': self.enabled, 'started': self.started, 'counters': dict(sorted(counters.items())), 'timings': summary}
+
+    def dump(self, path):
+        """Writes snapshot() to path as JSON
+
+        Parameters
+        ----------
+        path : str
+            Output file path
+        """
+
+        with open(path, 'w') as metrics_file:
+            json.dump(self.snapshot(), metrics_file, indent=2)
+
+def percentile(buckets, percent, maximum):
+    """Estimates a percentile from histogram bucket counts, interpolating linearly inside the bucket it falls in
+
+    Parameters
+    ----------
+    buckets : list of int
+        Observations per LATENCY_BUCKETS bucket, plus one for anything larger
+    percent : float
+        Percentile, e.g. 90
+    maximum : float
+        Largest observation, the estimate never exceeds it
+
+    Returns
+    -------
+    float
+        Estimated percentile in seconds
+    """
+
+    rank = sum(buckets) * percent / 100
+    seen = 0
+    lower = 0.0
+    for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+        if bucket_count and seen + bucket_count >= rank:
+            return min(lower + (bound - lower) * (rank - seen) / bucket_count, maximum)
+        seen += bucket_count
+        lower = bound
+    return maximum
+
+metrics = Metrics() # shared by every module, turned off with ZCC_METRICS=off (see interface_tool)
@@ -0,0 +1,207 @@
+from collections import OrderedDict
+import threading
+
+SIDELOADS = 'users,organizations' # include= parameter asking the API to side-load the users and organizations of a page
+NAME_COLUMNS = {'submitter_id': ('users', 'submitter'), 'assignee_id': ('users', 'assignee'), 'organization_id': ('organizations', 'organization')} # id column -> (kind, display header)
+DEFAULT_NAME_CACHE_SIZE = 100000 # names kept in memory per kind, overridden by ZCC_NAME_CACHE_SIZE
+UNKNOWN = '' # stands in for an id the API did not return a name for, so it is not requested again
+
+def with_include(api_url, include):
+    """Adds include= side-loads to an API url, unless it already asks for them"""
+    if not include or 'include=' in api_url:
+        return api_url
+    return api_url + ('&' if '?' in api_url else '?') + f'include={include}'
+
+class NameDirectory:
+    """LRU cache of user and organization names by id, so ticket tables show names without a request per row
+
+    Names arrive side-loaded with the ticket pages (see SIDELOADS), are written through to an optional store
+    (TicketCache) so they survive restarts, and ids still unknown when a page is shown are requested in bulk
+    through fetch. Each kind keeps at most maxsize names in memory, the least recently shown are evicted first.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Names kept in memory per kind
+    store : TicketCache, optional
+        Persistent store of names, read on first use and written on every add
+    fetch : callable, optional
+        Called with (kind, ids) to request unknown names, returns (id, name) pairs or False on an API error
+    """
+
+    def __init__(self, maxsize=DEFAULT_NAME_CACHE_SIZE, store=None, fetch=None):
+        self.maxsize = maxsize
+        self.store = store
+        self.fetch = fetch
+        self.names = {kind: OrderedDict() for kind in ('users', 'organizations')}
+        self.loaded = store is None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(names) for names in self.names.values())
+
+    def _load(self):
+        # the most recently stored names of each kind, read once on first use
+        if not self.loaded:
+            self.loaded = True
+            for kind in self.names:
+                self._add(kind, self.store.load_names(kind, limit=self.maxsize))
+
+    def _add(self, kind, pairs):
+        names = self.names[kind]
+        for record_id, name in pairs:
+            names[record_id] = name if name is not None else UNKNOWN
+            names.move_to_end(record_id)
+        while len(names) > self.maxsize:
+            names.popitem(last=False)
+
+    def add(self, kind, records):
+        """Remembers names, and stores them if the directory has a store
+
+        Parameters
+        ----------
+        kind : {'users', 'organizations'}
+            Kind of record
+        records : list of dicts or tuples
+            Side-loaded records with 'id' and 'name', or (id, name) pairs
+        """
+
+        pairs = [(record['id'], record.get('name')) if isinstance(record, dict) else tuple(record) for record in records]
+        if not pairs:
+            return
+        with self.lock:
+            self._load()
+            self._add(kind, pairs)
+        if self.store is not None:
+            self.store.save_names(kind, pairs)
+
+    def add_page(self, page_data):
+        """Remembers the users and organizations side-loaded with a page of tickets"""
+        for kind in self.names:
+            if page_data.get(kind):
+                self.add(kind, page_data[kind])
+
+    def get(self, kind, record_id):
+        """Returns the name of a user or organization, None if it is not known"""
+        with self.lock:
+            self._load()
+            name = self.names[kind].get(record_id)
+            if name is not None:
+                self.names[kind].move_to_end(record_id)
+        return name or None
+
+    def label(self, column, value):
+        """Formats an id of a NAME_COLUMNS column for display: its name if known, the id otherwise"""
+        return self.get(NAME_COLUMNS[column][0], value) or str(value)
+
+    def describe(self, column, value):
+        """Formats an id of a NAME_COLUMNS column for the ticket detail view: 'name (id)' if the name is known, the id otherwise"""
+        name = None if value is None else self.get(NAME_COLUMNS[column][0], value)
+        return f'{name} ({value})' if name else value
+
+    def ensure(self, kind, ids):
+        """Makes sure the names of ids are in memory, from the store or else requested in bulk through fetch
+
+        Ids the API has no name for are remembered as unknown, so they are not requested again.
+
+        Parameters
+        ----------
+        kind : {'users', 'organizations'}
+            Kind of record
+        ids : iterable of ints
+            Ids about to be shown, missing values (None) are skipped
+
+        Returns
+        -------
+        Bool
+            False if fetching unknown names failed
+        """
+
+        with self.lock:
+            self._load()
+            missing = sorted({record_id for record_id in ids if record_id is not None and record_id not in self.names[kind]})
+        if missing and self.store is not None:
+            stored = self.store.load_names(kind, missing)
+            with self.lock:
+                self._add(kind, stored)
+            found = {record_id for record_id, _ in stored}
+            missing = [record_id for record_id in missing if record_id not in found]
+        if not missing or self.fetch is None:
+            return True
+        pairs = self.fetch(kind, missing)
+        if pairs is False:
+            return False
+        found = {record_id for record_id, _ in pairs}
+        self.add(kind, list(pairs) + [(record_id, None) for record_id in missing if record_id not in found])
+        return True
+
+    def account(self, subdomain):
+        """Returns the directory of an account's names, this one whatever the subdomain, see AccountNames"""
+        return self
+
+    def ensure_rows(self, tickets_df):
+        """Makes sure the names of every id in NAME_COLUMNS of a table or page are in memory, see ensure"""
+        ids = {}
+        for column, (kind, _) in NAME_COLUMNS.items():
+            if column in tickets_df.columns:
+                ids.setdefault(kind, set()).update(tickets_df[column].dropna().unique().tolist())
+        for kind, kind_ids in ids.items():
+            self.ensure(kind, kind_ids)
+
+class AccountNames:
+    """Name directories of several Zendesk accounts, one per subdomain, for tables merged by table.merge_account_frames
+
+    User and organization ids are only unique within an account, so each account keeps its own NameDirectory,
+    fed by its own downloads and stored in its own cache, and a merged row is labelled from the directory of
+    its subdomain (see account). Everything else, e.g. select or summary of the first account, goes to the
+    directory of the first account.
+
+    Parameters
+    ----------
+    directories : dict
+        Subdomain -> NameDirectory, the first account first
+    """
+
+    def __init__(self, directories):
+        self.directories = directories
+        self.primary = next(iter(directories.values()))
+
+    def __len__(self):
+        return sum(len(directory) for directory in self.directories.values())
+
+    def add(self, kind, records):
+        """Remembers names of the first account, see NameDirectory.add"""
+        self.primary.add(kind, records)
+
+    def add_page(self, page_data):
+        """Remembers the users and organizations side-loaded with a page of the first account's tickets"""
+        self.primary.add_page(page_data)
+
+    def get(self, kind, record_id):
+        """Returns the name of a user or organization of the first account, None if it is not known"""
+        return self.primary.get(kind, record_id)
+
+    def label(self, column, value):
+        """Formats an id of the first account for display, see NameDirectory.label"""
+        return self.primary.label(column, value)
+
+    def describe(self, column, value):
+        """Formats an id of the first account for the ticket detail view, see NameDirectory.describe"""
+        return self.primary.describe(column, value)
+
+    def ensure(self, kind, ids):
+        """Makes sure the names of ids of the first account are in memory, see NameDirectory.ensure"""
+        return self.primary.ensure(kind, ids)
+
+    def account(self, subdomain):
+        """Returns the NameDirectory of an account, the first account's if subdomain is None"""
+        return self.directories[subdomain] if subdomain is not None else self.primary
+
+    def ensure_rows(self, tickets_df):
+        """Makes sure the names of every id in NAME_COLUMNS of a merged table or page are in memory, per account"""
+        from ticket_viewer.table import ACCOUNT_COLUMN
+
+        if ACCOUNT_COLUMN not in tickets_df.columns:
+            return self.primary.ensure_rows(tickets_df)
+        for subdomain, rows in tickets_df.groupby(ACCOUNT_COLUMN, observed=True):
+            self.account(subdomain).ensure_rows(rows)
@@ -0,0 +1,153 @@
+from importlib.util import find_spec
+import json
+from typing import List, NamedTuple, Optional
+
+TICKET_FIELDS = ('id', 'subject', 'priority', 'status', 'submitter_id', 'assignee_id', 'organization_id') # fields kept for the ticket table
+
+class TicketRecord(NamedTuple):
+    """Compact row of the fields the ticket table uses, in TICKET_FIELDS order"""
+    id: int
+    subject: Optional[str]
+    priority: Optional[str]
+    status: Optional[str]
+    submitter_id: Optional[int]
+    assignee_id: Optional[int]
+    organization_id: Optional[int]
+
+# optional fast JSON decoders: msgspec decodes only the table fields, orjson decodes everything but faster than json.
+# Only their availability is checked here, they are imported when the first ticket page is decoded
+JSON_BACKENDS = tuple(backend for backend in ('msgspec', 'orjson') if find_spec(backend)) + ('json',)
+JSON_BACKEND = JSON_BACKENDS[0]
+_page_decoders = {}
+
+def _msgspec_page_decoder():
+    import msgspec
+
+    class TicketStruct(msgspec.Struct):
+        id: int
+        subject: Optional[str] = None
+        priority: Optional[str] = None
+        status: Optional[str] = None
+        submitter_id: Optional[int] = None
+        assignee_id: Optional[int] = None
+        organization_id: Optional[int] = None
+
+    class NamedStruct(msgspec.Struct):
+        id: int
+        name: Optional[str] = None
+
+    class TicketPageStruct(msgspec.Struct):
+        tickets: List[TicketStruct] = []
+        users: List[NamedStruct] = []
+        organizations: List[NamedStruct] = []
+        count: Optional[int] = None
+        next_page: Optional[str] = None
+        end_time: Optional[int] = None
+        end_of_stream: Optional[bool] = None
+        meta: Optional[dict] = None
+        links: Optional[dict] = None
+
+    decoder = msgspec.json.Decoder(TicketPageStruct)
+    astuple = msgspec.structs.astuple
+
+    def decode(content):
+        page = decoder.decode(content)
+        page_data = {key: getattr(page, key) for key in ('count', 'next_page', 'end_time', 'end_of_stream', 'meta', 'links') if getattr(page, key) is not None}
+        page_data['tickets'] = [TicketRecord(*astuple(ticket)) for ticket in page.tickets]
+        for kind in ('users', 'organizations'):
+            if getattr(page, kind):
+                page_data[kind] = [(record.id, record.name) for record in getattr(page, kind)]
+        return page_data
+    return decode
+
+def _dict_page_decoder(loads):
+    def decode(content):
+        page_data = loads(content)
+        page_data['tickets'] = to_records(page_data['tickets'])
+        for kind in ('users', 'organizations'):
+            if page_data.get(kind):
+                page_data[kind] = [(record['id'], record.get('name')) for record in page_data[kind]]
+        return page_data
+    return decode
+
+def page_decoder(backend):
+    """Returns the ticket page decoder of a JSON backend, importing the backend on first use
+
+    Parameters
+    ----------
+    backend : str
+        One of JSON_BACKENDS
+
+    Returns
+    -------
+    function
+        Decoder from raw page bytes to page data with 'tickets' as TicketRecords
+    """
+
+    decoder = _page_decoders.get(backend)
+    if decoder is None:
+        if backend == 'msgspec':
+            decoder = _msgspec_page_decoder()
+        elif backend == 'orjson':
+            import orjson
+            decoder = _dict_page_decoder(orjson.loads)
+        else:
+            decoder = _dict_page_decoder(json.loads)
+        _page_decoders[backend] = decoder
+    return decoder
+
+def decode_ticket_page(content):
+    """Decodes a raw Tickets API page, keeping only TICKET_FIELDS of each ticket as TicketRecords
+
+    Uses msgspec or orjson when installed, falling back to the standard json module.
+
+    Parameters
+    ----------
+    content : bytes
+        Raw JSON body of a tickets page
+
+    Returns
+    -------
+    dict
+        Page data with 'tickets' as a list of TicketRecords, plus the pagination keys of the page and any
+        side-loaded 'users' and 'organizations' as (id, name) pairs
+    """
+
+    return page_decoder(JSON_BACKEND)(content)
+
+def to_records(tickets):
+    """Converts ticket dicts into TicketRecords
+
+    Parameters
+    ----------
+    tickets : list of dicts
+        Ticket data, each dict containing the data of 1 ticket
+
+    Returns
+    -------
+    list of TicketRecords
+        Ticket rows in TICKET_FIELDS order
+    """
+
+    make = TicketRecord._make
+    return [make(map(ticket.get, TICKET_FIELDS)) for ticket in tickets]
+
+def project_tickets(tickets, fields=TICKET_FIELDS):
+    """Keeps only fields of each ticket, so large descriptions and custom fields can be freed page by page
+
+    Parameters
+    ----------
+    tickets : list of dicts
+        Ticket data from API, each dict containing the data of 1 ticket
+    fields : tuple of str, optional
+        Ticket fields to keep, None keeps every field
+
+    Returns
+    -------
+    list of dicts
+        Projected ticket data
+    """
+
+    if fields is None:
+        return tickets
+    return [{field: ticket.get(field) for field in fields} for ticket in tickets]
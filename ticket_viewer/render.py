@@ -0,0 +1,434 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import math
+import threading
+import pandas as pd
+from ticket_viewer.metrics import metrics
+from ticket_viewer.names import NAME_COLUMNS
+from ticket_viewer.table import ACCOUNT_COLUMN, KNOWN_CATEGORIES, TicketPageBuffer
+
+MIN_TEXT_WIDTH = 10 # narrowest a text column is truncated to when the table is wider than the terminal
+NAME_WIDTH = 20 # characters reserved for user and organization names not known yet, given back first when the table is too wide
+
+def center(text, width):
+    """Pads text to width with the extra space on the right, the way tabulate centers cells"""
+    left = (width - len(text)) // 2
+    return ' ' * left + text + ' ' * (width - len(text) - left)
+
+def clip(text, width):
+    """Truncates text longer than width with a trailing '...'"""
+    return text if len(text) <= width else text[:max(width - 3, 0)] + '...'
+
+class TableLayout:
+    """Fixed column widths of the ticket table, computed once per dataset so every page has the same layout
+
+    Widths come from the whole table in a few vectorized passes (string lengths, category lengths, digit
+    counts of the largest ids) rather than from the rows on screen, so paging never shifts the columns.
+    When the table is wider than the terminal, text columns are truncated to fit. Rendering a page only
+    looks up pre-padded category cells and pads the other 25 values, no widths are measured per page.
+    With a NameDirectory, submitter, assignee and organization ids are shown as names, looked up per cell
+    (in the directory of the row's account for a merged table, see names.AccountNames).
+    A layout fitted to the first rows of a table still downloading is widened (see widened) when a later page
+    holds a longer id, the one case where the columns move.
+
+    Parameters
+    ----------
+    columns : list of str
+        Column headers, starting with the index name
+    widths : list of int
+        Width of each column's cells, excluding the one space of padding either side
+    names : NameDirectory, optional
+        Names shown instead of the ids of labeled columns
+    labeled : dict, optional
+        Position of each column shown by name -> its ticket table column, see NAME_COLUMNS
+    text_columns : list of int, optional
+        Positions of the columns truncated when the table is wider than the terminal
+    terminal_width : int, optional
+        Terminal width the layout is fitted to
+    """
+
+    def __init__(self, columns, widths, names=None, labeled=None, text_columns=(), terminal_width=None):
+        self.columns = columns
+        self.widths = widths
+        self.names = names
+        self.labeled = labeled or {}
+        self.text_columns = list(text_columns)
+        self.terminal_width = terminal_width
+        self.border = '+' + '+'.join('-' * (width + 2) for width in widths) + '+'
+        self.header = '| ' + ' | '.join(center(clip(column, width), width) for column, width in zip(columns, widths)) + ' |'
+        self.padded_none = [center('None', width) for width in widths]
+        self.padded_categories = {}
+
+    @classmethod
+    def fit(cls, tickets_df, terminal_width, complete=True, names=None):
+        """Computes the layout of a ticket table for a terminal width
+
+        Parameters
+        ----------
+        tickets_df : DataFrame
+            Ticket table, or a sample of it if complete = False
+        terminal_width : int
+            Terminal width in columns
+        complete : Bool, optional
+            False if tickets_df is only the first rows of a table still downloading, in which case room is
+            reserved for names of NAME_WIDTH characters and every known priority and status, ids are as wide
+            as the largest seen so far
+        names : NameDirectory, optional
+            Names shown instead of submitter, assignee and organization ids, with room for NAME_WIDTH characters
+            where an id has no known name yet, given back to the other text columns when the table is too wide
+
+        Returns
+        -------
+        TableLayout
+            Column widths of the table
+        """
+
+        columns = [tickets_df.index.name or ''] + list(tickets_df.columns)
+        series = [tickets_df.index.to_series()] + [tickets_df[column] for column in tickets_df.columns]
+        accounts = tickets_df[ACCOUNT_COLUMN] if ACCOUNT_COLUMN in tickets_df.columns else None
+        widths = []
+        text_columns = []
+        labeled = {}
+        reserved = {} # position: room kept for names not known yet, the first to go when the table is too wide
+        for position, (column, values) in enumerate(zip(columns, series)):
+            if names is not None and column in NAME_COLUMNS:
+                labeled[position] = column
+                columns[position] = NAME_COLUMNS[column][1]
+                # ids without a known name yet are requested when their page is shown, so room is kept for a name
+                kind = NAME_COLUMNS[column][0]
+                known = [names.account(subdomain).get(kind, value) for subdomain, value in account_values(values, accounts)]
+                width = max([len(columns[position]), len('None') if values.hasnans else 0] + [len(name) for name in known if name])
+                if not complete or None in known:
+                    reserved[position] = max(NAME_WIDTH - width, 0)
+                    width = max(width, NAME_WIDTH)
+                text_columns.append(position)
+                widths.append(width)
+                continue
+            width = max(len(column), column_width(values))
+            if not complete and column in KNOWN_CATEGORIES:
+                width = max([width] + [len(value) for value in KNOWN_CATEGORIES[column]])
+            if is_text(values):
+                text_columns.append(position)
+            widths.append(width)
+        fit_widths(widths, columns, text_columns, terminal_width, reserved)
+        return cls(columns, widths, names, labeled, text_columns, terminal_width)
+
+    def widened(self, paged_df):
+        """Returns the layout with its integer columns widened to the ids of a page, e.g. a later page of a
+        table still downloading, the text columns narrowed to keep it within the terminal
+
+        Parameters
+        ----------
+        paged_df : DataFrame
+            Rows of the ticket table
+
+        Returns
+        -------
+        TableLayout
+            This layout if every id of the page fits, else a wider copy
+        """
+
+        series = [paged_df.index.to_series()] + [paged_df[column] for column in paged_df.columns]
+        widths = list(self.widths)
+        for position, values in enumerate(series):
+            if position not in self.labeled and pd.api.types.is_integer_dtype(values.dtype):
+                widths[position] = max(widths[position], column_width(values))
+        if widths == self.widths:
+            return self
+        if self.terminal_width is not None:
+            fit_widths(widths, self.columns, self.text_columns, self.terminal_width)
+        return TableLayout(self.columns, widths, self.names, self.labeled, self.text_columns, self.terminal_width)
+
+    def _cells(self, position, values, accounts=None):
+        width = self.widths[position]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # a handful of categories: pad each once and index the padded cells by code, -1 (missing) hitting 'None'
+            key = (position, tuple(values.cat.categories))
+            padded = self.padded_categories.get(key)
+            if padded is None:
+                padded = self.padded_categories[key] = [center(clip(str(value), width), width) for value in values.cat.categories] + [self.padded_none[position]]
+            return [padded[code] for code in values.cat.codes.tolist()]
+        none = self.padded_none[position]
+        if position in self.labeled:
+            column = self.labeled[position]
+            subdomains = accounts.astype(object).tolist() if accounts is not None else [None] * len(values)
+            return [none if value is pd.NA or value is None else center(clip(self.names.account(subdomain).label(column, value), width), width)
+                    for value, subdomain in zip(values.astype(object).tolist(), subdomains)]
+        return [none if value is None or value is pd.NA or value != value else center(clip(str(value), width), width)
+                for value in values.astype(object).tolist()]
+
+    def render(self, paged_df):
+        """Renders rows of the ticket table with the layout's fixed widths
+
+        Parameters
+        ----------
+        paged_df : DataFrame
+            Rows of the ticket table
+
+        Returns
+        -------
+        str
+            Table text, one line per row plus borders and header
+        """
+
+        accounts = paged_df[ACCOUNT_COLUMN] if ACCOUNT_COLUMN in paged_df.columns else None
+        columns = [self._cells(0, paged_df.index.to_series())]
+        columns.extend(self._cells(position, paged_df[column], accounts) for position, column in enumerate(paged_df.columns, 1))
+        lines = [self.border, self.header, self.border]
+        lines.extend('| ' + ' | '.join(row) + ' |' for row in zip(*columns))
+        lines.append(self.border)
+        return '\n'.join(lines)
+
+def fit_widths(widths, columns, text_columns, terminal_width, reserved=None):
+    """Narrows text columns in place until a table of widths fits the terminal
+
+    Room reserved for values not seen yet is given up first, then the widest text columns are truncated,
+    none to less than MIN_TEXT_WIDTH or its header.
+
+    Parameters
+    ----------
+    widths : list of int
+        Width of each column's cells
+    columns : list of str
+        Column headers
+    text_columns : list of int
+        Positions of the columns that may be narrowed
+    terminal_width : int
+        Terminal width in columns
+    reserved : dict, optional
+        Position -> characters of its width kept for values not seen yet
+    """
+
+    excess = sum(width + 3 for width in widths) + 1 - terminal_width
+    for position, room in (reserved or {}).items():
+        if excess <= 0:
+            return
+        shrink = min(excess, room)
+        widths[position] -= shrink
+        excess -= shrink
+    for position in sorted(text_columns, key=lambda position: -widths[position]):
+        if excess <= 0:
+            return
+        shrink = min(excess, widths[position] - max(MIN_TEXT_WIDTH, len(columns[position])))
+        if shrink > 0:
+            widths[position] -= shrink
+            excess -= shrink
+
+def account_values(values, accounts=None):
+    """Distinct (subdomain, value) pairs of the present values of a column, subdomain None for a table of one account"""
+    if accounts is None:
+        return [(None, value) for value in values.dropna().unique().tolist()]
+    pairs = pd.DataFrame({'subdomain': accounts.astype(object), 'value': values}).dropna().drop_duplicates()
+    return list(zip(pairs['subdomain'].tolist(), pairs['value'].tolist()))
+
+def is_text(values):
+    return not isinstance(values.dtype, pd.CategoricalDtype) and not pd.api.types.is_numeric_dtype(values.dtype)
+
+def column_width(values):
+    """Widest formatted value of a column, 'None' included when values are missing
+
+    Parameters
+    ----------
+    values : Series
+        Column of the ticket table
+
+    Returns
+    -------
+    int
+        Width in characters
+    """
+
+    if not len(values):
+        return 0
+    width = len('None') if values.hasnans else 0
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return max([width] + [len(str(value)) for value in values.cat.categories])
+    if pd.api.types.is_integer_dtype(values.dtype) and values.notna().any():
+        return max(width, len(str(values.max())), len(str(values.min())))
+    lengths = values.astype('string').str.len()
+    return max(width, int(lengths.max())) if lengths.notna().any() else width
+
+def slice_page(tickets_df, page_num, page_size):
+    """Returns the rows of page page_num of a ticket table or TicketPageBuffer"""
+    start = page_num * page_size
+    if isinstance(tickets_df, TicketPageBuffer):
+        return tickets_df.rows(start, start + page_size)
+    return tickets_df.iloc[start:start + page_size]
+
+class PageRenderCache:
+    """LRU cache of rendered ticket table pages, keyed by page number and terminal width
+
+    Pages are rendered with one TableLayout per terminal width, so every page lines up the same way. Pages next to the one on screen are rendered ahead on a background thread, so '<' and '>' usually only
+    print a cached string. A page of a TicketPageBuffer is only pre-rendered once its rows have downloaded,
+    the page on screen never waits behind a background render.
+
+    Parameters
+    ----------
+    tickets_df : DataFrame or TicketPageBuffer
+        Normalized ticket data, or the table being built in the background
+    load_rows : function, optional
+        Called with (tickets_df, page_num, page_size) to get the rows of a page, defaults to slice_page
+    page_size : int, optional
+        Rows per page
+    maxsize : int, optional
+        Number of rendered pages kept
+    names : NameDirectory, optional
+        Names shown instead of submitter, assignee and organization ids; ids of a page with no name known yet
+        are requested in bulk before the page is rendered
+    """
+
+    def __init__(self, tickets_df, load_rows=None, page_size=25, maxsize=32, names=None):
+        self.tickets_df = tickets_df
+        self.names = names
+        self.load_rows = load_rows or slice_page
+        self.page_size = page_size
+        self.maxsize = maxsize
+        self.pages = OrderedDict()
+        self.pending = {}
+        self.layouts = {}
+        self.generation = 0 # bumped whenever a widened layout drops the pages rendered so far
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def page_count(self):
+        """Counts the pages of the table
+
+        Returns
+        -------
+        int or None
+            Number of pages (at least 1); None while a TicketPageBuffer is still downloading
+        """
+
+        if isinstance(self.tickets_df, TicketPageBuffer) and not self.tickets_df.finished:
+            return None
+        return max(1, math.ceil(len(self.tickets_df) / self.page_size))
+
+    def is_ready(self, page_num):
+        """Checks without blocking if the rows of page page_num are available"""
+        if isinstance(self.tickets_df, TicketPageBuffer):
+            return self.tickets_df.is_available((page_num + 1) * self.page_size)
+        return True
+
+    def layout(self, width):
+        """Returns the TableLayout of the table for a terminal width, fitting it on first use
+
+        A TicketPageBuffer still downloading is fitted to its first page with room reserved for longer names
+        and every priority and status, and keeps that layout once the download finishes. Its id columns are
+        widened when a later page holds a longer id, see TableLayout.widened.
+
+        Parameters
+        ----------
+        width : int
+            Terminal width in columns
+
+        Returns
+        -------
+        TableLayout
+            Column widths of the table
+        """
+
+        layout = self.layouts.get(width)
+        if layout is None:
+            tickets_df = self.tickets_df
+            if not isinstance(tickets_df, TicketPageBuffer):
+                layout = TableLayout.fit(tickets_df, width, names=self.names)
+            elif tickets_df.finished and not tickets_df.failed:
+                layout = TableLayout.fit(tickets_df.frame(), width, names=self.names)
+            else:
+                layout = TableLayout.fit(tickets_df.rows(0, self.page_size), width, complete=False, names=self.names)
+            layout = self.layouts.setdefault(width, layout)
+        return layout
+
+    @metrics.timed('render.page')
+    def _render(self, page_num, width):
+        paged_df = self.load_rows(self.tickets_df, page_num, self.page_size)
+        if self.names is not None:
+            self.names.ensure_rows(paged_df)
+        with self.lock:
+            generation = self.generation
+        layout = self.layout(width)
+        wider = layout.widened(paged_df)
+        if wider is not layout:
+            # a later page of a table still downloading holds a longer id: every page of this width is rendered again
+            with self.lock:
+                if self.layouts.get(width) is layout:
+                    self.layouts[width] = wider
+                    self.generation += 1
+                    for key in [key for key in self.pages if key[1] == width]:
+                        del self.pages[key]
+            return self._render(page_num, width)
+        return (layout.render(paged_df), len(paged_df)), generation
+
+    def _store(self, key, page, generation):
+        with self.lock:
+            self.pending.pop(key, None)
+            if generation != self.generation:
+                # rendered with a layout widened since, e.g. by a prefetch that was running during the widen
+                return False
+            self.pages[key] = page
+            self.pages.move_to_end(key)
+            while len(self.pages) > self.maxsize:
+                self.pages.popitem(last=False)
+        return True
+
+    def get(self, page_num, width):
+        """Returns page page_num rendered for a terminal width, rendering it now if it is not cached
+
+        Parameters
+        ----------
+        page_num : int
+            Page number, starting from 0
+        width : int
+            Terminal width in columns
+
+        Returns
+        -------
+        tuple of (str, int)
+            Rendered page and its number of rows, 0 rows past the last page
+        """
+
+        key = (page_num, width)
+        with self.lock:
+            page = self.pages.get(key)
+            if page is not None:
+                self.pages.move_to_end(key)
+                metrics.count('render.cache_hit')
+                return page
+            future = self.pending.get(key)
+        metrics.count('render.prefetch_wait' if future is not None else 'render.cache_miss')
+        page, generation = future.result() if future is not None else self._render(page_num, width)
+        if not self._store(key, page, generation) and future is not None:
+            page, generation = self._render(page_num, width)
+            self._store(key, page, generation)
+        return page
+
+    def prefetch(self, page_num, width):
+        """Renders the pages either side of page_num in the background
+
+        Parameters
+        ----------
+        page_num : int
+            Page number on screen
+        width : int
+            Terminal width in columns
+        """
+
+        for neighbour in (page_num + 1, page_num - 1):
+            key = (neighbour, width)
+            if neighbour < 0 or not self.is_ready(neighbour):
+                continue
+            with self.lock:
+                if key in self.pages or key in self.pending:
+                    continue
+                self.pending[key] = self.executor.submit(self._prefetch, key)
+
+    def _prefetch(self, key):
+        page, generation = self._render(*key)
+        self._store(key, page, generation)
+        return page, generation
+
+    def close(self):
+        """Stops the background renderer without waiting for pending pages
+        """
+
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,205 @@
+from array import array
+from collections import Counter
+import math
+import os
+import pickle
+import re
+import threading
+
+SEARCH_FIELDS = ('id', 'subject', 'description', 'status') # fields the search index reads from each ticket
+INDEX_FORMAT = 1 # bumped when the on-disk layout changes, older files are rebuilt
+K1 = 1.2 # BM25 term frequency saturation
+B = 0.75 # BM25 document length normalisation
+TOKEN_PATTERN = re.compile(r'\w+')
+
+def tokenize(text):
+    """Splits text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+class SearchIndex:
+    """Inverted index of ticket subjects and descriptions, ranked with BM25
+
+    Each term maps to two compact arrays, the document numbers it appears in and how often, appended to as
+    tickets are added so the index grows page by page while tickets download. An updated ticket gets a new
+    document number and its old postings are skipped at query time until stale postings outnumber live
+    ones, when the index is compacted. Queries score the postings of each term in one vectorized pass.
+
+    Parameters
+    ----------
+    version : int, optional
+        Version of the ticket data the index reflects, see TicketCache.search_index
+    """
+
+    def __init__(self, version=0):
+        self.version = version
+        self.postings = {}
+        self.doc_tickets = array('q') # document number -> ticket id
+        self.doc_lengths = array('I') # document number -> number of tokens
+        self.docs = {} # ticket id -> live document number
+        self.subjects = {}
+        self.total_length = 0
+        self.dirty = False
+        self.live = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _remove(self, ticket_id):
+        doc = self.docs.pop(ticket_id, None)
+        if doc is not None:
+            self.total_length -= self.doc_lengths[doc]
+            self.subjects.pop(ticket_id, None)
+
+    def add_tickets(self, tickets, version=None):
+        """Indexes tickets, replacing earlier versions of the same tickets and removing deleted ones
+
+        Parameters
+        ----------
+        tickets : list of dicts
+            Ticket data with at least SEARCH_FIELDS
+        version : int, optional
+            Version of the ticket data after these tickets
+        """
+
+        with self.lock:
+            for ticket in tickets:
+                self._remove(ticket['id'])
+                if ticket.get('status') == 'deleted':
+                    continue
+                tokens = tokenize(ticket.get('subject')) + tokenize(ticket.get('description'))
+                doc = len(self.doc_tickets)
+                self.doc_tickets.append(ticket['id'])
+                self.doc_lengths.append(len(tokens))
+                self.docs[ticket['id']] = doc
+                self.subjects[ticket['id']] = ticket.get('subject')
+                self.total_length += len(tokens)
+                for term, count in Counter(tokens).items():
+                    entry = self.postings.get(term)
+                    if entry is None:
+                        entry = self.postings[term] = (array('I'), array('H'))
+                    entry[0].append(doc)
+                    entry[1].append(count if count < 65536 else 65535)
+            if version is not None:
+                self.version = version
+            self.live = None
+            self.dirty = True
+            if len(self.doc_tickets) > 2 * len(self.docs) + 1000:
+                self._compact()
+
+    def _compact(self):
+        # renumber the live documents in order and drop the postings of replaced or deleted tickets
+        renumber = {doc: new_doc for new_doc, doc in enumerate(sorted(self.docs.values()))}
+        postings = {}
+        for term, (docs, counts) in self.postings.items():
+            kept = [(renumber[doc], count) for doc, count in zip(docs, counts) if doc in renumber]
+            if kept:
+                postings[term] = (array('I', [doc for doc, _ in kept]), array('H', [count for _, count in kept]))
+        old_docs = sorted(self.docs.values())
+        self.doc_tickets = array('q', [self.doc_tickets[doc] for doc in old_docs])
+        self.doc_lengths = array('I', [self.doc_lengths[doc] for doc in old_docs])
+        self.docs = {ticket_id: new_doc for new_doc, ticket_id in enumerate(self.doc_tickets)}
+        self.postings = postings
+
+    def search(self, query, limit=25):
+        """Finds the tickets containing any of the query terms, best BM25 score first
+
+        Parameters
+        ----------
+        query : str
+            Search terms
+        limit : int, optional
+            Maximum number of results returned
+
+        Returns
+        -------
+        tuple of (list, int)
+            (ticket id, subject, score) of the best matches, ties in id order, and the total number of matches
+        """
+
+        import numpy as np
+
+        with self.lock:
+            if not self.docs:
+                return [], 0
+            if self.live is None:
+                self.live = np.zeros(len(self.doc_tickets), dtype=bool)
+                self.live[list(self.docs.values())] = True
+            lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32)
+            average_length = self.total_length / len(self.docs) or 1
+            scores = np.zeros(len(self.doc_tickets))
+            for term in set(tokenize(query)):
+                entry = self.postings.get(term)
+                if entry is None:
+                    continue
+                docs = np.frombuffer(entry[0], dtype=np.uint32)
+                counts = np.frombuffer(entry[1], dtype=np.uint16)
+                live = self.live[docs]
+                docs, counts = docs[live], counts[live].astype(float)
+                if not len(docs):
+                    continue
+                idf = math.log(1 + (len(self.docs) - len(docs) + 0.5) / (len(docs) + 0.5))
+                scores[docs] += idf * counts * (K1 + 1) / (counts + K1 * (1 - B + B * lengths[docs] / average_length))
+            matches = np.flatnonzero(scores)
+            ticket_ids = np.frombuffer(self.doc_tickets, dtype=np.int64)[matches]
+            best = np.lexsort((ticket_ids, -scores[matches]))[:limit]
+            results = [(int(ticket_ids[i]), self.subjects[int(ticket_ids[i])], float(scores[matches[i]])) for i in best]
+            return results, len(matches)
+
+    def save(self, path):
+        """Writes the index to path, replacing the previous file only once the new one is complete
+
+        Parameters
+        ----------
+        path : str
+            Index file path
+        """
+
+        with self.lock:
+            # postings are written as one flat array per field plus each term's posting count, which unpickles
+            # several times faster than an array pair per term
+            terms = list(self.postings)
+            posting_counts = array('I', [len(self.postings[term][0]) for term in terms])
+            docs, counts = array('I'), array('H')
+            for term in terms:
+                docs.extend(self.postings[term][0])
+                counts.extend(self.postings[term][1])
+            state = {'format': INDEX_FORMAT, 'version': self.version, 'terms': terms, 'posting_counts': posting_counts,
+                     'posting_docs': docs, 'posting_term_counts': counts, 'doc_tickets': self.doc_tickets,
+                     'doc_lengths': self.doc_lengths, 'docs': self.docs, 'subjects': self.subjects, 'total_length': self.total_length}
+            with open(path + '.tmp', 'wb') as index_file:
+                pickle.dump(state, index_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.tmp', path)
+            self.dirty = False
+
+    @classmethod
+    def load(cls, path):
+        """Reads an index written by save
+
+        Parameters
+        ----------
+        path : str
+            Index file path
+
+        Returns
+        -------
+        SearchIndex or None
+            Loaded index; None if the file is missing, unreadable or from another INDEX_FORMAT
+        """
+
+        try:
+            with open(path, 'rb') as index_file:
+                state = pickle.load(index_file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return None
+        if not isinstance(state, dict) or state.get('format') != INDEX_FORMAT:
+            return None
+        index = cls(state['version'])
+        for key in ('doc_tickets', 'doc_lengths', 'docs', 'subjects', 'total_length'):
+            setattr(index, key, state[key])
+        docs, counts = state['posting_docs'], state['posting_term_counts']
+        start = 0
+        for term, posting_count in zip(state['terms'], state['posting_counts']):
+            index.postings[term] = (docs[start:start + posting_count], counts[start:start + posting_count])
+            start += posting_count
+        return index
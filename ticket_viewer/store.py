@@ -0,0 +1,175 @@
+from importlib.util import find_spec
+import json
+import os
+import numpy as np
+import pandas as pd
+from ticket_viewer.table import TIME_DTYPE
+
+STORE_FORMAT = 1 # bumped whenever the file layout changes, older files are then rebuilt
+MAGIC = b'ZCCTABLE'
+ALIGNMENT = 64 # byte alignment of every column buffer, so each can be viewed in place as its dtype
+ARROW_AVAILABLE = find_spec('pyarrow') is not None # text columns are mapped without decoding through pyarrow, which is optional
+
+def aligned(offset):
+    """Rounds offset up to the next multiple of ALIGNMENT"""
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def encode_column(values):
+    """Splits a ticket table column into the flat buffers it is stored as
+
+    * categorical (priority, status, subdomain): pandas' own int8 or int16 codes, the categories go in the header
+    * nullable Int64 (user/organization ids): int64 values and a bool missing mask
+    * UTC datetimes: int64 nanoseconds since the epoch, missing values as NaT
+    * strings (subject): UTF-8 bytes of every value back to back, int64 offsets of each value into them and an
+      Arrow-style validity bitmap, one bit per row
+
+    Parameters
+    ----------
+    values : Series
+        Column of a table built by TicketFrameBuilder
+
+    Returns
+    -------
+    kind : str
+        'category', 'int', 'datetime' or 'string'
+    buffers : dict
+        Buffer name to ndarray
+    extra : dict
+        Header fields of the column
+    """
+
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'category', {'codes': values.cat.codes.to_numpy()}, {'categories': list(dtype.categories)}
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return 'datetime', {'values': values.astype(TIME_DTYPE).to_numpy(dtype='datetime64[ns]').view('int64')}, {}
+    mask = values.isna().to_numpy()
+    if isinstance(dtype, pd.StringDtype):
+        encoded = [b'' if missing else value.encode('utf-8') for value, missing in zip(values.to_numpy(dtype=object), mask)]
+        offsets = np.zeros(len(encoded) + 1, dtype='int64')
+        np.cumsum(np.fromiter(map(len, encoded), dtype='int64', count=len(encoded)), out=offsets[1:])
+        return 'string', {'offsets': offsets, 'data': np.frombuffer(b''.join(encoded), dtype='uint8'),
+                          'validity': np.packbits(~mask, bitorder='little')}, {'null_count': int(mask.sum())}
+    return 'int', {'values': values.to_numpy(dtype='int64', na_value=0), 'mask': mask}, {}
+
+def write_table(path, tickets_df, version=0):
+    """Writes a ticket table as one columnar file, replacing the previous file only once the new one is complete
+
+    The file is a JSON header (column kinds, categories, buffer dtypes and positions) followed by every column's
+    flat buffers, each aligned so open_table can map them straight into memory.
+
+    Parameters
+    ----------
+    path : str
+        Table file path
+    tickets_df : DataFrame
+        Ticket table as built by TicketFrameBuilder, indexed by 'id', optionally merged (see merge_account_frames)
+    version : int, optional
+        Version of the data the table was built from, e.g. TicketCache.version
+    """
+
+    index = np.ascontiguousarray(tickets_df.index.to_numpy(dtype='int64'))
+    buffers = [(0, index)]
+    columns = []
+    offset = aligned(index.nbytes)
+    for column in tickets_df.columns:
+        kind, column_buffers, extra = encode_column(tickets_df[column])
+        layout = {}
+        for name, buffer in column_buffers.items():
+            buffer = np.ascontiguousarray(buffer)
+            layout[name] = [buffer.dtype.str, offset, len(buffer)]
+            buffers.append((offset, buffer))
+            offset = aligned(offset + buffer.nbytes)
+        columns.append(dict(extra, name=column, kind=kind, buffers=layout))
+    header = json.dumps({'format': STORE_FORMAT, 'version': version, 'rows': len(tickets_df), 'index': tickets_df.index.name,
+                         'columns': columns}).encode('utf-8')
+    start = aligned(len(MAGIC) + 8 + len(header))
+    with open(path + '.tmp', 'wb') as table_file:
+        table_file.write(MAGIC + len(header).to_bytes(8, 'little') + header)
+        for buffer_offset, buffer in buffers:
+            table_file.seek(start + buffer_offset)
+            table_file.write(buffer.data)
+        table_file.truncate(start + offset)
+    os.replace(path + '.tmp', path)
+
+def decode_strings(offsets, data, validity, rows, null_count):
+    """Builds a string column from its stored buffers, mapped in place through pyarrow when it is installed"""
+    if ARROW_AVAILABLE:
+        import pyarrow as pa
+        array = pa.LargeStringArray.from_buffers(rows, pa.py_buffer(offsets), pa.py_buffer(data),
+                                                 pa.py_buffer(validity) if null_count else None, null_count)
+        try:
+            return pd.arrays.ArrowStringArray(pa.chunked_array([array], type=pa.large_string()))
+        except (TypeError, ValueError): # older pandas only takes 32-bit offset strings
+            return pd.arrays.ArrowStringArray(pa.chunked_array([array.cast(pa.string())]))
+    valid = np.unpackbits(validity, count=rows, bitorder='little').astype(bool)
+    raw = data.tobytes()
+    values = np.array([raw[start:stop].decode('utf-8') if present else None
+                       for start, stop, present in zip(offsets[:-1].tolist(), offsets[1:].tolist(), valid)], dtype=object)
+    return pd.array(values, dtype='string')
+
+def read_header(path):
+    """Reads the JSON header of a table file, None if the file is missing or not a table"""
+    try:
+        with open(path, 'rb') as table_file:
+            if table_file.read(len(MAGIC)) != MAGIC:
+                return None
+            header_size = int.from_bytes(table_file.read(8), 'little')
+            header = json.loads(table_file.read(header_size))
+    except (OSError, ValueError):
+        return None
+    return dict(header, header_size=header_size)
+
+def table_version(path):
+    """Returns the version a table file was written at, None if it is missing, unreadable or from another STORE_FORMAT"""
+    header = read_header(path)
+    if header is None or header.get('format') != STORE_FORMAT:
+        return None
+    return header['version']
+
+def open_table(path, version=None):
+    """Opens a ticket table written by write_table, mapping its buffers into memory instead of reading them
+
+    Ids, category codes and user/organization ids are used in place, so opening takes milliseconds whatever the
+    table size and only the pages of the file a command actually reads are loaded. The table is read-only.
+
+    Parameters
+    ----------
+    path : str
+        Table file path
+    version : int, optional
+        Version the table must have been written at, e.g. the current TicketCache.version
+
+    Returns
+    -------
+    DataFrame or None
+        Ticket table; None if the file is missing, unreadable, from another STORE_FORMAT or another version
+    """
+
+    header = read_header(path)
+    if header is None or header.get('format') != STORE_FORMAT or (version is not None and header['version'] != version):
+        return None
+    try:
+        raw = np.memmap(path, dtype='uint8', mode='r')
+    except (OSError, ValueError):
+        return None
+    start = aligned(len(MAGIC) + 8 + header['header_size'])
+    rows = header['rows']
+
+    def buffer(spec):
+        dtype, offset, count = np.dtype(spec[0]), spec[1], spec[2]
+        return raw[start + offset:start + offset + count * dtype.itemsize].view(dtype)
+
+    columns = {}
+    index = pd.Index(buffer([np.dtype('int64').str, 0, rows]), name=header['index'], copy=False)
+    for column in header['columns']:
+        buffers = {name: buffer(spec) for name, spec in column['buffers'].items()}
+        if column['kind'] == 'category':
+            columns[column['name']] = pd.Categorical.from_codes(buffers['codes'], categories=pd.Index(column['categories'], dtype=object))
+        elif column['kind'] == 'int':
+            columns[column['name']] = pd.arrays.IntegerArray(buffers['values'], buffers['mask'])
+        elif column['kind'] == 'datetime':
+            columns[column['name']] = pd.DatetimeIndex(buffers['values'].view('datetime64[ns]')).tz_localize('UTC').array
+        else:
+            columns[column['name']] = decode_strings(buffers['offsets'], buffers['data'], buffers['validity'], rows, column['null_count'])
+    return pd.DataFrame(columns, index=index, copy=False)
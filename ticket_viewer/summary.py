@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from ticket_viewer.index import MISSING_ID
+from ticket_viewer.table import KNOWN_CATEGORIES, TIME_COLUMNS
+
+SUMMARY_FIELDS = ('id', 'priority', 'status', 'assignee_id', 'organization_id') + TIME_COLUMNS # columns of the table summarize reads
+OPEN_STATUSES = ('new', 'open', 'pending', 'hold') # statuses counted as backlog
+SOLVED_STATUSES = ('solved', 'closed')
+AGE_PERCENTILES = (50, 90, 99)
+TREND_WEEKS = 8 # weeks of created/solved counts shown by summary
+TOP_GROUPS = 10 # assignees and organizations listed by summary
+DAY = 86400
+EPOCH = pd.Timestamp(0, tz='UTC')
+
+def epoch_seconds(values):
+    """Converts a datetime column to float unix epoch seconds, NaN where missing"""
+    return ((values - EPOCH) / pd.Timedelta(seconds=1)).to_numpy(dtype='float64', na_value=np.nan)
+
+def group_counts(keys, is_open, order=None, top=None):
+    """Counts the tickets and open tickets of every value of keys, with one bincount over integer group codes
+
+    Parameters
+    ----------
+    keys : Series
+        Categorical or nullable integer grouping column, missing values form a group of their own
+    is_open : ndarray of bool
+        Open (backlog) tickets
+    order : tuple, optional
+        Values listed first, in this order; the other values follow by ticket count, missing values last
+    top : int, optional
+        Keep only the top groups by open tickets, then by tickets, instead of ordering by value
+
+    Returns
+    -------
+    list of tuples of (value, int, int)
+        Value (None if missing), ticket count and open ticket count of each group
+    """
+
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        values = list(keys.cat.categories) + [None]
+        codes = keys.cat.codes.to_numpy().astype('int64')
+        codes[codes < 0] = len(values) - 1
+    else:
+        uniques, codes = np.unique(keys.to_numpy(dtype='int64', na_value=MISSING_ID), return_inverse=True)
+        values = [None if value == MISSING_ID else int(value) for value in uniques]
+    tickets = np.bincount(codes, minlength=len(values))
+    opened = np.bincount(codes, weights=is_open, minlength=len(values)).astype('int64')
+    groups = np.flatnonzero(tickets)
+    if top is not None:
+        groups = groups[np.lexsort((-tickets[groups], -opened[groups]))][:top]
+    else:
+        rank = {value: position for position, value in enumerate(order or ())}
+        groups = sorted(groups, key=lambda group: (rank.get(values[group], len(rank) + (values[group] is None)), -tickets[group]))
+    return [(values[group], int(tickets[group]), int(opened[group])) for group in groups]
+
+def day_percentiles(days):
+    """Summarizes ages in days as AGE_PERCENTILES and maximum, None if there are none"""
+    days = days[~np.isnan(days)]
+    if not len(days):
+        return None
+    summary = {f'p{percent}': value for percent, value in zip(AGE_PERCENTILES, np.percentile(days, AGE_PERCENTILES))}
+    summary['max'] = days.max()
+    return summary
+
+def summarize(tickets_df, now=None, weeks=TREND_WEEKS, top=TOP_GROUPS):
+    """Computes ticket counts, backlog age and weekly trends of a ticket table, in vectorized passes over its columns
+
+    Tickets with an OPEN_STATUSES status are the backlog. Their age is measured from created_at and their idle
+    time from updated_at. Weekly trends count the tickets created and solved in each of the last weeks weeks,
+    taking the updated_at of solved and closed tickets as their solve time, and the backlog left at the end of
+    each week as every ticket created by then less every ticket solved by then.
+
+    Parameters
+    ----------
+    tickets_df : DataFrame
+        Ticket table with at least SUMMARY_FIELDS, see TicketFrameBuilder
+    now : float, optional
+        Unix epoch time the ages are measured at, defaults to the current time
+    weeks : int, optional
+        Number of weeks of trends
+    top : int, optional
+        Number of assignees and organizations listed
+
+    Returns
+    -------
+    dict
+        'tickets' and 'open' counts; 'status', 'priority', 'assignee_id' and 'organization_id' lists of
+        (value, tickets, open); 'age_days' and 'idle_days' percentiles of the backlog (None if empty);
+        'trend' list of weekly dicts with 'week_start' (unix epoch time), 'created', 'solved' and 'open'
+    """
+
+    now = pd.Timestamp.now(tz='UTC').timestamp() if now is None else now
+    status = tickets_df['status']
+    is_open = status.isin(OPEN_STATUSES).to_numpy(dtype=bool)
+    is_solved = status.isin(SOLVED_STATUSES).to_numpy(dtype=bool)
+    created = epoch_seconds(tickets_df['created_at'])
+    updated = epoch_seconds(tickets_df['updated_at'])
+
+    edges = now - np.arange(weeks, -1, -1) * 7 * DAY
+    created_times = np.sort(created[~np.isnan(created)])
+    solved_times = np.sort(updated[is_solved & ~np.isnan(updated)])
+    created_by = np.searchsorted(created_times, edges, side='right')
+    solved_by = np.searchsorted(solved_times, edges, side='right')
+    trend = [{'week_start': float(start), 'created': int(created_count), 'solved': int(solved_count), 'open': int(backlog)}
+             for start, created_count, solved_count, backlog in zip(edges[:-1], np.diff(created_by), np.diff(solved_by), (created_by - solved_by)[1:])]
+
+    return {'tickets': len(tickets_df), 'open': int(is_open.sum()),
+            'status': group_counts(status, is_open, order=KNOWN_CATEGORIES['status']),
+            'priority': group_counts(tickets_df['priority'], is_open, order=KNOWN_CATEGORIES['priority']),
+            'assignee_id': group_counts(tickets_df['assignee_id'], is_open, top=top),
+            'organization_id': group_counts(tickets_df['organization_id'], is_open, top=top),
+            'age_days': day_percentiles((now - created[is_open]) / DAY),
+            'idle_days': day_percentiles((now - updated[is_open]) / DAY),
+            'trend': trend}
@@ -0,0 +1,310 @@
+import bisect
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+import threading
+import time
+from ticket_viewer.metrics import metrics
+from ticket_viewer.pipeline import TICKET_FIELDS
+
+ID_COLUMNS = ('submitter_id', 'assignee_id', 'organization_id')
+CATEGORY_COLUMNS = ('priority', 'status')
+TEXT_COLUMNS = ('subject',)
+ACCOUNT_COLUMN = 'subdomain' # categorical column of the account of each ticket in a merged table, see merge_account_frames
+TIME_COLUMNS = ('created_at', 'updated_at') # ISO 8601 timestamps, only built into tables that ask for them (see summary.SUMMARY_FIELDS)
+TIME_DTYPE = 'datetime64[ns, UTC]' # one resolution whatever pandas infers from the strings
+KNOWN_CATEGORIES = {'priority': ('low', 'normal', 'high', 'urgent'),
+                    'status': ('new', 'open', 'pending', 'hold', 'solved', 'closed')} # Zendesk values, in workflow order
+
+class TicketFrameBuilder:
+    """Builds the ticket table column by column from streamed pages
+
+    Each page is converted straight into typed column chunks and the page's records are dropped, so only the
+    compact columns are held while the download is running, never the raw JSON of every ticket. Columns keep
+    their natural types: int64 ticket ids, nullable Int64 user/organization ids, categorical priority and status,
+    a string subject and UTC datetimes for TIME_COLUMNS. Missing values stay missing until a page is rendered
+    for display (see render.TableLayout).
+
+    Parameters
+    ----------
+    fields : tuple of str, optional
+        Fields built into the table, 'id' first; any of TICKET_FIELDS and TIME_COLUMNS
+    """
+
+    def __init__(self, fields=TICKET_FIELDS):
+        self.fields = fields
+        self.chunks = {column: [] for column in fields}
+        self.categories = {column: {} for column in CATEGORY_COLUMNS if column in fields}
+
+    @metrics.timed('table.add_page')
+    def add_page(self, tickets):
+        """Appends one page of tickets as typed column chunks
+
+        Parameters
+        ----------
+        tickets : list of TicketRecords or dicts
+            Ticket data, each record or dict containing at least the fields of 1 ticket
+        """
+
+        if not tickets:
+            return
+        if isinstance(tickets[0], tuple):
+            columns = dict(zip(TICKET_FIELDS, zip(*tickets)))
+        else:
+            columns = {column: [ticket.get(column) for ticket in tickets] for column in self.fields}
+        self.chunks['id'].append(np.array(columns['id'], dtype='int64'))
+        for column in self._columns(ID_COLUMNS):
+            # nullable ids are kept as (values, mask) numpy pairs, the cheapest way to build an IntegerArray
+            values = np.array(columns[column], dtype=object)
+            mask = values == None # noqa: E711, elementwise comparison
+            values[mask] = 0
+            self.chunks[column].append((values.astype('int64'), mask))
+        for column in self._columns(CATEGORY_COLUMNS):
+            # priority and status have a handful of values, stored as int16 codes into a category list shared by every page
+            categories = self.categories[column]
+            codes = [-1 if value is None else categories.setdefault(value, len(categories)) for value in columns[column]]
+            self.chunks[column].append(np.array(codes, dtype='int16'))
+        for column in self._columns(TEXT_COLUMNS + TIME_COLUMNS):
+            # timestamps stay strings until build, which parses every page in one vectorized pass
+            self.chunks[column].append(np.array(columns[column], dtype=object))
+
+    def _columns(self, group):
+        return [column for column in group if column in self.chunks]
+
+    @metrics.timed('table.build')
+    def build(self):
+        """Concatenates the column chunks into the ticket table
+
+        Returns
+        -------
+        DataFrame
+            Ticket data indexed by 'id', by default with ('subject', 'priority', 'status', 'submitter_id', 'assignee_id', 'organization_id') columns
+        """
+
+        chunks, self.chunks = self.chunks, {column: [] for column in self.fields}
+        categories, self.categories = self.categories, {column: {} for column in self.categories}
+        if not chunks['id']:
+            return empty_ticket_frame(self.fields)
+        columns = {}
+        for column in self.fields[1:]:
+            if column in TEXT_COLUMNS:
+                columns[column] = pd.array(np.concatenate(chunks[column]), dtype='string')
+            elif column in CATEGORY_COLUMNS:
+                columns[column] = pd.Categorical.from_codes(np.concatenate(chunks[column]), categories=pd.Index(list(categories[column]), dtype=object))
+            elif column in ID_COLUMNS:
+                values, masks = zip(*chunks[column])
+                columns[column] = pd.arrays.IntegerArray(np.concatenate(values), np.concatenate(masks))
+            else:
+                columns[column] = pd.to_datetime(np.concatenate(chunks[column]), utc=True).astype(TIME_DTYPE)
+        index = pd.Index(np.concatenate(chunks['id']), name='id')
+        return pd.DataFrame(columns, index=index)
+
+def empty_ticket_frame(fields=TICKET_FIELDS):
+    """Builds a ticket table with no rows but the same columns and dtypes as TicketFrameBuilder.build
+
+    Parameters
+    ----------
+    fields : tuple of str, optional
+        Fields of the table, 'id' first
+
+    Returns
+    -------
+    DataFrame
+        Empty ticket data
+    """
+
+    columns = {}
+    for column in fields[1:]:
+        if column in TEXT_COLUMNS:
+            columns[column] = pd.array([], dtype='string')
+        elif column in CATEGORY_COLUMNS:
+            columns[column] = pd.Categorical([], categories=pd.Index([], dtype=object))
+        elif column in ID_COLUMNS:
+            columns[column] = pd.array([], dtype='Int64')
+        else:
+            columns[column] = pd.array([], dtype=TIME_DTYPE)
+    return pd.DataFrame(columns, index=pd.Index(np.array([], dtype='int64'), name='id'))
+
+def concat_ticket_frames(frames):
+    """Concatenates ticket tables, keeping priority and status categorical across differing categories
+
+    Parameters
+    ----------
+    frames : list of DataFrames
+        Ticket tables as built by TicketFrameBuilder
+
+    Returns
+    -------
+    DataFrame
+        Ticket data of every frame in order
+    """
+
+    if not frames:
+        return empty_ticket_frame()
+    tickets_df = pd.concat(frames)
+    for column in CATEGORY_COLUMNS:
+        # pages built separately have their own categories, which pd.concat would fall back to object dtype for
+        tickets_df[column] = union_categoricals([frame[column].array for frame in frames])
+    return tickets_df
+
+def patch_ticket_frame(tickets_df, ticket_ids, tickets, fields=TICKET_FIELDS):
+    """Replaces the rows of changed tickets in a ticket table, without rebuilding the rows that did not change
+
+    Rows of every id in ticket_ids are dropped and the latest state of those still present is appended, keeping
+    the table in id order. The result is a new table, tickets_df (e.g. a read-only mapped table) is left as it was.
+
+    Parameters
+    ----------
+    tickets_df : DataFrame
+        Ticket table as built by TicketFrameBuilder, indexed by unique ids in ascending order
+    ticket_ids : list of ints
+        Ids of the changed tickets, deleted ones included
+    tickets : list of dicts
+        Latest fields of the changed tickets that were not deleted
+    fields : tuple of str, optional
+        Fields of the table, 'id' first
+
+    Returns
+    -------
+    DataFrame
+        Ticket data indexed by 'id', with the changes applied
+    """
+
+    builder = TicketFrameBuilder(fields)
+    builder.add_page(tickets)
+    kept = tickets_df[~tickets_df.index.isin(ticket_ids)]
+    patched_df = concat_ticket_frames([kept, builder.build()])
+    if not patched_df.index.is_monotonic_increasing:
+        patched_df = patched_df.sort_index()
+    return patched_df
+
+def merge_account_frames(subdomains, frames):
+    """Concatenates the ticket tables of several Zendesk accounts, with a categorical 'subdomain' column first
+
+    Ticket ids are only unique within an account, so the merged table may repeat an id, told apart by subdomain.
+
+    Parameters
+    ----------
+    subdomains : list of str
+        Distinct subdomain of each account
+    frames : list of DataFrames
+        Ticket table of each account, as built by TicketFrameBuilder
+
+    Returns
+    -------
+    DataFrame
+        Ticket data of every account in order
+    """
+
+    tickets_df = concat_ticket_frames(frames)
+    codes = np.repeat(np.arange(len(frames), dtype='int16'), [len(frame) for frame in frames])
+    tickets_df.insert(0, ACCOUNT_COLUMN, pd.Categorical.from_codes(codes, categories=pd.Index(list(subdomains), dtype=object)))
+    return tickets_df
+
+class TicketPageBuffer:
+    """Builds the ticket table on a background thread, so the first rows can be shown while later pages download
+
+    Parameters
+    ----------
+    pages : iterable of lists of dicts
+        Stream of ticket pages (e.g. get_tickets(..., stream=True)); a False page marks a failed download
+    """
+
+    def __init__(self, pages):
+        self.frames = []
+        self.offsets = [0]
+        self.finished = False
+        self.failed = False
+        self.condition = threading.Condition()
+        self.started = time.perf_counter()
+        self.time_to_first_page = None
+        self.thread = threading.Thread(target=self._consume, args=(pages,), daemon=True)
+        self.thread.start()
+
+    def _consume(self, pages):
+        try:
+            for page_tickets in pages:
+                if page_tickets is False:
+                    self.failed = True
+                    break
+                builder = TicketFrameBuilder()
+                builder.add_page(page_tickets)
+                page_df = builder.build()
+                with self.condition:
+                    self.frames.append(page_df)
+                    self.offsets.append(self.offsets[-1] + len(page_df))
+                    if self.time_to_first_page is None:
+                        self.time_to_first_page = time.perf_counter() - self.started
+                    self.condition.notify_all()
+        except Exception as error:
+            print(f'Ticket download interrupted: {error}')
+            self.failed = True
+        finally:
+            with self.condition:
+                self.finished = True
+                self.condition.notify_all()
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def wait_for_rows(self, row_count):
+        """Blocks until row_count rows have been built or the download has ended
+
+        Parameters
+        ----------
+        row_count : int
+            Number of rows needed
+
+        Returns
+        -------
+        int
+            Number of rows available
+        """
+
+        with self.condition:
+            self.condition.wait_for(lambda: self.offsets[-1] >= row_count or self.finished)
+            return self.offsets[-1]
+
+    def is_available(self, row_count):
+        """Checks without blocking if row_count rows are built or no more rows will arrive"""
+        return self.offsets[-1] >= row_count or self.finished
+
+    def rows(self, start, stop):
+        """Returns rows start:stop of the table, waiting only if they have not been downloaded yet
+
+        Parameters
+        ----------
+        start : int
+            First row position
+        stop : int
+            Row position after the last row
+
+        Returns
+        -------
+        DataFrame
+            Ticket rows, shorter than stop - start at the end of the table
+        """
+
+        self.wait_for_rows(stop)
+        with self.condition:
+            first = max(bisect.bisect_right(self.offsets, start) - 1, 0)
+            last = bisect.bisect_left(self.offsets, stop)
+            frames = self.frames[first:last]
+            base = self.offsets[first]
+        if not frames:
+            return empty_ticket_frame()
+        return pd.concat(frames).iloc[start - base:stop - base]
+
+    def frame(self):
+        """Waits for the download to end and returns the whole table
+
+        Returns
+        -------
+        DataFrame or Bool
+            Normalized ticket data; False if the download failed
+        """
+
+        self.thread.join()
+        if self.failed:
+            return False
+        return concat_ticket_frames(self.frames)
@@ -1,13 +1,39 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextlib
 from dotenv import load_dotenv
 import json
-import numpy as np
+import math
 import os
-import requests
+import re
+from requests import RequestException
 import shutil
-from tabulate import tabulate
 import time
-import pandas as pd
 import sys
+import threading
+from ticket_viewer.cache import TicketCache
+from ticket_viewer.client import ZendeskClient
+from ticket_viewer.metrics import metrics
+from ticket_viewer.names import DEFAULT_NAME_CACHE_SIZE, NAME_COLUMNS, SIDELOADS, AccountNames, NameDirectory, with_include
+from ticket_viewer.pipeline import TICKET_FIELDS, decode_ticket_page, project_tickets
+from ticket_viewer.search import SEARCH_FIELDS, SearchIndex
+# ticket_viewer.table and ticket_viewer.render (and with them pandas and numpy) are imported inside the functions
+# that build or show the ticket table, so startup and 'select x' never pay for loading them
+
+DEFAULT_CONCURRENCY = 4 # parallel page downloads for 'all', overridden by ZCC_CONCURRENCY
+PAGE_SIZE = 100 # Zendesk maximum tickets per offset or cursor page
+OFFSET_PAGINATION_LIMIT = 10000 # Zendesk only serves the first 100 offset pages of a list
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'zcc-ticket-viewer') # overridden by ZCC_CACHE_DIR
+DEFAULT_CACHE_TTL = 300 # seconds cached tickets are served without a sync, overridden by ZCC_CACHE_TTL
+EXPORT_MIN_AGE = 60 # Zendesk rejects incremental exports with a start_time less than a minute old
+SHOW_MANY_LIMIT = 100 # Zendesk maximum ids per show_many request
+MAX_SELECT_TICKETS = 1000 # largest number of tickets a single select command may ask for
+FILTER_FIELDS = {'priority': 'priority', 'status': 'status', 'submitter': 'submitter_id', 'assignee': 'assignee_id',
+                 'organization': 'organization_id', 'org': 'organization_id',
+                 'subdomain': 'subdomain'} # filter/sort names, the _id column names work too; subdomain of merged accounts
+SEARCH_RESULTS = 25 # best matches shown by search
+WATCH_INTERVAL = 60 # seconds between the polls of 'watch', at least EXPORT_MIN_AGE
+WATCH_LIST_LIMIT = 20 # changed tickets listed per poll of 'watch'
 
 def get_credentials():
     """Get user credentials (subdomain, email_address, oauth_token) from env var
@@ -30,17 +56,42 @@ def get_credentials():
 
     return subdomain, user_email, api_token
 
-def validate_credentials(subdomain, email, api_token):
+def get_accounts():
+    """Get the credentials of every Zendesk account the viewer connects to, from env var
+
+    ZCC_SUBDOMAINS lists several subdomains separated by commas. Each subdomain's email address and API token are
+    read from ZCC_EMAIL_ADDRESS_<SUBDOMAIN> and ZCC_API_KEY_<SUBDOMAIN> (upper case, with '-' as '_'), falling back
+    to ZCC_EMAIL_ADDRESS and ZCC_API_KEY. Without ZCC_SUBDOMAINS, the single account of get_credentials is used.
+
+    Returns
+    -------
+    list of tuples of (str, str, str)
+        subdomain, user_email and api_token of each account, the first one being the account of every command
+        other than all, filter and sort
+    """
+
+    load_dotenv()
+
+    subdomains = list(dict.fromkeys(subdomain.strip() for subdomain in os.getenv('ZCC_SUBDOMAINS', '').split(',') if subdomain.strip()))
+    if not subdomains:
+        return [get_credentials()]
+    accounts = []
+    for subdomain in subdomains:
+        suffix = subdomain.upper().replace('-', '_')
+        user_email = os.getenv(f'ZCC_EMAIL_ADDRESS_{suffix}', os.getenv('ZCC_EMAIL_ADDRESS')) + "/token"
+        api_token = os.getenv(f'ZCC_API_KEY_{suffix}', os.getenv('ZCC_API_KEY'))
+        accounts.append((subdomain, user_email, api_token))
+    return accounts
+
+def validate_credentials(client):
     """Validates user's subdomain, email and api_token to ensure API endpoint is calleable
 
+    The connection opened here stays in the client's pool and is reused by later get_tickets calls.
+
     Parameters
     ----------
-    subdomain : str
-        Name of Zendesk subdomain
-    email : str
-        Login email credential
-    api_token : str
-        Login API token credential
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
 
     Returns
     -------
@@ -48,14 +99,12 @@ def validate_credentials(subdomain, email, api_token):
         True: If credentials can successfully connect; False: If credentials cannot connect
     """
     
-    api_url = f'https://{subdomain}.zendesk.com/api/v2/tickets.json'
-    headers = {'Accept': 'application/json'}
-    resp = requests.get(api_url, auth=(email, api_token), headers=headers)
-
-    # verify if email and api_token can be authenticated against API
-    if resp.status_code == 429: # if rate limit reached, retry again
-        time.sleep(int(resp.headers['retry-after']) + 1)
-        resp = requests.get(api_url, auth=(email, api_token), headers=headers)
+    # verify if email and api_token can be authenticated against API, rate limits and transient errors are retried by the client
+    try:
+        resp = client.get(client.url('tickets.json'))
+    except RequestException as error:
+        print(f'Could not connect to Zendesk: {error}')
+        return False
 
     if resp.status_code == 200:
         return True
@@ -64,90 +113,1013 @@ def validate_credentials(subdomain, email, api_token):
         print(f'Authentication failed, status code: {resp.status_code}')
         return False
 
-def get_tickets(subdomain, email, api_token, tickets):
-    """Calls Zendesk Tickets API and returns tickets as requested
+def request_page(client, api_url, tickets='all', decode=None):
+    """Requests a single API page, reporting API errors
 
     Parameters
     ----------
-    subdomain : str
-        Name of Zendesk subdomain
-    email : str
-        Login email credential
-    api_token : str
-        Login API token credential
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    api_url : str
+        Absolute API url of the page
     tickets : {'all', int}
+        Type of ticket requested, used to explain 404 responses
+    decode : callable, optional
+        Decoder applied to the raw response body (e.g. decode_ticket_page), defaults to resp.json()
+
+    Returns
+    -------
+    dict or Bool
+        Decoded page data; False if the API returned an error
+    """
+
+    # 429s, transient 5xx responses and timeouts are retried by the client, anything still failing is reported here
+    try:
+        resp = client.get(api_url)
+    except RequestException as error:
+        print(f'API request trouble encountered: {error}. Please try again.')
+        return False
+    if resp.status_code == 404 and tickets != 'all': # API endpoint does not exist (usually for invalid ticket_id)
+        print('API endpoint unavailable, possibly due to invalid ticket_id. Please try again.')
+        return False
+    elif resp.status_code != 200: # API error
+        print(f'API request trouble encountered, status code: {resp.status_code}. Please try again.')
+        return False
+    content = resp.content
+    metrics.count('fetch.bytes', len(content))
+    with metrics.timer('decode'):
+        return resp.json() if decode is None else decode(content)
+
+def get_tickets(client, tickets, concurrency=1, strategy='auto', stream=False, names=None):
+    """Calls Zendesk Tickets API and returns tickets as requested
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    tickets : {'all', int, list of ints}
         Type of ticket to request
         * all: Request all tickets
         * int: Request ticket with ticket_id = int
+        * list of ints: Request every ticket in the list, in bulk (see get_many_tickets)
+    concurrency : int, optional
+        Number of pages downloaded in parallel by the offset strategy or of show_many requests sent at once,
+        1 follows next_page links one at a time
+    strategy : {'auto', 'offset', 'cursor', 'incremental'}, optional
+        Pagination backend used when tickets = all (see FETCH_STRATEGIES)
+        * auto: offset for accounts within the offset pagination cap, cursor above it
+    stream : Bool, optional
+        When tickets = all, return a generator of pages of TicketRecords instead of a list of every ticket;
+        the caller consumes the pages, so no download status is printed
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the tickets, None requests no side-loads
 
     Returns
     -------
-    results : list of dicts or dict
+    results : list of dicts, generator or dict
         Ticket data from API
         * tickets = all: list of dicts, each dict containing the data of 1 ticket
+        * tickets = all, stream = True: generator of pages of TicketRecords as yielded by iter_ticket_pages
         * tickets = int: dict of single ticket data
+        * tickets = list of ints: list of dicts of the tickets found, in the order requested
     """
 
-    if tickets == 'all':
-        api_url = f'https://{subdomain}.zendesk.com/api/v2/tickets.json'
-    else:
-        api_url = f'https://{subdomain}.zendesk.com/api/v2/tickets/{tickets}.json'
-    headers = {'Accept': 'application/json'}
+    if isinstance(tickets, list):
+        return get_many_tickets(client, tickets, concurrency=concurrency, names=names)
+    if tickets != 'all':
+        include = SIDELOADS if names is not None else None
+        page_data = request_page(client, with_include(client.url(f'tickets/{tickets}.json'), include), tickets)
+        if page_data and names is not None:
+            names.add_page(page_data)
+        return page_data['ticket'] if page_data else False
+    if stream:
+        return iter_ticket_pages(client, concurrency=concurrency, strategy=strategy, show_progress=False, names=names)
+
     results = []
+    exported = {}
+    for page_tickets in iter_ticket_pages(client, concurrency=concurrency, strategy=strategy, fields=None, names=names):
+        if page_tickets is False:
+            return False
+        # export windows are ordered by updated_at and may repeat a ticket, so keep its latest version
+        if strategy == 'incremental':
+            exported.update((ticket['id'], ticket) for ticket in page_tickets)
+        else:
+            results.extend(page_tickets)
+    if strategy == 'incremental':
+        return [exported[ticket_id] for ticket_id in sorted(exported) if exported[ticket_id]['status'] != 'deleted']
+    return results
+
+async def aget_tickets(aclient, tickets, concurrency=1, strategy='auto', stream=False, names=None):
+    """Asynchronous get_tickets: requests tickets without blocking the event loop, so other commands and
+    background syncs run while the tickets download
+
+    Parameters
+    ----------
+    aclient : AsyncZendeskClient
+        asyncio front of the pooled API client
+    tickets : {'all', int, list of ints}
+        Type of ticket to request, see get_tickets
+    concurrency : int, optional
+        Number of pages or show_many requests downloaded in parallel, see get_tickets
+    strategy : {'auto', 'offset', 'cursor', 'incremental'}, optional
+        Pagination backend used when tickets = all, see get_tickets
+    stream : Bool, optional
+        When tickets = all, return an async generator of pages of TicketRecords; closing it or cancelling
+        the task iterating it stops the download
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the tickets
+
+    Returns
+    -------
+    results : list of dicts, async generator, dict or Bool
+        Ticket data from API, see get_tickets
+    """
+
+    if tickets == 'all' and stream:
+        return aclient.iterate(get_tickets(aclient.client, 'all', concurrency=concurrency, strategy=strategy, stream=True, names=names))
+    from ticket_viewer.aio import run_in_thread
+    return await run_in_thread(get_tickets, aclient.client, tickets, concurrency=concurrency, strategy=strategy, names=names)
+
+def get_many_tickets(client, ticket_ids, concurrency=1, names=None):
+    """Requests several tickets through the show_many endpoint, SHOW_MANY_LIMIT ids per request
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    ticket_ids : list of ints
+        Ticket ids to request
+    concurrency : int, optional
+        Maximum number of show_many requests sent at the same time
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the tickets
+
+    Returns
+    -------
+    list of dicts or Bool
+        Ticket data of the tickets found, in the order of ticket_ids; False if the API returned an error
+    """
+
+    chunks = [ticket_ids[start:start + SHOW_MANY_LIMIT] for start in range(0, len(ticket_ids), SHOW_MANY_LIMIT)]
+    include = SIDELOADS if names is not None else None
+    api_urls = [with_include(client.url(f'tickets/show_many.json?ids={",".join(map(str, chunk))}'), include) for chunk in chunks]
+    found = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(api_urls)))) as executor:
+        futures = [executor.submit(request_page, client, api_url, ticket_ids) for api_url in api_urls]
+        for future in futures:
+            page_data = future.result()
+            if not page_data:
+                for pending in futures:
+                    pending.cancel()
+                return False
+            found.update((ticket['id'], ticket) for ticket in page_data['tickets'])
+            if names is not None:
+                names.add_page(page_data)
+    missing = [ticket_id for ticket_id in ticket_ids if ticket_id not in found]
+    if missing:
+        print(f'Tickets not found: {", ".join(map(str, missing))}')
+    return [found[ticket_id] for ticket_id in ticket_ids if ticket_id in found]
+
+def get_names(client, kind, ids, concurrency=1):
+    """Requests the names of users or organizations through their show_many endpoint, SHOW_MANY_LIMIT ids per request
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    kind : {'users', 'organizations'}
+        Kind of record
+    ids : list of ints
+        User or organization ids
+    concurrency : int, optional
+        Maximum number of show_many requests sent at the same time
+
+    Returns
+    -------
+    list of tuples or Bool
+        (id, name) of the records found; False if the API returned an error
+    """
+
+    api_urls = [client.url(f'{kind}/show_many.json?ids={",".join(map(str, ids[start:start + SHOW_MANY_LIMIT]))}') for start in range(0, len(ids), SHOW_MANY_LIMIT)]
+    found = []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(api_urls)))) as executor:
+        futures = [executor.submit(request_page, client, api_url) for api_url in api_urls]
+        for future in futures:
+            page_data = future.result()
+            if not page_data:
+                for pending in futures:
+                    pending.cancel()
+                return False
+            found.extend((record['id'], record.get('name')) for record in page_data[kind])
+    return found
+
+def get_selected_tickets(client, cache, ticket_ids, concurrency=1, names=None):
+    """Returns several tickets, from the local cache where fresh and in bulk from the API otherwise
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    cache : TicketCache or None
+        Local ticket cache, None if caching is off
+    ticket_ids : list of ints
+        Ticket ids to show
+    concurrency : int, optional
+        Maximum number of show_many requests sent at the same time
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the tickets
+
+    Returns
+    -------
+    list of dicts or Bool
+        Ticket data of the tickets found, in the order of ticket_ids; False if the API returned an error
+    """
+
+    cached = {}
+    if cache:
+        for ticket_id in ticket_ids:
+            ticket = cache.get(ticket_id)
+            if ticket:
+                cached[ticket_id] = ticket
+    missing = [ticket_id for ticket_id in ticket_ids if ticket_id not in cached]
+    if missing:
+        fetched = get_tickets(client, tickets=missing, concurrency=concurrency, names=names)
+        if fetched is False:
+            return False
+        if fetched and cache:
+            cache.merge(fetched)
+        cached.update((ticket['id'], ticket) for ticket in fetched)
+    return [cached[ticket_id] for ticket_id in ticket_ids if ticket_id in cached]
+
+def iter_ticket_pages(client, concurrency=1, strategy='auto', fields=TICKET_FIELDS, show_progress=True, names=None):
+    """Yields pages of all tickets as they arrive, dropping unused fields straight away
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    concurrency : int, optional
+        Number of pages downloaded in parallel by the offset strategy
+    strategy : {'auto', 'offset', 'cursor', 'incremental'}, optional
+        Pagination backend (see get_tickets)
+    fields : tuple of str, optional
+        Ticket fields kept, None keeps every field; TICKET_FIELDS pages are yielded as TicketRecords
+    show_progress : Bool, optional
+        Print the download status, turned off when pages are consumed while the table is already on screen
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with each page before the page is yielded,
+        None requests no side-loads
+
+    Yields
+    ------
+    list of TicketRecords, list of dicts or Bool
+        Ticket data of one page; False if the API returned an error, after which no more pages are yielded
+    """
+
+    # table pages skip full decoding: only TICKET_FIELDS are decoded, straight into compact TicketRecords
+    decode = decode_ticket_page if fields == TICKET_FIELDS else None
+    include = SIDELOADS if names is not None else None
+
+    # the first offset page reports the ticket count, which picks the strategy and sizes the progress bar
+    first_page = None
     max_tickets = 0
-    pages_downloaded = 0
+    if strategy in ('auto', 'offset'):
+        first_page = request_page(client, with_include(client.url(f'tickets.json?per_page={PAGE_SIZE}'), include), decode=decode)
+        if not first_page:
+            yield False
+            return
+        max_tickets = first_page['count']
+        if strategy == 'auto':
+            strategy = select_fetch_strategy(max_tickets)
+            if strategy != 'offset':
+                first_page = None
+
+    downloaded = 0
+    for page_data in FETCH_STRATEGIES[strategy](client, first_page=first_page, concurrency=concurrency, decode=decode, include=include):
+        if not page_data:
+            yield False
+            return
+        if names is not None:
+            names.add_page(page_data)
+        page_tickets = page_data['tickets']
+        downloaded += len(page_tickets)
+        metrics.count('fetch.pages')
+        metrics.count('fetch.tickets', len(page_tickets))
+
+        # show download status
+        if show_progress and max_tickets:
+            percent_downloaded = round(min(downloaded/max_tickets, 1)*100, 1)
+            print(f'{percent_downloaded}% downloaded...', end='\r')
+        elif show_progress:
+            print(f'{downloaded} tickets downloaded...', end='\r')
+        yield page_tickets if decode else project_tickets(page_tickets, fields)
+
+def select_fetch_strategy(ticket_count):
+    """Picks the pagination backend for an account of ticket_count tickets
+
+    Offset pages can be fetched in parallel but Zendesk caps offset pagination at OFFSET_PAGINATION_LIMIT
+    tickets and slows down on deep pages, so larger accounts are walked with cursor pagination.
+
+    Parameters
+    ----------
+    ticket_count : int
+        Number of tickets reported by the Tickets API
+
+    Returns
+    -------
+    str
+        Key of FETCH_STRATEGIES
+    """
+
+    if ticket_count <= OFFSET_PAGINATION_LIMIT:
+        return 'offset'
+    return 'cursor'
+
+def fetch_offset_pages(client, first_page=None, concurrency=1, decode=None, include=None):
+    """Yields ticket pages from offset pagination (?page=n&per_page=100)
+
+    With concurrency 1 the next_page links are followed one at a time. Otherwise every page url is worked out
+    from the ticket count up front and fetched on a thread pool, still yielding pages in ticket order.
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    first_page : dict, optional
+        Already downloaded first page, requested if not given
+    concurrency : int, optional
+        Maximum number of pages downloaded at the same time
+    decode : callable, optional
+        Decoder of the raw page body, see request_page
+    include : str, optional
+        Records side-loaded with each page, e.g. SIDELOADS
+
+    Yields
+    ------
+    dict or Bool
+        Page data containing 'tickets'; False if a page failed, after which no more pages are yielded
+    """
+
+    if first_page is None:
+        first_page = request_page(client, with_include(client.url(f'tickets.json?per_page={PAGE_SIZE}'), include), decode=decode)
+    yield first_page
+    if not first_page:
+        return
+
+    if concurrency <= 1:
+        api_url = first_page.get('next_page')
+        while api_url:
+            page_data = request_page(client, with_include(api_url, include), decode=decode)
+            yield page_data
+            if not page_data:
+                return
+            api_url = page_data.get('next_page')
+        return
+
+    # the page count follows the size of a full page as served, which the API may cap below the per_page asked for
+    served_size = len(first_page['tickets']) if first_page.get('next_page') and first_page['tickets'] else PAGE_SIZE
+    page_urls = [with_include(client.url(f'tickets.json?page={page}&per_page={PAGE_SIZE}'), include) for page in range(2, math.ceil(first_page['count']/served_size) + 1)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # collect in submission order, so tickets stay sorted while pages download out of order
+        futures = [executor.submit(request_page, client, api_url, decode=decode) for api_url in page_urls]
+        try:
+            for future in futures:
+                page_data = future.result()
+                yield page_data
+                if not page_data:
+                    return
+        finally:
+            # after a failed page, or when the consumer closes the stream early, pages not yet requested are dropped
+            for pending in futures:
+                pending.cancel()
+
+def fetch_cursor_pages(client, first_page=None, concurrency=1, decode=None, start_url=None, include=None):
+    """Yields ticket pages from cursor pagination (?page[size]=100), following links.next while meta.has_more
+
+    Cursor pages cost the same at any depth and are not capped, but each cursor depends on the previous page,
+    so concurrency is ignored.
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    first_page : dict, optional
+        Unused, accepted for a uniform strategy signature
+    concurrency : int, optional
+        Unused, accepted for a uniform strategy signature
+    decode : callable, optional
+        Decoder of the raw page body, see request_page
+    start_url : str, optional
+        links.next of an earlier page to continue from, e.g. when resuming an export
+    include : str, optional
+        Records side-loaded with each page, e.g. SIDELOADS
+
+    Yields
+    ------
+    dict or Bool
+        Page data containing 'tickets'; False if a page failed, after which no more pages are yielded
+    """
+
+    api_url = start_url or client.url(f'tickets.json?page[size]={PAGE_SIZE}')
     while api_url:
-        resp = requests.get(api_url, auth=(email, api_token), headers=headers)
-        if resp.status_code == 429: # catch rate limit exceeded, although normal usage should not exceed limit of 400/minute
-            print('Rate limited, reattempting shortly')
-            time.sleep(int(resp.headers['retry-after']) + 1)
-            continue
-        elif resp.status_code == 404 and tickets != 'all': # API endpoint does not exist (usually for invalid ticket_id)
-            print('API endpoint unavailable, possibly due to invalid ticket_id. Please try again.')
+        page_data = request_page(client, with_include(api_url, include), decode=decode)
+        yield page_data
+        if not page_data or not (page_data.get('meta') or {}).get('has_more'):
+            return
+        api_url = page_data['links']['next']
+
+def fetch_incremental_pages(client, first_page=None, concurrency=1, decode=None, start_time=0, include=None):
+    """Yields ticket pages from the time-based incremental export, until end_of_stream
+
+    Export pages hold up to 1000 tickets changed at or after start_time, including deleted tickets, and each
+    page's end_time is the start_time of the next. Concurrency is ignored as every page depends on the previous.
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    first_page : dict, optional
+        Unused, accepted for a uniform strategy signature
+    concurrency : int, optional
+        Unused, accepted for a uniform strategy signature
+    decode : callable, optional
+        Decoder of the raw page body, see request_page
+    start_time : int, optional
+        Unix epoch time to export changes from, 0 exports every ticket
+    include : str, optional
+        Records side-loaded with each page, e.g. SIDELOADS
+
+    Yields
+    ------
+    dict or Bool
+        Page data containing 'tickets' and 'end_time'; False if a page failed, after which no more pages are yielded
+    """
+
+    api_url = client.url(f'incremental/tickets.json?start_time={int(start_time)}')
+    while api_url:
+        page_data = request_page(client, with_include(api_url, include), decode=decode)
+        yield page_data
+        if not page_data or page_data.get('end_of_stream'):
+            return
+        api_url = page_data['next_page']
+
+FETCH_STRATEGIES = {'offset': fetch_offset_pages,
+                    'cursor': fetch_cursor_pages,
+                    'incremental': fetch_incremental_pages}
+
+def open_ticket_cache(subdomain):
+    """Opens the local ticket cache for subdomain, configured by the ZCC_CACHE, ZCC_CACHE_DIR and ZCC_CACHE_TTL env vars
+
+    Parameters
+    ----------
+    subdomain : str
+        Name of Zendesk subdomain
+
+    Returns
+    -------
+    TicketCache or None
+        Local ticket cache; None if caching is turned off with ZCC_CACHE=off
+    """
+
+    if os.getenv('ZCC_CACHE', 'on').lower() in ('off', 'false', '0'):
+        return None
+    cache_dir = os.getenv('ZCC_CACHE_DIR', DEFAULT_CACHE_DIR)
+    ttl = int(os.getenv('ZCC_CACHE_TTL', DEFAULT_CACHE_TTL))
+    return TicketCache(cache_dir, subdomain, ttl=ttl)
+
+def open_name_directory(client, cache, concurrency=1):
+    """Creates the user and organization name directory, sized by the ZCC_NAME_CACHE_SIZE env var
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client, used to request names not side-loaded with any ticket
+    cache : TicketCache or None
+        Local ticket cache, where names are stored between sessions
+    concurrency : int, optional
+        Maximum number of show_many requests sent at the same time
+
+    Returns
+    -------
+    NameDirectory
+        Empty directory of the client's account, reading stored names on first use
+    """
+
+    def fetch(kind, ids):
+        return get_names(client, kind, ids, concurrency=concurrency)
+
+    maxsize = int(os.getenv('ZCC_NAME_CACHE_SIZE', DEFAULT_NAME_CACHE_SIZE))
+    return NameDirectory(maxsize, store=cache, fetch=fetch)
+
+def configure_metrics():
+    """Turns instrumentation on or off from the ZCC_METRICS env var (on by default) and starts it afresh
+    """
+
+    metrics.enabled = os.getenv('ZCC_METRICS', 'on').lower() not in ('off', 'false', '0')
+    metrics.reset()
+
+def dump_metrics():
+    """Writes the metrics snapshot to the file named by the ZCC_METRICS_FILE env var, if set
+    """
+
+    path = os.getenv('ZCC_METRICS_FILE')
+    if path and metrics.enabled:
+        try:
+            metrics.dump(path)
+        except OSError as error:
+            print(f'Metrics could not be written to {path}: {error}')
+
+def sync_ticket_cache(client, cache, concurrency=1, names=None, show_progress=True, full_download=True):
+    """Brings the local ticket cache up to date and returns every cached ticket
+
+    * Fresh cache (synced within its ttl): served without any API request
+    * Never synced: full download through get_tickets, with the sync cursor set to the download start time
+    * Otherwise: only tickets changed since the sync cursor are exported incrementally and merged in
+
+    Syncs of the same cache take turns (TicketCache.sync_lock), so a sync started while another one is
+    exporting waits for it and then finds the cache fresh instead of exporting the same changes again. A full
+    download is streamed after sync_ticket_cache has returned, so it is recorded as running
+    (TicketCache.full_download) until its last page is stored, and a sync started meanwhile waits for it
+    rather than starting a second one. The pages returned by a full download must therefore be consumed;
+    callers that only need the cache synced pass full_download=False (see sync_whole_cache).
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    cache : TicketCache
+        Local ticket cache of the client's subdomain
+    concurrency : int, optional
+        Number of pages downloaded in parallel on a full download
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with downloaded tickets
+    show_progress : Bool, optional
+        Print the number of changed tickets, turned off for syncs running in the background
+    full_download : Bool, optional
+        Start a full download if the cache was never synced (or was cleared meanwhile); if False, None is
+        returned instead and nothing is downloaded
+
+    Returns
+    -------
+    results : generator, Bool or None
+        Pages of ticket data projected to TICKET_FIELDS, from TicketCache.iter_pages or, on a full download,
+        download_into_cache; False if the API returned an error; None if a full download was needed but not allowed
+    """
+
+    while True:
+        with cache.sync_lock:
+            running = cache.full_download
+            if running is None:
+                break
+        running.wait()
+    with cache.sync_lock:
+        now = time.time()
+        if cache.is_fresh(now):
+            cache.hits += 1
+            cache.bytes_saved += cache.size()[1]
+            return cache.iter_pages(TICKET_FIELDS)
+
+        cursor = cache.sync_cursor
+        if not cursor and not full_download:
+            return None
+        if not cursor:
+            cache.misses += 1
+            cache.invalidate()
+            cache.full_download = threading.Event()
+            return download_into_cache(client, cache, concurrency=concurrency, now=now, names=names)
+        elif now - cursor >= EXPORT_MIN_AGE:
+            cache.hits += 1
+            downloaded_bytes = 0
+            changed = 0
+            for page_data in fetch_incremental_pages(client, start_time=cursor, include=SIDELOADS if names is not None else None):
+                if not page_data:
+                    return False
+                if names is not None:
+                    names.add_page(page_data)
+                # each page commits with its end_time, so an interrupted sync resumes from the last merged page
+                downloaded_bytes += cache.merge(page_data['tickets'], cursor=page_data['end_time'], now=now)
+                changed += len(page_data['tickets'])
+            cache.bytes_saved += max(cache.size()[1] - downloaded_bytes, 0)
+            if show_progress:
+                print(f'{changed} tickets changed since last sync')
+        cache.mark_synced(now)
+    return cache.iter_pages(TICKET_FIELDS)
+
+def download_into_cache(client, cache, concurrency=1, now=None, names=None):
+    """Streams a full download into the cache, yielding each page as soon as it is stored
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    cache : TicketCache
+        Local ticket cache of the client's subdomain
+    concurrency : int, optional
+        Number of pages downloaded in parallel
+    now : float, optional
+        Unix epoch time the download started, stored as the sync cursor
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the tickets
+
+    Yields
+    ------
+    list of dicts or Bool
+        Ticket data of one page projected to TICKET_FIELDS; False if the API returned an error
+    """
+
+    now = time.time() if now is None else now
+    try:
+        for page_tickets in iter_ticket_pages(client, concurrency=concurrency, fields=None, show_progress=False, names=names):
+            if page_tickets is False:
+                yield False
+                return
+            cache.merge(page_tickets, now=now)
+            yield project_tickets(page_tickets)
+        # the cursor is only committed once every page is stored, so a broken download starts over
+        cache.merge([], cursor=now)
+        cache.mark_synced(now)
+        cache.save_search_index()
+    finally:
+        # syncs waiting for this download go on, finding the cache fresh or, if it broke off, starting over
+        with cache.sync_lock:
+            full_download, cache.full_download = cache.full_download, None
+        if full_download is not None:
+            full_download.set()
+
+def sync_whole_cache(client, cache, concurrency=1, names=None, cancelled=None):
+    """Syncs the local ticket cache for a command that reads the cache afterwards rather than the synced pages
+
+    A cache that was never synced is downloaded in full, consuming the pages so every one is stored.
+    Deciding that inside the sync, rather than from the sync cursor beforehand, keeps a 'cache clear' made
+    in between from leaving a full download that nobody streams (and every later sync waiting for it).
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    cache : TicketCache
+        Local ticket cache of the client's subdomain
+    concurrency : int, optional
+        Number of pages downloaded in parallel on a full download
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the tickets
+    cancelled : threading.Event, optional
+        Set to stop a full download, see cancellable_pages
+
+    Returns
+    -------
+    Bool
+        True once the cache is synced; False if the API returned an error or the download was cancelled
+    """
+
+    pages = sync_ticket_cache(client, cache, concurrency=concurrency, names=names, full_download=False)
+    if pages is None:
+        pages = sync_ticket_cache(client, cache, concurrency=concurrency, names=names)
+        if pages is False:
             return False
-        elif resp.status_code != 200: # API error
-            print(f'API request trouble encountered, status code: {resp.status_code}. Please try again.')
+        return all(page_tickets is not False for page_tickets in cancellable_pages(pages, cancelled))
+    return pages is not False
+
+async def refresh_ticket_cache(client, cache, concurrency=1, names=None):
+    """Keeps the local ticket cache fresh in the background while the viewer waits for commands
+
+    Once the cache holds a full download, changes are exported incrementally (see sync_ticket_cache) whenever
+    the last sync is older than the cache ttl, at most once every EXPORT_MIN_AGE seconds, so 'all' and
+    'search' usually find the cache fresh. The first full download is left to 'all', which shows its pages as
+    they arrive. Runs until cancelled or a sync fails.
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    cache : TicketCache
+        Local ticket cache of the client's subdomain
+    concurrency : int, optional
+        Number of pages downloaded in parallel
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the changed tickets
+    """
+
+    import asyncio
+    from ticket_viewer.aio import run_in_thread
+
+    interval = max(cache.ttl, EXPORT_MIN_AGE)
+    while True:
+        wait = cache.synced_at + interval - time.time() if cache.sync_cursor else interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+        elif await run_in_thread(sync_ticket_cache, client, cache, concurrency=concurrency, names=names, show_progress=False, full_download=False) is False:
+            return
+
+def start_ticket_watch(client, cache, concurrency=1, names=None, cancelled=None):
+    """Gets the ticket table a watch starts from, together with the time its incremental exports start at
+
+    With a local cache, the cache is synced first and the watch starts from its table and sync cursor. Without
+    one, every ticket is downloaded once and the watch exports the changes made since the download started.
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    cache : TicketCache or None
+        Local ticket cache
+    concurrency : int, optional
+        Number of pages downloaded in parallel
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the tickets
+    cancelled : threading.Event, optional
+        Set to stop downloading, see cancellable_pages
+
+    Returns
+    -------
+    TicketWatch or Bool
+        Watch over the ticket table; False if the API returned an error or the download was cancelled
+    """
+
+    from ticket_viewer.watch import TicketWatch
+
+    if cache:
+        if not sync_whole_cache(client, cache, concurrency=concurrency, names=names, cancelled=cancelled):
             return False
-        page_data = resp.json()
-        if tickets != 'all': return page_data['ticket']
-        
-        # show download status
-        if max_tickets == 0:
-            max_tickets = page_data['count']
-        pages_downloaded += len(page_data['tickets'])
-        percent_downloaded = round(pages_downloaded/max_tickets*100, 1)
-        print(f'{percent_downloaded}% downloaded...', end='\r')
-        
-        # add results and paginate if possible
-        results.extend(page_data['tickets'])
-        if 'next_page' in page_data:
-            api_url = page_data['next_page']
-        else:
-            break
-    return results
+        with cache.sync_lock:
+            return TicketWatch(cache.ticket_table(TICKET_FIELDS), cache.sync_cursor, version=cache.version)
+
+    start = time.time()
+    tickets_df = process_all_tickets(cancellable_pages(iter_ticket_pages(client, concurrency=concurrency, names=names), cancelled))
+    return TicketWatch(tickets_df, start) if tickets_df is not False else False
 
-def process_all_tickets(api_results):
-    """Condense api_results into a DataFrame, keeping only (id, subject, description, priority, status, submitter_id, assignee_id, organization_id)
+def poll_ticket_changes(client, cache, watch, names=None):
+    """Exports the tickets changed since the watch's cursor and logs them in the watch
+
+    Only changed tickets are requested, so a poll costs one request when nothing changed. With a local cache,
+    the changes are merged into the cache as well, keeping it synced while the watch runs.
 
     Parameters
     ----------
-    api_results : list of dicts
-        Ticket data from API, each dict containing the data of 1 ticket
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    cache : TicketCache or None
+        Local ticket cache the watch was started from
+    watch : TicketWatch
+        Watch over the ticket table, see start_ticket_watch
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the changed tickets
+
+    Returns
+    -------
+    dict or Bool
+        'new', 'changed' and 'deleted' lists of ticket fields, see TicketWatch.apply; False if the API returned an error
+    """
+
+    from ticket_viewer.watch import CHANGE_KINDS
+
+    changes = {kind: [] for kind in CHANGE_KINDS}
+    with cache.sync_lock if cache else contextlib.nullcontext(), watch.lock:
+        now = time.time()
+        for page_data in fetch_incremental_pages(client, start_time=watch.cursor, include=SIDELOADS if names is not None else None):
+            if not page_data:
+                return False
+            if names is not None:
+                names.add_page(page_data)
+            if cache:
+                cache.merge(page_data['tickets'], cursor=page_data['end_time'], now=now)
+            for kind, tickets in watch.apply(page_data['tickets'], page_data['end_time']).items():
+                changes[kind].extend(tickets)
+        if cache:
+            cache.mark_synced(now)
+            watch.version = cache.version
+    return changes
+
+async def watch_tickets(client, cache, watch, interval=WATCH_INTERVAL, names=None):
+    """Polls for changed tickets every interval seconds and lists them, until cancelled or a poll fails
+
+    Zendesk only exports changes made over a minute ago, so a poll waits until the watch's cursor is at
+    least EXPORT_MIN_AGE seconds old.
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    cache : TicketCache or None
+        Local ticket cache the watch was started from
+    watch : TicketWatch
+        Watch over the ticket table, see start_ticket_watch
+    interval : int, optional
+        Seconds between polls
+    names : NameDirectory, optional
+        Directory of the user and organization names, fed the names side-loaded with the changes
+    """
+
+    import asyncio
+    from ticket_viewer.aio import run_in_thread
+
+    polled = time.time()
+    while True:
+        wait = max(polled + interval, watch.cursor + EXPORT_MIN_AGE) - time.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        polled = time.time()
+        changes = await run_in_thread(poll_ticket_changes, client, cache, watch, names=names)
+        if changes is False:
+            return
+        print_ticket_changes(changes, now=polled)
+
+def finish_ticket_watch(cache, watch):
+    """Patches the changes a watch has seen into its table, handing it to the cache it was started from
+
+    The cache's search index, kept current by every poll, is saved once here rather than after each poll.
+
+    Parameters
+    ----------
+    cache : TicketCache or None
+        Local ticket cache the watch was started from
+    watch : TicketWatch
+        Watch over the ticket table
 
     Returns
     -------
     DataFrame
-        Normalized ticket data for ('id', 'subject', 'priority', 'status', 'submitter_id', 'assignee_id', 'organization_id')
+        Ticket table with every change applied, see TicketWatch.table
     """
 
-    tickets_df = pd.DataFrame(api_results)
-    tickets_df = tickets_df[['id', 'subject', 'priority', 'status', 'submitter_id', 'assignee_id', 'organization_id']].set_index('id')
-    
-    # wraggle datatypes
-    tickets_df[['submitter_id', 'assignee_id', 'organization_id']] = tickets_df[['submitter_id', 'assignee_id', 'organization_id']].astype("Int64").astype('string')
-    tickets_df[['subject', 'priority', 'status']] = tickets_df[['subject', 'priority', 'status']].astype('string')
-    
-    return tickets_df.fillna(value='None')
+    # waits for a poll still running after the watch was cancelled
+    with cache.sync_lock if cache else contextlib.nullcontext(), watch.lock:
+        tickets_df = watch.table()
+        if cache:
+            cache.update_table(TICKET_FIELDS, tickets_df, watch.version)
+            cache.save_search_index()
+    return tickets_df
+
+def print_cache_stats(cache):
+    """Prints local ticket cache usage
+
+    Parameters
+    ----------
+    cache : TicketCache or None
+        Local ticket cache
+    """
+
+    if cache is None:
+        print('Local ticket cache is turned off (ZCC_CACHE=off).')
+        return
+    stats = cache.stats()
+    last_sync = 'never' if stats['last_sync_age'] is None else f"{stats['last_sync_age']}s ago"
+    print(f"Local ticket cache: {stats['tickets']} tickets ({stats['bytes']/1e6:.1f} MB) in {cache.path}, last synced {last_sync}, ttl {cache.ttl}s")
+    print(f"Hits: {stats['hits']}\tMisses: {stats['misses']}\tBytes saved: {stats['bytes_saved']/1e6:.1f} MB")
+
+def print_stats(snapshot):
+    """Prints the timings and counters recorded by the instrumented hot paths
+
+    Parameters
+    ----------
+    snapshot : dict
+        Metrics snapshot, see Metrics.snapshot
+    """
+
+    if not snapshot['enabled']:
+        print('Metrics are turned off (ZCC_METRICS=off).')
+        return
+    if not snapshot['timings'] and not snapshot['counters']:
+        print('No metrics recorded yet.')
+        return
+    if snapshot['timings']:
+        print(f"{'timing':<24}{'count':>8}{'total':>10}{'mean':>10}{'p50':>10}{'p90':>10}{'max':>10}")
+        for name, timing in snapshot['timings'].items():
+            ms = [f'{timing[key] * 1000:.1f}ms' for key in ('mean_seconds', 'p50_seconds', 'p90_seconds', 'max_seconds')]
+            print(f"{name:<24}{timing['count']:>8}{timing['total_seconds']:>9.2f}s" + ''.join(f'{value:>10}' for value in ms))
+    for name, value in snapshot['counters'].items():
+        print(f'{name:<24}{value / 1e6:>7.1f} MB' if name.endswith('bytes') else f'{name:<24}{value:>8}')
+
+def print_summary(summary, names=None):
+    """Prints ticket counts by status, priority, assignee and organization, backlog age and weekly trends
+
+    Parameters
+    ----------
+    summary : dict
+        Ticket summary, see summary.summarize
+    names : NameDirectory, optional
+        Directory of the user and organization names shown instead of ids
+    """
+
+    import datetime
+
+    if not summary['tickets']:
+        print('No tickets to summarize.')
+        return
+    print(f"{summary['tickets']} tickets, {summary['open']} open")
+    for column, title, missing in (('status', 'status', 'none'), ('priority', 'priority', 'none'),
+                                   ('assignee_id', 'top assignees', 'unassigned'), ('organization_id', 'top organizations', 'none')):
+        named = names is not None and column in NAME_COLUMNS
+        if named:
+            names.ensure(NAME_COLUMNS[column][0], [value for value, _, _ in summary[column]])
+        labels = [missing if value is None else names.label(column, value) if named else str(value) for value, _, _ in summary[column]]
+        width = max([len(title)] + [len(label) for label in labels])
+        print(f"\n{title:<{width}}{'tickets':>10}{'open':>10}")
+        for label, (_, tickets, opened) in zip(labels, summary[column]):
+            print(f'{label:<{width}}{tickets:>10}{opened:>10}')
+    print()
+    for key, title in (('age_days', 'Open ticket age'), ('idle_days', 'Open ticket idle time')):
+        days = summary[key]
+        if days is None:
+            print(f'{title}: no open tickets')
+        else:
+            print(f'{title} (days): ' + '  '.join(f'{name} {value:.1f}' for name, value in days.items()))
+    print(f"\n{'week of':<12}{'created':>10}{'solved':>10}{'open':>10}")
+    for week in summary['trend']:
+        start = datetime.datetime.fromtimestamp(week['week_start'], tz=datetime.timezone.utc).strftime('%Y-%m-%d')
+        print(f"{start:<12}{week['created']:>10}{week['solved']:>10}{week['open']:>10}")
+
+def print_ticket_changes(changes, now=None, limit=WATCH_LIST_LIMIT):
+    """Prints a compact list of the tickets a poll of 'watch' found changed, one line per ticket
+
+    Parameters
+    ----------
+    changes : dict
+        'new', 'changed' and 'deleted' lists of ticket fields, see TicketWatch.apply
+    now : float, optional
+        Unix epoch time of the poll
+    limit : int, optional
+        Most tickets listed, the rest are counted
+    """
+
+    counts = ', '.join(f'{len(tickets)} {kind}' for kind, tickets in changes.items() if tickets)
+    if not counts:
+        return
+    print(f"[{time.strftime('%H:%M:%S', time.localtime(now))}] {counts}")
+    rows = [(kind, ticket) for kind, tickets in changes.items() for ticket in tickets]
+    subject_width = max(shutil.get_terminal_size().columns - 36, 10)
+    for kind, ticket in rows[:limit]:
+        subject = str(ticket.get('subject'))
+        subject = subject if len(subject) <= subject_width else subject[:subject_width - 3] + '...'
+        print(f"  {kind:<8}{ticket['id']:>8}  {str(ticket.get('status')):<8}{str(ticket.get('priority')):<8}{subject}")
+    if len(rows) > limit:
+        print(f'  ... and {len(rows) - limit} more')
+
+def process_all_tickets(api_results, background=False, fields=TICKET_FIELDS):
+    """Condense api_results into a DataFrame, keeping only (id, subject, priority, status, submitter_id, assignee_id, organization_id)
+
+    Parameters
+    ----------
+    api_results : list of dicts or iterable of lists of dicts
+        Ticket data from API, either a list with each dict containing the data of 1 ticket, or a stream of
+        such pages (e.g. get_tickets(..., stream=True)) which is built into the table page by page
+    background : Bool, optional
+        Build the table on a background thread and return as soon as the first page is ready
+    fields : tuple of str, optional
+        Columns of the table, 'id' first, see TicketFrameBuilder; background tables always use TICKET_FIELDS
+
+    Returns
+    -------
+    DataFrame, TicketPageBuffer or Bool
+        Normalized ticket data for ('id', 'subject', 'priority', 'status', 'submitter_id', 'assignee_id', 'organization_id'),
+        with int64 ids, nullable Int64 user/organization ids, categorical priority and status and missing values kept
+        as NA until display (see render.TableLayout); a TicketPageBuffer still filling up if background = True; False if a
+        streamed page failed to download
+    """
+
+    from ticket_viewer.table import TicketFrameBuilder, TicketPageBuffer
+
+    pages = [api_results] if isinstance(api_results, list) else api_results
+    if background:
+        buffer = TicketPageBuffer(pages)
+        if not buffer.wait_for_rows(1) and buffer.failed:
+            return False
+        return buffer
+
+    builder = TicketFrameBuilder(fields)
+    for page_tickets in pages:
+        if page_tickets is False:
+            return False
+        builder.add_page(page_tickets)
+    return builder.build()
+
+def cancellable_pages(api_results, cancelled=None):
+    """Passes ticket data through until cancelled is set, then ends the stream the way a failed download does
+
+    Parameters
+    ----------
+    api_results : list of dicts or iterable of lists of dicts
+        Ticket data, a list of tickets or a stream of pages (see process_all_tickets)
+    cancelled : threading.Event, optional
+        Set from another thread to stop the stream; it is checked as each page arrives, after which the
+        underlying stream is closed, so no further pages are requested
+
+    Yields
+    ------
+    list of dicts or Bool
+        Ticket data of one page; False once cancelled, after which no more pages are yielded
+    """
+
+    pages = [api_results] if isinstance(api_results, list) else api_results
+    try:
+        for page_tickets in pages:
+            if cancelled is not None and cancelled.is_set():
+                yield False
+                return
+            yield page_tickets
+    finally:
+        if hasattr(pages, 'close'):
+            pages.close()
 
 def delete_terminal_lines(n):
     """Moves cursor up and delete previous output lines in the terminal by n times
@@ -173,52 +1145,131 @@ def check_terminal_window():
         if user_input == 'Y':
             break
 
-def display_pages_25(tickets_df):
+def get_page_rows(tickets_df, page_num, page_size=25):
+    """Returns the rows of page page_num, waiting for them to download if the table is still being built
+
+    Parameters
+    ----------
+    tickets_df : DataFrame or TicketPageBuffer
+        Normalized ticket data, or the table being built in the background
+    page_num : int
+        Page number, starting from 0
+    page_size : int, optional
+        Rows per page
+
+    Returns
+    -------
+    DataFrame
+        Ticket rows of the page, empty past the last page
+    """
+
+    from ticket_viewer.table import TicketPageBuffer
+
+    start = page_num * page_size
+    if isinstance(tickets_df, TicketPageBuffer):
+        if not tickets_df.is_available(start + page_size):
+            print('Waiting for page to download...')
+            paged_df = tickets_df.rows(start, start + page_size)
+            delete_terminal_lines(1)
+            return paged_df
+        return tickets_df.rows(start, start + page_size)
+    return tickets_df.iloc[start:start + page_size]
+
+def page_target(navigation, page_num, page_cache):
+    """Works out which page a navigation command asks for
+
+    Parameters
+    ----------
+    navigation : str
+        '<', '>', 'first', 'last' or 'g N' (page N, counting from 1)
+    page_num : int
+        Page number on screen, starting from 0
+    page_cache : PageRenderCache
+        Rendered pages of the ticket table
+
+    Returns
+    -------
+    int or None
+        Page number to show; None if the command is not a navigation command
+    """
+
+    if navigation == '>':
+        return page_num + 1
+    if navigation == '<':
+        return max(page_num - 1, 0)
+    if navigation == 'first':
+        return 0
+    if navigation == 'last':
+        if page_cache.page_count() is None:
+            print('Waiting for all pages to download...')
+            page_cache.tickets_df.wait_for_rows(math.inf)
+            delete_terminal_lines(1)
+        return page_cache.page_count() - 1
+    command = navigation.split()
+    if len(command) == 2 and command[0] == 'g' and command[1].isdigit() and int(command[1]) > 0:
+        return int(command[1]) - 1
+    return None
+
+def display_pages_25(tickets_df, names=None):
     """Prints all tickets in pages of 25 rows
 
+    Rendered pages are kept in a PageRenderCache and the pages either side of the one on screen are rendered
+    in the background, so moving back and forth or jumping to a page only renders each page once.
+    When given a TicketPageBuffer, the first page is shown as soon as it has downloaded and '>' only waits
+    if the requested page has not arrived yet.
+
     Parameters
     ----------
-    tickets_df : DataFrame
+    tickets_df : DataFrame or TicketPageBuffer
         Normalized ticket data for ('id', 'subject', 'priority', 'status', 'submitter_id', 'assignee_id', 'organization_id')
+    names : NameDirectory, optional
+        User and organization names shown instead of submitter, assignee and organization ids
     """
     
-    max_rows = len(tickets_df)
-    pages = [(x,x+25) for x in range(0,max_rows,25)]
+    from ticket_viewer.render import PageRenderCache
+    from ticket_viewer.table import TicketPageBuffer
+
     page_num = 0
-    max_page = len(pages) - 1
-    print("Type '<' or '>' to navigate between pages, 'q' to end ticket viewing.\n")
-    paged_df = tickets_df.iloc[pages[page_num][0]:pages[page_num][1]]
-    print(tabulate(paged_df, headers='keys', tablefmt='pretty'))
-    navigation = input().lower()
+    page_cache = PageRenderCache(tickets_df, load_rows=get_page_rows, names=names)
+    if isinstance(tickets_df, TicketPageBuffer) and tickets_df.time_to_first_page is not None:
+        print(f'First page downloaded in {tickets_df.time_to_first_page:.2f}s, the remaining pages continue downloading in the background.')
+    print("Type '<' or '>' to navigate between pages, 'g N' to go to page N, 'first' or 'last' to jump to either end, 'q' to end ticket viewing.\n")
+    width = shutil.get_terminal_size().columns
+    with metrics.timer('display.page'):
+        page, _ = page_cache.get(page_num, width)
+    print(page)
+    page_cache.prefetch(page_num, width)
+    navigation = input().strip().lower()
     delete_terminal_lines(1)
-    print_count = len(paged_df) + 4
+    print_count = page.count('\n') + 1
     
     while navigation != 'q':
-        if navigation == '>' and page_num < max_page:
-            page_num += 1
-            delete_terminal_lines(print_count)
-            paged_df = tickets_df.iloc[pages[page_num][0]:pages[page_num][1]]
-            print(tabulate(paged_df, headers='keys', tablefmt='pretty'))
-            print_count = len(paged_df) + 4
+        target = page_target(navigation, page_num, page_cache)
+        if target is not None and target != page_num:
+            width = shutil.get_terminal_size().columns
+            with metrics.timer('display.page'):
+                target_page, row_count = page_cache.get(target, width)
+            if row_count:
+                page_num = target
+                delete_terminal_lines(print_count)
+                page = target_page
+                print(page)
+                print_count = page.count('\n') + 1
+                page_cache.prefetch(page_num, width)
             
-        elif navigation == '<' and page_num > 0:
-            page_num -= 1
-            delete_terminal_lines(print_count)
-            paged_df = tickets_df.iloc[pages[page_num][0]:pages[page_num][1]]
-            print(tabulate(paged_df, headers='keys', tablefmt='pretty'))
-            print_count = len(paged_df) + 4
-            
-        navigation = input()
+        navigation = input().strip().lower()
         delete_terminal_lines(1)
+    page_cache.close()
 
-
-def process_select_ticket(api_results):
+def process_select_ticket(api_results, names=None):
     """Extracts (id, subject, description, priority, status, submitter_id, assignee_id, organization_id) from API results of selected ticket and prints output
 
     Parameters
     ----------
     api_results : dict
         Dict of single ticket data
+    names : NameDirectory, optional
+        User and organization names shown next to the submitter, assignee and organization ids
     """
 
     divider = '-' * min(shutil.get_terminal_size().columns, 50)
@@ -231,6 +1282,12 @@ def process_select_ticket(api_results):
     submitter_id = api_results['submitter_id']
     assignee_id = api_results['assignee_id']
     organization_id = api_results['organization_id']
+    if names is not None:
+        names.ensure('users', [submitter_id, assignee_id])
+        names.ensure('organizations', [organization_id])
+        submitter_id = names.describe('submitter_id', submitter_id)
+        assignee_id = names.describe('assignee_id', assignee_id)
+        organization_id = names.describe('organization_id', organization_id)
 
     print(divider)
     print(f'Ticket ID: {id}\tSubject: {subject}')
@@ -247,47 +1304,472 @@ def menu_action():
     print('\tquit:\t\tExit the ticket viewer')
     print('\tall:\t\tView all tickets associated with subdomain and email')
     print('\tselect x:\tView ticket details of ticket with ticket_id = x')
+    print('\tselect x y a-b:\tView ticket details of several tickets, listed or as ranges')
+    print('\tfilter f=v ...:\tView the tickets where every field f equals v (priority, status, submitter, assignee, organization, subdomain)')
+    print('\tsort f:\t\tView the tickets sorted by field f, -f or f desc for descending order')
+    print('\tsearch terms:\tView the tickets whose subject or description best match the search terms')
+    print('\tcache:\t\tView local ticket cache statistics')
+    print('\tcache clear:\tEmpty the local ticket cache, the next all downloads every ticket again')
+    print('\tsummary:\tView ticket counts by status, priority, assignee and organization, backlog age and weekly trends')
+    print('\tstats:\t\tView request, decoding and rendering timings of this session (stats json, stats reset)')
+    print('\twatch:\t\tList new and changed tickets as they happen, polling every minute (watch s: every s seconds, Ctrl+C stops)')
+    print('\tcancel:\t\tStop the download all continues in the background (Ctrl+C cancels a command still running)')
 
 def load_select_ticket(user_command):
     """Processes user_command when it starts with 'select ' and differentiates between valid and invalid ticket_id entry
 
+    Ticket ids may be separated by spaces or commas, and a-b selects every ticket from a to b.
+
     Parameters
     ----------
     user_command : str
-        String starting with 'select '
+        String starting with 'select ', e.g. 'select 5', 'select 3 4' or 'select 1-10, 15'
 
     Returns
     -------
-    int
-        Represent ticket_id
+    int, list of ints or Bool
+        Represent ticket_id when a single ticket is selected; ticket_ids in the order given (without repeats)
+        when several are; False if the ticket_id values are invalid
     """
 
-    user_command = user_command.replace(" ","")
-    select_split = user_command.split('select')
-    ticket_id = select_split[1]
-    if len(select_split) != 2 or not ticket_id.isdigit():
+    ticket_ids = []
+    for token in user_command[len('select'):].replace(',', ' ').split():
+        match = re.fullmatch(r'(\d+)(?:-(\d+))?', token)
+        if not match:
+            print('Select command understood but ticket_id value is invalid. Please try again.')
+            return False
+        first, last = int(match.group(1)), int(match.group(2) or match.group(1))
+        if last < first:
+            print(f"Select command understood but range '{token}' is reversed, use {last}-{first}. Please try again.")
+            return False
+        # the size is checked before the range is expanded, so 'select 1-50000000' is turned down at once
+        if len(ticket_ids) + last - first + 1 > MAX_SELECT_TICKETS:
+            print(f'Select command understood but at most {MAX_SELECT_TICKETS} tickets can be selected at once. Please try again.')
+            return False
+        ticket_ids.extend(range(first, last + 1))
+    ticket_ids = list(dict.fromkeys(ticket_ids))
+    if not ticket_ids:
         print('Select command understood but ticket_id value is invalid. Please try again.')
         return False
-    return int(ticket_id)
+    return ticket_ids[0] if len(ticket_ids) == 1 else ticket_ids
+
+def fetch_all_tickets(client, cache, concurrency, names=None):
+    """Gets every ticket, through the local cache when there is one
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Authenticated client of the Zendesk subdomain
+    cache : TicketCache or None
+        Local ticket cache
+    concurrency : int
+        Number of pages requested at a time
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the tickets
+
+    Returns
+    -------
+    iterable of lists or Bool
+        Pages of ticket data; False if the request failed
+    """
+
+    if cache:
+        return sync_ticket_cache(client, cache, concurrency=concurrency, names=names)
+    return get_tickets(client, tickets='all', concurrency=concurrency, stream=True, names=names)
+
+def load_ticket_table(client, cache, concurrency=1, names=None, background=False, cancelled=None, accounts=None):
+    """Gets every ticket (see fetch_all_tickets) and builds the ticket table, stopping early if cancelled
+
+    With a local cache that has been synced before, the table of the cached tickets is returned complete, see
+    TicketCache.ticket_table.
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Authenticated client of the Zendesk subdomain
+    cache : TicketCache or None
+        Local ticket cache
+    concurrency : int, optional
+        Number of pages requested at a time
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the tickets
+    background : Bool, optional
+        Return as soon as the first page is built, see process_all_tickets
+    cancelled : threading.Event, optional
+        Set to stop the download, see cancellable_pages
+    accounts : list of tuples of (ZendeskClient, TicketCache or None), optional
+        Further Zendesk accounts whose tickets are merged in, see load_accounts_table; the merged table is
+        only returned once every account has finished downloading
+
+    Returns
+    -------
+    DataFrame, TicketPageBuffer, Bool or None
+        Ticket table as returned by process_all_tickets; False if a page failed or the download was cancelled;
+        None if the tickets could not be requested at all
+    """
+
+    if accounts:
+        return load_accounts_table([(client, cache)] + list(accounts), concurrency=concurrency, names=names, cancelled=cancelled)
+    if cache:
+        # once synced, the cached tickets are complete: their table is reopened from its columnar file (and patched
+        # with the changes since) instead of being built page by page from every cached ticket; a cache never
+        # synced is downloaded below, page by page
+        pages = sync_ticket_cache(client, cache, concurrency=concurrency, names=names, full_download=False)
+        if pages is False:
+            return None
+        if pages is not None:
+            return cache.ticket_table(TICKET_FIELDS)
+    tickets = fetch_all_tickets(client, cache, concurrency, names=names)
+    if not tickets:
+        return None
+    return process_all_tickets(cancellable_pages(tickets, cancelled), background=background)
+
+def load_accounts_table(accounts, concurrency=1, names=None, cancelled=None):
+    """Builds the ticket tables of several Zendesk accounts at the same time and merges them, with a 'subdomain' column
+
+    Each account downloads on its own thread through its own ZendeskClient, so each keeps its own connection pool
+    and rate limit budget, and the wall time is that of the slowest account rather than the sum of all of them.
+    If any account fails, the downloads of the others are stopped.
+
+    Parameters
+    ----------
+    accounts : list of tuples of (ZendeskClient, TicketCache or None)
+        Client and local ticket cache of each account, in the order they are merged
+    concurrency : int, optional
+        Number of pages requested at a time per account
+    names : NameDirectory or AccountNames, optional
+        Directories of the accounts, each fed the users and organizations side-loaded with its own tickets
+    cancelled : threading.Event, optional
+        Set to stop every download, see cancellable_pages
+
+    Returns
+    -------
+    DataFrame, Bool or None
+        Merged ticket table, see table.merge_account_frames; False if a page failed or the download was cancelled;
+        None if the tickets of an account could not be requested at all
+    """
+
+    from ticket_viewer.table import merge_account_frames
+
+    cancelled = cancelled or threading.Event()
+    tables = {}
+    with ThreadPoolExecutor(max_workers=len(accounts)) as executor:
+        # each account feeds its own names, see names.AccountNames
+        futures = {executor.submit(load_ticket_table, client, cache, concurrency, names=names.account(client.subdomain) if names is not None else None,
+                                   cancelled=cancelled): client.subdomain
+                   for client, cache in accounts}
+        for future in as_completed(futures):
+            table = tables[futures[future]] = future.result()
+            if table is None or table is False:
+                cancelled.set()
+    for table in tables.values():
+        if table is None or table is False:
+            return table
+    subdomains = [client.subdomain for client, _ in accounts]
+    return merge_account_frames(subdomains, [tables[subdomain] for subdomain in subdomains])
+
+def build_ticket_index(tickets_df):
+    """Builds the filter and sort indexes of a ticket table, waiting for a TicketPageBuffer to finish downloading
+
+    Parameters
+    ----------
+    tickets_df : DataFrame, TicketPageBuffer or Bool
+        Ticket table of the last 'all'
+
+    Returns
+    -------
+    TicketIndex or None
+        Indexes of the table; None if the table failed to download
+    """
+
+    from ticket_viewer.index import TicketIndex
+    from ticket_viewer.table import TicketPageBuffer
+
+    table = tickets_df.frame() if isinstance(tickets_df, TicketPageBuffer) else tickets_df
+    return TicketIndex(table) if table is not False else None
+
+def column_name(field):
+    """Maps a filter/sort field name, e.g. 'assignee' or 'assignee_id', to its ticket table column, None if unknown"""
+    if field in ('id', 'subject'):
+        return field
+    return FILTER_FIELDS.get(field) or (field if field in FILTER_FIELDS.values() else None)
+
+def load_filter_command(user_command):
+    """Processes user_command when it starts with 'filter' into the column values to match
+
+    Parameters
+    ----------
+    user_command : str
+        String starting with 'filter', e.g. 'filter status=open priority=urgent assignee=123'; 'filter' alone clears
+        the filters and 'none' matches missing values, e.g. 'filter assignee=none'
+
+    Returns
+    -------
+    dict or Bool
+        Column to value (str for priority, status and subdomain, int or None for user/organization ids); False if invalid
+    """
+
+    filters = {}
+    for condition in user_command[len('filter'):].split():
+        field, _, value = condition.partition('=')
+        column = column_name(field)
+        if column not in FILTER_FIELDS.values() or not value:
+            print(f"Filter understood but '{condition}' is invalid, use field=value with field one of {', '.join(FILTER_FIELDS)}. Please try again.")
+            return False
+        if value == 'none':
+            filters[column] = None
+        elif column in ('priority', 'status', 'subdomain'):
+            filters[column] = value
+        elif value.isdigit():
+            filters[column] = int(value)
+        else:
+            print(f"Filter understood but '{value}' is not a valid {field} id. Please try again.")
+            return False
+    return filters
+
+def load_sort_command(user_command):
+    """Processes user_command when it starts with 'sort' into the column and direction to sort by
+
+    Parameters
+    ----------
+    user_command : str
+        String starting with 'sort', e.g. 'sort priority', 'sort -priority' or 'sort priority desc'; 'sort' alone
+        sorts by id again
+
+    Returns
+    -------
+    tuple of (str, Bool) or Bool
+        Column name and True for descending order; False if invalid
+    """
+
+    words = user_command[len('sort'):].split()
+    if not words:
+        return 'id', False
+    descending = words[0].startswith('-') or words[1:] == ['desc']
+    column = column_name(words[0].lstrip('-'))
+    if column is None or len(words) > 2 or words[1:] not in ([], ['asc'], ['desc']):
+        print(f"Sort command understood but '{' '.join(words)}' is invalid, sort by one of id, subject, {', '.join(FILTER_FIELDS)}. Please try again.")
+        return False
+    return column, descending
+
+def load_watch_command(user_command):
+    """Processes user_command when it starts with 'watch' into the seconds between polls
+
+    Parameters
+    ----------
+    user_command : str
+        String starting with 'watch', e.g. 'watch' or 'watch 120'
+
+    Returns
+    -------
+    int or Bool
+        Seconds between polls, WATCH_INTERVAL if not given; False if invalid
+    """
+
+    words = user_command[len('watch'):].split()
+    if not words:
+        return WATCH_INTERVAL
+    if len(words) > 1 or not words[0].isdigit() or int(words[0]) < EXPORT_MIN_AGE:
+        print(f"Watch command understood but '{' '.join(words)}' is invalid, give the seconds between polls, at least {EXPORT_MIN_AGE}. Please try again.")
+        return False
+    return int(words[0])
+
+def display_ticket_view(ticket_index, filters, sort_column, descending, names=None):
+    """Prints the tickets matching filters in sort order, in pages of 25 rows
+
+    Parameters
+    ----------
+    ticket_index : TicketIndex
+        Indexes over the ticket table
+    filters : dict
+        Column to value, see load_filter_command
+    sort_column : str
+        Column to sort by
+    descending : Bool
+        Sort from largest to smallest
+    names : NameDirectory, optional
+        User and organization names shown instead of ids
+    """
+
+    view_df = ticket_index.view(filters, sort_column, descending)
+    conditions = ' '.join(f'{column}={"none" if value is None else value}' for column, value in filters.items())
+    print(f'{len(view_df)} of {len(ticket_index)} tickets' + (f' match {conditions}' if conditions else '') +
+          f', sorted by {sort_column}{" (descending)" if descending else ""}.')
+    if len(view_df):
+        check_terminal_window()
+        display_pages_25(view_df, names=names)
+
+def load_search_index(client, cache, concurrency=1, names=None, cancelled=None):
+    """Returns a search index of every ticket's subject and description
+
+    With a local cache, the cache is synced first and its index, kept up to date by every merge and stored
+    next to the cache, is returned. Without one, every ticket is downloaded and indexed page by page.
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    cache : TicketCache or None
+        Local ticket cache
+    concurrency : int, optional
+        Number of pages downloaded in parallel
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded while the cache syncs
+    cancelled : threading.Event, optional
+        Set to stop downloading, see cancellable_pages
+
+    Returns
+    -------
+    SearchIndex or Bool
+        Full-text index of the tickets; False if the API returned an error or the download was cancelled
+    """
+
+    if cache:
+        if not sync_whole_cache(client, cache, concurrency=concurrency, names=names, cancelled=cancelled):
+            return False
+        return cache.search_index()
+
+    search_index = SearchIndex()
+    for page_tickets in cancellable_pages(iter_ticket_pages(client, concurrency=concurrency, fields=SEARCH_FIELDS), cancelled):
+        if page_tickets is False:
+            return False
+        search_index.add_tickets(page_tickets)
+    return search_index
+
+def load_summary_table(client, cache, concurrency=1, names=None, cancelled=None):
+    """Returns the table of every ticket that summary.summarize reads
+
+    With a local cache, the cache is synced first and its table of SUMMARY_FIELDS, reused until the cache
+    changes (see TicketCache.ticket_table), is returned. Without one, every ticket is downloaded again.
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Pooled API client holding the subdomain, email and api_token
+    cache : TicketCache or None
+        Local ticket cache
+    concurrency : int, optional
+        Number of pages downloaded in parallel
+    names : NameDirectory, optional
+        Directory fed the users and organizations side-loaded with the tickets
+    cancelled : threading.Event, optional
+        Set to stop downloading, see cancellable_pages
+
+    Returns
+    -------
+    DataFrame or Bool
+        Ticket data of SUMMARY_FIELDS; False if the API returned an error or the download was cancelled
+    """
+
+    from ticket_viewer.summary import SUMMARY_FIELDS
+
+    if cache:
+        if not sync_whole_cache(client, cache, concurrency=concurrency, names=names, cancelled=cancelled):
+            return False
+        return cache.ticket_table(SUMMARY_FIELDS)
+
+    pages = iter_ticket_pages(client, concurrency=concurrency, fields=SUMMARY_FIELDS, names=names)
+    return process_all_tickets(cancellable_pages(pages, cancelled), fields=SUMMARY_FIELDS)
+
+def display_search_results(search_index, terms, limit=SEARCH_RESULTS):
+    """Prints the tickets best matching terms, best match first
+
+    Parameters
+    ----------
+    search_index : SearchIndex
+        Full-text index of the tickets
+    terms : str
+        Search terms
+    limit : int, optional
+        Maximum number of tickets printed
+    """
+
+    results, total = search_index.search(terms, limit)
+    if not total:
+        print(f"No tickets match '{terms}'.")
+        return
+    print(f"{total} tickets match '{terms}'" + (f', best {limit} shown:' if total > limit else ':'))
+    id_width = max(len('id'), max(len(str(ticket_id)) for ticket_id, _, _ in results))
+    print(f'{"id":>{id_width}}  {"score":>6}  subject')
+    for ticket_id, subject, score in results:
+        print(f'{ticket_id:>{id_width}}  {score:6.2f}  {subject}')
 
 def interface_tool():
     """Presents interface for Zendesk Ticket Viewer
     
-    1. Gets user credentials from config.env
+    1. Gets user credentials from config.env, one set per Zendesk account (see get_accounts)
     2. Request user input for viewing type (menu, all, select x, quit)
-    3. Returns appropriate user request based on input
+    3. Returns appropriate user request based on input, see interface_loop
     """
 
-    subdomain, user_email, api_token = get_credentials()
+    import asyncio
+
+    (subdomain, user_email, api_token), *other_accounts = get_accounts()
+    configure_metrics()
+    concurrency = int(os.getenv('ZCC_CONCURRENCY', DEFAULT_CONCURRENCY))
+    client = ZendeskClient(subdomain, user_email, api_token, base_url=os.getenv('ZCC_BASE_URL'), pool_maxsize=max(10, concurrency))
+    cache = open_ticket_cache(subdomain)
+    # every further account gets a client of its own, and with it its own rate limit budget
+    accounts = [(ZendeskClient(*account, base_url=os.getenv('ZCC_BASE_URL'), pool_maxsize=max(10, concurrency)), open_ticket_cache(account[0]))
+                for account in other_accounts]
+    names = open_name_directory(client, cache, concurrency=concurrency)
+    if accounts:
+        # ids are only unique within an account, so every account has its own names, stored in its own cache
+        names = AccountNames({subdomain: names, **{other.subdomain: open_name_directory(other, other_cache, concurrency=concurrency)
+                                                   for other, other_cache in accounts}})
     # prompt user to modify config.env if invalid user credentials
-    if not validate_credentials(subdomain, user_email, api_token):
+    if not all([validate_credentials(account) for account in [client] + [other for other, _ in accounts]]):
         exit('Exiting Ticket Viewer...')
 
     # successful authorization
     print(f'Welcome to Zendesk Ticket Viewer. You are currently connected to {subdomain} as {user_email.rstrip("/token")}.')
+    if accounts:
+        print(f"Tickets of {', '.join(other.subdomain for other, _ in accounts)} are merged into all, filter and sort.")
     print("Type 'menu' to view ticket options or 'quit' to exit the viewer.\n")
 
-    user_input = input('-> ').lower()
+    asyncio.run(interface_loop(client, cache, concurrency, names=names, accounts=accounts))
+    for account, account_cache in [(client, cache)] + accounts:
+        account.close()
+        if account_cache:
+            account_cache.close()
+    dump_metrics()
+    print('Thank you for using the Zendesk Ticket Viewer')
+
+async def interface_loop(client, cache, concurrency=1, names=None, accounts=None):
+    """Reads and runs user commands until 'quit', on an asyncio event loop
+
+    Downloads, the pager and user input run on threads (see ticket_viewer.aio) while the loop keeps the local
+    cache fresh in the background (see refresh_ticket_cache). Ctrl+C cancels the command still running, e.g.
+    a long download, and returns to the prompt; 'cancel' stops the download 'all' continues in the background
+    once its first page is on screen.
+
+    Parameters
+    ----------
+    client : ZendeskClient
+        Authenticated client of the Zendesk subdomain
+    cache : TicketCache or None
+        Local ticket cache
+    concurrency : int, optional
+        Number of pages requested at a time
+    names : NameDirectory or AccountNames, optional
+        Directory of the user and organization names shown instead of ids, one per account with accounts
+    accounts : list of tuples of (ZendeskClient, TicketCache or None), optional
+        Further Zendesk accounts whose tickets 'all', 'filter' and 'sort' merge in, see load_accounts_table
+    """
+
+    import asyncio
+    from ticket_viewer.aio import AsyncZendeskClient, interruptible, read_input, run_cancellable, run_in_thread
+    from ticket_viewer.table import TicketPageBuffer
+
+    aclient = AsyncZendeskClient(client)
+    refresh = asyncio.ensure_future(refresh_ticket_cache(client, cache, concurrency, names=names)) if cache else None
+    tickets_df = None # ticket table of the last 'all', filtered and sorted through ticket_index
+    download_cancelled = None # set to stop the download of the last 'all'
+    ticket_index = None
+    filters, sort_column, descending = {}, 'id', False
+    search_index = None
+    summary_df = None
+    user_input = (await read_input('-> ')).lower()
     while user_input != 'quit':
         # show view menu if input = menu
         if user_input == 'menu':
@@ -295,25 +1777,226 @@ def interface_tool():
 
         # request all tickets if input = all
         elif user_input == 'all':
-            tickets = get_tickets(subdomain, user_email, api_token, tickets='all')
-            if tickets:
-                tickets_df = process_all_tickets(tickets)
-                check_terminal_window()
-                display_pages_25(tickets_df)
+            # a new download replaces the one the last 'all' may still be running
+            if download_cancelled is not None:
+                download_cancelled.set()
+            download_cancelled = threading.Event()
+            # pages are built into the table as they download, the first page is shown as soon as it arrives
+            table = await interruptible(run_cancellable(load_ticket_table, client, cache, concurrency, names=names,
+                                                        background=True, cancelled=download_cancelled, accounts=accounts))
+            if table is not None:
+                tickets_df, ticket_index = table, None
+                if tickets_df is not False:
+                    await run_in_thread(check_terminal_window)
+                    await run_in_thread(display_pages_25, tickets_df, names=names)
+
+        # filter or sort the tickets of the last 'all' if input = filter ... / sort ...
+        elif user_input.split()[:1] in (['filter'], ['sort']):
+            if user_input.startswith('filter'):
+                command = load_filter_command(user_input)
+                if command is not False:
+                    filters = command
+            else:
+                command = load_sort_command(user_input)
+                if command is not False:
+                    sort_column, descending = command
+            if command is not False and ticket_index is None:
+                # the indexes are built once per downloaded ticket list and reused by every filter and sort;
+                # a failed download of the last 'all' is downloaded again like a missing table
+                if isinstance(tickets_df, TicketPageBuffer) and tickets_df.finished and tickets_df.failed:
+                    tickets_df = None
+                if tickets_df is None or tickets_df is False:
+                    table = await interruptible(run_cancellable(load_ticket_table, client, cache, concurrency, names=names, accounts=accounts))
+                    tickets_df = table if table is not None else False
+                index = await interruptible(run_in_thread(build_ticket_index, tickets_df))
+                ticket_index = index if index is not False else None
+                if index is None and isinstance(tickets_df, TicketPageBuffer):
+                    # the download of the last 'all' failed while the command waited for it
+                    print('Tickets of the last all failed to download. Please try again.')
+                    tickets_df = None
+            if command is not False and ticket_index is not None:
+                await run_in_thread(display_ticket_view, ticket_index, filters, sort_column, descending, names=names)
+
+        # rank tickets by subject and description if input = search ...
+        elif user_input.split()[:1] == ['search']:
+            terms = user_input[len('search'):].strip()
+            if not terms:
+                print("Search command understood but no search terms given, e.g. 'search password reset'. Please try again.")
+            else:
+                # the cache's index is synced on every search; without a cache the index is built once per session
+                if cache or search_index is None:
+                    index = await interruptible(run_cancellable(load_search_index, client, cache, concurrency=concurrency, names=names))
+                    # an index of no tickets is falsy but valid, only False means the download failed or was cancelled
+                    search_index = index if index is not False else None
+                if search_index is not None:
+                    display_search_results(search_index, terms)
+
+        # summarize every ticket if input = summary
+        elif user_input == 'summary':
+            from ticket_viewer.summary import summarize
+            # the cache's table is synced on every summary; without a cache the tickets are downloaded once per session
+            if cache or summary_df is None:
+                table = await interruptible(run_cancellable(load_summary_table, client, cache, concurrency=concurrency, names=names))
+                summary_df = table if table is not False else None
+            if summary_df is not None:
+                summary = await interruptible(run_in_thread(summarize, summary_df))
+                if summary is not False:
+                    await run_in_thread(print_summary, summary, names=names)
+
+        # list new and changed tickets until Ctrl+C if input = watch / watch s
+        elif user_input.split()[:1] == ['watch']:
+            interval = load_watch_command(user_input)
+            if interval is not False:
+                # the watch syncs the cache itself, the background refresh would export its changes first
+                if refresh is not None:
+                    refresh.cancel()
+                watch = await interruptible(run_cancellable(start_ticket_watch, client, cache, concurrency=concurrency, names=names))
+                if watch:
+                    print(f'Watching {len(watch.tickets_df)} tickets of {client.subdomain} for changes every {interval}s. Press Ctrl+C to stop.')
+                    await interruptible(watch_tickets(client, cache, watch, interval, names=names))
+                    # the changes seen are patched into the table once, which 'all', 'filter' and 'sort' then reuse
+                    table = await run_in_thread(finish_ticket_watch, cache, watch)
+                    if download_cancelled is not None:
+                        download_cancelled.set()
+                    tickets_df, ticket_index = (table if not accounts else None), None
+                if refresh is not None:
+                    refresh = asyncio.ensure_future(refresh_ticket_cache(client, cache, concurrency, names=names))
 
         # request specific ticket detail if input == 'select x'
         elif user_input[0:7] == 'select ':
             ticket_id = load_select_ticket(user_input)
-            if ticket_id:
-                tickets = get_tickets(subdomain, user_email, api_token, tickets=ticket_id)
+            if isinstance(ticket_id, list):
+                tickets = await interruptible(run_in_thread(get_selected_tickets, client, cache, ticket_id, concurrency=concurrency, names=names))
+                for ticket in tickets or []:
+                    await run_in_thread(process_select_ticket, ticket, names=names)
+            elif ticket_id:
+                # the cache and the names of the ticket are read on threads, a merge may update a large search index
+                tickets = await run_in_thread(cache.get, ticket_id) if cache else None
+                if not tickets:
+                    tickets = await interruptible(aget_tickets(aclient, ticket_id, names=names))
+                    if tickets and cache:
+                        await run_in_thread(cache.merge, [tickets])
                 if tickets:
-                    process_select_ticket(tickets)
+                    await run_in_thread(process_select_ticket, tickets, names=names)
+
+        # stop the background download of the last 'all' if input = cancel
+        elif user_input == 'cancel':
+            if isinstance(tickets_df, TicketPageBuffer) and not tickets_df.finished:
+                download_cancelled.set()
+                print(f'Download cancelled after {len(tickets_df)} tickets.')
+                tickets_df, ticket_index = None, None
+            else:
+                print('No download running.')
+
+        # show or empty the local ticket cache if input = cache / cache clear
+        elif user_input == 'cache':
+            print_cache_stats(cache)
+        elif user_input == 'cache clear':
+            if cache:
+                cache.invalidate()
+            print('Local ticket cache cleared.')
+
+        # show instrumentation of this session if input = stats / stats json / stats reset
+        elif user_input == 'stats':
+            print_stats(metrics.snapshot())
+        elif user_input == 'stats json':
+            print(json.dumps(metrics.snapshot(), indent=2))
+        elif user_input == 'stats reset':
+            metrics.reset()
+            print('Metrics reset.')
                     
         else:
             print("User command not recognised, please try again or type 'menu' to see list of commands.")
-        user_input = input('-> ').lower()
-    print('Thank you for using the Zendesk Ticket Viewer')
+        user_input = (await read_input('-> ')).lower()
+    if download_cancelled is not None:
+        download_cancelled.set()
+    if refresh is not None:
+        refresh.cancel()
+
+def export_tool(out, export_format=None, fields=TICKET_FIELDS, restart=False):
+    """Exports every ticket to a file without the interactive viewer, e.g. from scripts or cron jobs
+
+    Pages are walked with cursor pagination and written as they arrive, so memory stays bounded by a page
+    (or a Parquet part, see ParquetWriter). An interrupted export resumes from its last completed page
+    when run again.
+
+    Parameters
+    ----------
+    out : str
+        Output file path
+    export_format : {'csv', 'ndjson', 'parquet'}, optional
+        Output format, guessed from the extension of out if not given
+    fields : tuple of str, optional
+        Ticket fields exported, in column order
+    restart : Bool, optional
+        Start over even if an unfinished export to out exists
+
+    Returns
+    -------
+    Bool
+        True if every ticket was exported
+    """
+
+    from ticket_viewer.export import TicketExport
+
+    subdomain, user_email, api_token = get_credentials()
+    configure_metrics()
+    client = ZendeskClient(subdomain, user_email, api_token, base_url=os.getenv('ZCC_BASE_URL'))
+    if not validate_credentials(client):
+        client.close()
+        return False
+    export = TicketExport.open(out, export_format, tuple(fields), restart=restart)
+    if export is False:
+        client.close()
+        return False
+    if export.resumed:
+        print(f'Resuming export to {out} after {export.tickets} tickets')
+
+    # TICKET_FIELDS pages decode straight into TicketRecords, which are written as rows without building dicts
+    decode = decode_ticket_page if tuple(fields) == TICKET_FIELDS else None
+    start = time.perf_counter()
+    exported = 0
+    for page_data in fetch_cursor_pages(client, decode=decode, start_url=export.next_url):
+        if not page_data:
+            export.close()
+            client.close()
+            print(f'Export to {out} interrupted after {export.tickets} tickets, run the same command again to resume.')
+            dump_metrics()
+            return False
+        has_more = (page_data.get('meta') or {}).get('has_more')
+        export.write_page(page_data['tickets'], page_data['links']['next'] if has_more else None)
+        exported += len(page_data['tickets'])
+        print(f'{export.tickets + export.pending_tickets} tickets exported ({exported / (time.perf_counter() - start):.0f} tickets/sec)...', end='\r')
+    total = export.finish()
+    client.close()
+    elapsed = time.perf_counter() - start
+    print(f'Exported {total} tickets to {out} in {elapsed:.1f}s ({exported / elapsed:.0f} tickets/sec)')
+    dump_metrics()
+    return True
+
+def main(argv=None):
+    """Starts the interactive viewer, or runs the subcommand given on the command line
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        Command line arguments, defaults to sys.argv[1:]
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m ticket_viewer.viewer', description='Zendesk Ticket Viewer, interactive when run without a subcommand')
+    subcommands = parser.add_subparsers(dest='command')
+    export_parser = subcommands.add_parser('export', help='export every ticket to a CSV, NDJSON or Parquet file')
+    export_parser.add_argument('--out', required=True, help='output file, an unfinished export to it is resumed')
+    export_parser.add_argument('--format', choices=('csv', 'ndjson', 'parquet'), help='output format, guessed from the --out extension by default')
+    export_parser.add_argument('--fields', default=','.join(TICKET_FIELDS), help=f'comma-separated ticket fields (default {",".join(TICKET_FIELDS)})')
+    export_parser.add_argument('--restart', action='store_true', help='start over instead of resuming an unfinished export')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        fields = tuple(field.strip() for field in args.fields.split(',') if field.strip())
+        sys.exit(0 if export_tool(args.out, args.format, fields, restart=args.restart) else 1)
+    interface_tool()
 
 
 if __name__ == "__main__":
-    interface_tool()
\ No newline at end of file
+    main()
\ No newline at end of file
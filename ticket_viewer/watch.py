@@ -0,0 +1,96 @@
+import threading
+import numpy as np
+from ticket_viewer.pipeline import TICKET_FIELDS
+
+CHANGE_KINDS = ('new', 'changed', 'deleted') # order changes are listed in
+
+class TicketWatch:
+    """Ticket table kept current by the changed tickets of incremental exports, see viewer.watch_tickets
+
+    Each poll only looks at the tickets it exported: their ids are looked up in the table's index and their
+    latest state is logged, so a poll costs the same whether the account holds a hundred tickets or a million.
+    The logged changes are patched into the table in one pass when the table is next asked for (see table),
+    which also leaves a read-only table (e.g. one mapped from its columnar file, see ticket_viewer.store) as
+    it is until then.
+
+    Parameters
+    ----------
+    tickets_df : DataFrame
+        Ticket table of fields as built by TicketFrameBuilder, indexed by unique ids in ascending order
+    cursor : float
+        Unix epoch time the next incremental export starts from, e.g. the time the table was downloaded
+    version : int, optional
+        Version of the local cache the table was built at, see TicketCache.version
+    fields : tuple of str, optional
+        Fields of the table, 'id' first
+    """
+
+    def __init__(self, tickets_df, cursor, version=None, fields=TICKET_FIELDS):
+        self.tickets_df = tickets_df
+        self.cursor = cursor
+        self.version = version
+        self.fields = fields
+        self.pending = {} # ticket id: latest fields, None once deleted, not patched into tickets_df yet
+        self.updated = {} # ticket id: updated_at of every change seen, so the repeats of overlapping exports are skipped
+        self.lock = threading.Lock() # held by a poll, so the table is never patched halfway through one
+
+    def is_known(self, ticket_id, listed):
+        """Checks if ticket_id is in the table once the pending changes are patched in, listed if it is in tickets_df"""
+        if ticket_id in self.pending:
+            return self.pending[ticket_id] is not None
+        return listed
+
+    def apply(self, tickets, cursor):
+        """Logs the changed tickets of one export page and moves the cursor past them
+
+        Parameters
+        ----------
+        tickets : list of dicts
+            Ticket data of an incremental export page, deleted tickets with status 'deleted'
+        cursor : float
+            End time of the page, where the next export starts from
+
+        Returns
+        -------
+        dict
+            'new', 'changed' and 'deleted' lists of the tickets' fields, each ticket listed once with its latest state
+        """
+
+        latest = {ticket['id']: ticket for ticket in tickets}
+        listed = self.tickets_df.index.get_indexer(np.fromiter(latest, dtype='int64', count=len(latest))) >= 0
+        changes = {kind: [] for kind in CHANGE_KINDS}
+        for (ticket_id, ticket), in_table in zip(latest.items(), listed):
+            if ticket_id in self.updated and self.updated[ticket_id] == ticket.get('updated_at'):
+                continue
+            self.updated[ticket_id] = ticket.get('updated_at')
+            known = self.is_known(ticket_id, bool(in_table))
+            record = {field: ticket.get(field) for field in self.fields}
+            if ticket.get('status') == 'deleted':
+                if known:
+                    self.pending[ticket_id] = None
+                    changes['deleted'].append(record)
+            else:
+                self.pending[ticket_id] = record
+                changes['changed' if known else 'new'].append(record)
+        self.cursor = cursor
+        return changes
+
+    def table(self):
+        """Patches the logged changes into the ticket table and returns it
+
+        Rows of changed and deleted tickets are replaced in one pass, see table.patch_ticket_frame. The result
+        is a new table, the previous one is left as it was.
+
+        Returns
+        -------
+        DataFrame
+            Ticket data indexed by 'id', with every change applied so far
+        """
+
+        from ticket_viewer.table import patch_ticket_frame
+
+        if not self.pending:
+            return self.tickets_df
+        tickets_df = patch_ticket_frame(self.tickets_df, list(self.pending), [ticket for ticket in self.pending.values() if ticket is not None], self.fields)
+        self.tickets_df, self.pending = tickets_df, {}
+        return tickets_df